@@ -3,23 +3,141 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
 import os
+import sys
+import atexit
 
 # Import blueprints
-from blueprints.audio_bp import audio_bp
+from blueprints.audio_bp import audio_bp, UploadRequest
 from blueprints.equalizer_bp import equalizer_bp
+from blueprints.jobs_bp import jobs_bp
 
 # Define necessary paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'temp_signals')
 
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+from executor import init_executor, default_worker_count
+from ai_separator import (
+    MODEL_REGISTRY, DEMUCS_MODEL_NAME, VOICE_MODEL_NAME, get_device,
+    configure_sharding, shutdown_sharding, configure_voice_separation, start_background_warmup
+)
+from process_memory import memory_report
+from separation_cache import configure_separation_cache, SEPARATION_CACHE
+from job_manager import configure_job_manager, JOB_MANAGER
+from signal_store import configure_signal_cache, shutdown_signal_cache, SIGNAL_CACHE
+from analysis_store import configure_analysis_store, ANALYSIS_STORE
+from shared_signal_store import DEFAULT_SHARED_DIR
+
 def create_app():
     app = Flask(__name__)
+    app.request_class = UploadRequest
     
     # Configuration
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    # Uploads up to this size are decoded from memory; larger ones spill to a temp file in UPLOAD_FOLDER
+    app.config['UPLOAD_SPILL_MB'] = float(os.environ.get('UPLOAD_SPILL_MB', 32))
+    # Shared pool for per-stem work; defaults to one worker per host core
+    app.config['STEM_WORKERS'] = int(os.environ.get('STEM_WORKERS', default_worker_count()))
+    # Separation models to load at startup: '' (lazy, on first request), 'all', or a comma list
+    app.config['PRELOAD_MODELS'] = os.environ.get('PRELOAD_MODELS', '')
+    app.config['MODEL_WARMUP'] = os.environ.get('MODEL_WARMUP', '1') == '1'
+    # Preload in a background thread so the server starts accepting requests at once (/ready reports 503 meanwhile)
+    app.config['PRELOAD_BACKGROUND'] = os.environ.get('PRELOAD_BACKGROUND', '1') == '1'
+    # Import torch/Demucs and probe FFmpeg in a background thread after start-up (no weights are loaded)
+    app.config['BACKGROUND_WARMUP'] = os.environ.get('BACKGROUND_WARMUP', '1') == '1'
+    # Pre-forking servers (gunicorn.conf.py): load the weights in the master so workers share them copy-on-write
+    app.config['FORK_SHARED_MODELS'] = os.environ.get('FORK_SHARED_MODELS', '0') == '1'
+    # CPU inference variant served by default: 'fp32', 'int8' or 'traced'
+    app.config['MODEL_VARIANT'] = os.environ.get('MODEL_VARIANT', 'fp32')
+    # Cross-request batching of equal-length model segments (batch size 1 disables it)
+    app.config['INFERENCE_BATCH_SIZE'] = int(os.environ.get('INFERENCE_BATCH_SIZE', 4))
+    app.config['INFERENCE_BATCH_WAIT_MS'] = float(os.environ.get('INFERENCE_BATCH_WAIT_MS', 20))
+    # Process-sharded Demucs for long inputs on many-core CPUs (0 workers disables it)
+    app.config['SHARD_WORKERS'] = int(os.environ.get('SHARD_WORKERS', 0))
+    app.config['SHARD_THREADS_PER_WORKER'] = int(os.environ['SHARD_THREADS_PER_WORKER']) if os.environ.get('SHARD_THREADS_PER_WORKER') else None
+    app.config['SHARD_MIN_SECONDS'] = float(os.environ.get('SHARD_MIN_SECONDS', 60))
+    # Voice separation: 4 s slices processed per forward pass (peak memory vs. throughput)
+    app.config['VOICE_MICRO_BATCH'] = int(os.environ.get('VOICE_MICRO_BATCH', 8))
+    # Separation result cache (content-hash keyed, LRU in memory and on disk)
+    app.config['SEPARATION_CACHE_DIR'] = os.environ.get('SEPARATION_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'separation'))
+    app.config['SEPARATION_CACHE_MEMORY_MB'] = float(os.environ.get('SEPARATION_CACHE_MEMORY_MB', 512))
+    app.config['SEPARATION_CACHE_DISK_MB'] = float(os.environ.get('SEPARATION_CACHE_DISK_MB', 2048))
+    # Uploaded signals: LRU within a memory budget; idle or evicted entries are spilled to disk and reloaded on use
+    app.config['SIGNAL_CACHE_MEMORY_MB'] = float(os.environ.get('SIGNAL_CACHE_MEMORY_MB', 1024))
+    app.config['SIGNAL_CACHE_TTL_S'] = float(os.environ.get('SIGNAL_CACHE_TTL_S', 1800))
+    app.config['SIGNAL_SPILL_DIR'] = os.environ.get('SIGNAL_SPILL_DIR', os.path.join(BASE_DIR, 'cache', 'signal_spill'))
+    app.config['SIGNAL_SPILL_DISK_MB'] = float(os.environ.get('SIGNAL_SPILL_DISK_MB', 4096))
+    # Where signals live: 'memory' (this process) or 'shared' (shared memory + index, visible to every worker)
+    app.config['SIGNAL_STORE'] = os.environ.get('SIGNAL_STORE', 'memory')
+    app.config['SIGNAL_SHARED_DIR'] = os.environ.get('SIGNAL_SHARED_DIR', DEFAULT_SHARED_DIR)
+    app.config['SIGNAL_SHARED_MEMORY_MB'] = float(os.environ.get('SIGNAL_SHARED_MEMORY_MB', 2048))
+    # Keep signal arrays over SIGNAL_MEMMAP_MIN_KB in memory-mapped files here ('' keeps them in RAM)
+    app.config['SIGNAL_MEMMAP_DIR'] = os.environ.get('SIGNAL_MEMMAP_DIR', '')
+    app.config['SIGNAL_MEMMAP_MIN_KB'] = float(os.environ.get('SIGNAL_MEMMAP_MIN_KB', 256))
+    # Snapshot in-process signals here so sessions survive a restart ('' disables; the shared store needs none)
+    app.config['SIGNAL_SNAPSHOT_DIR'] = os.environ.get('SIGNAL_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'cache', 'signal_snapshots'))
+    app.config['SIGNAL_SNAPSHOT_INTERVAL_S'] = float(os.environ.get('SIGNAL_SNAPSHOT_INTERVAL_S', 300))
+    # Upload analyses (spectrum, spectrogram, envelope) by content hash, reused by duplicate uploads ('' disables)
+    app.config['ANALYSIS_STORE_DIR'] = os.environ.get('ANALYSIS_STORE_DIR', os.path.join(BASE_DIR, 'cache', 'analysis'))
+    app.config['ANALYSIS_STORE_DISK_MB'] = float(os.environ.get('ANALYSIS_STORE_DISK_MB', 4096))
+    # Background workers for asynchronous separation jobs (/api/jobs)
+    app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 1))
+    # Memory for finished job results; the oldest are dropped beyond it (their /result answers 410)
+    app.config['JOB_RESULT_MB'] = float(os.environ.get('JOB_RESULT_MB', 512))
     
     # Ensure the upload directory exists
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+    # Start the shared thread pool used by recombination, metrics and visualization
+    init_executor(app.config['STEM_WORKERS'])
+    configure_separation_cache(
+        app.config['SEPARATION_CACHE_DIR'],
+        app.config['SEPARATION_CACHE_MEMORY_MB'],
+        app.config['SEPARATION_CACHE_DISK_MB']
+    )
+    configure_signal_cache(
+        app.config['SIGNAL_CACHE_MEMORY_MB'],
+        app.config['SIGNAL_CACHE_TTL_S'],
+        app.config['SIGNAL_SPILL_DIR'],
+        app.config['SIGNAL_SPILL_DISK_MB'],
+        app.config['SIGNAL_MEMMAP_DIR'],
+        app.config['SIGNAL_MEMMAP_MIN_KB'],
+        backend=app.config['SIGNAL_STORE'],
+        shared_dir=app.config['SIGNAL_SHARED_DIR'],
+        shared_memory_mb=app.config['SIGNAL_SHARED_MEMORY_MB'],
+        snapshot_dir=app.config['SIGNAL_SNAPSHOT_DIR'],
+        snapshot_interval_s=app.config['SIGNAL_SNAPSHOT_INTERVAL_S']
+    )
+    atexit.register(shutdown_signal_cache)
+    configure_analysis_store(app.config['ANALYSIS_STORE_DIR'], app.config['ANALYSIS_STORE_DISK_MB'])
+    configure_job_manager(app.config['JOB_WORKERS'], max_result_mb=app.config['JOB_RESULT_MB'])
+    atexit.register(JOB_MANAGER.shutdown)
+
+    # Load the configured separation models once (in a background thread unless PRELOAD_BACKGROUND=0)
+    MODEL_REGISTRY.default_variant = app.config['MODEL_VARIANT']
+    MODEL_REGISTRY.configure_batching(app.config['INFERENCE_BATCH_SIZE'], app.config['INFERENCE_BATCH_WAIT_MS'])
+    preload = app.config['PRELOAD_MODELS'].strip()
+    names = None if preload == 'all' else [name.strip() for name in preload.split(',') if name.strip()]
+    fork_shared = app.config['FORK_SHARED_MODELS']
+    if fork_shared and get_device() != 'cpu':
+        print("⚠ Warning: FORK_SHARED_MODELS needs CPU inference (CUDA cannot be used across fork); workers load their own models")
+        fork_shared = False
+    if fork_shared:
+        # No threads may be running when the server forks, so load synchronously and warm up in the workers
+        MODEL_REGISTRY.preload(names if preload else [DEMUCS_MODEL_NAME, VOICE_MODEL_NAME], warmup=False)
+        MODEL_REGISTRY.share_for_fork()
+    elif preload:
+        MODEL_REGISTRY.preload(names, warmup=app.config['MODEL_WARMUP'], background=app.config['PRELOAD_BACKGROUND'])
+    elif app.config['BACKGROUND_WARMUP']:
+        start_background_warmup()
+    atexit.register(MODEL_REGISTRY.shutdown)
+    configure_sharding(
+        app.config['SHARD_WORKERS'],
+        app.config['SHARD_THREADS_PER_WORKER'],
+        app.config['SHARD_MIN_SECONDS']
+    )
+    atexit.register(shutdown_sharding)
+    configure_voice_separation(app.config['VOICE_MICRO_BATCH'])
     
     # Enable CORS for frontend communication
     CORS(app) 
@@ -27,12 +145,31 @@ def create_app():
     # --- Register Blueprints (API Modules) ---
     app.register_blueprint(audio_bp, url_prefix='/api/audio')
     app.register_blueprint(equalizer_bp, url_prefix='/api/equalizer')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
 
     # --- Root Route ---
     @app.route('/')
     def index():
         return "Signal Equalizer Backend Running! Connect your React client to /api/..."
 
+    # --- Readiness Route (503 until preloaded models are warm) ---
+    @app.route('/ready')
+    def ready():
+        status = MODEL_REGISTRY.status()
+        return jsonify(status), 200 if status['ready'] else 503
+
+    # --- Metrics Route ---
+    @app.route('/metrics')
+    def metrics():
+        return jsonify({
+            'separation_cache': SEPARATION_CACHE.stats(),
+            'signal_cache': SIGNAL_CACHE.stats(),
+            'analysis_store': ANALYSIS_STORE.stats(),
+            'jobs': JOB_MANAGER.stats(),
+            'batching': MODEL_REGISTRY.batching_stats(),
+            'memory': memory_report()
+        }), 200
+
     # --- Global Error Handler ---
     @app.errorhandler(404)
     def not_found(error):
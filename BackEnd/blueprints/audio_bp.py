@@ -1,8 +1,12 @@
 # Backend/blueprints/audio_bp.py
 
-from flask import Blueprint, request, jsonify, current_app, send_from_directory
+from flask import Blueprint, Request, request, jsonify, current_app, send_from_directory
 import os
+import io
 import uuid
+import tempfile
+import threading
+from collections import OrderedDict
 import numpy as np
 
 # --- 1. Utility Imports ---
@@ -11,20 +15,52 @@ import sys
 BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
 sys.path.append(os.path.join(BASE_DIR, 'utils'))
 
-from utils.audio_util import load_audio_to_numpy, save_numpy_to_wav
-from utils.custom_fft import custom_fft, custom_ifft, get_fft_components
-from utils.spectrogram import custom_spectrogram
+from utils.audio_util import load_audio_from_stream, save_numpy_to_wav, NATIVE_FORMATS, FFMPEG_FORMATS
+from executor import submit
+from progressive_ingest import SignalIngest, READY, FAILED
+from signal_store import SIGNAL_CACHE
+from analysis_store import ANALYSIS_STORE
 
 audio_bp = Blueprint('audio_bp', __name__)
 
 # --- 2. In-Memory Data Cache ---
-# Stores {signal_id: {'Fs', 'time_series', 'input_fft', 'current_fft', 'current_signal', 'output_path'}}
-SIGNAL_CACHE = {} 
-ALLOWED_EXTENSIONS = {'wav', 'mp3', 'flac'}
+# Stores {signal_id: {'Fs', 'time_series', 'half_spectrum', 'fft_size', 'eq_scheme', 'output_path', 'analysis_id'}}
+# (analysis_store.AnalysisArtifact.signal_entry: the arrays are shared by every signal_id
+# uploaded with the same audio, the scheme is per signal_id); 'input_fft', 'current_fft' and 'current_signal'
+# are read like stored keys but derived from those on first access.
+# Each entry carries a version bumped on every write; routes read from
+# entry.snapshot() and write through entry.commit() (see signal_store.SignalEntry).
+# plus, after AI separation, 'ai_sources' ({name: array}) and 'ai_sources_sr'
+# or, during/after a streaming separation, 'ai_stream' (a StemStreamStore).
+# SIGNAL_CACHE is a signal_store.SignalStore chosen by SIGNAL_STORE: by default
+# a bounded in-process LRU that spills idle entries to disk and reloads them on
+# lookup (with SIGNAL_MEMMAP_DIR set, large arrays are memory-mapped files), or
+# a store in shared memory that every worker process reads without copying.
+# Every format load_audio can decode (the compressed ones through FFmpeg)
+ALLOWED_EXTENSIONS = NATIVE_FORMATS | FFMPEG_FORMATS
+# Progressive uploads still being decoded/analyzed (or recently finished): {signal_id: SignalIngest}
+INGESTS = OrderedDict()
+INGESTS_LOCK = threading.Lock()   # request threads add, prune and look up concurrently
+MAX_FINISHED_INGESTS = 100
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+
+class UploadRequest(Request):
+    """
+    Keeps uploaded files in memory up to UPLOAD_SPILL_MB (Werkzeug's default
+    is 500 KB) and only spills larger ones to a temporary file in UPLOAD_FOLDER.
+    Installed as app.request_class in create_app.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spill_bytes = int(current_app.config.get('UPLOAD_SPILL_MB', 32) * 1024 * 1024)
+        return tempfile.SpooledTemporaryFile(
+            max_size=spill_bytes, mode='rb+', dir=current_app.config.get('UPLOAD_FOLDER')
+        )
+
+
 # --- 3. /api/audio/upload (POST) ---
 @audio_bp.route('/upload', methods=['POST'])
 def upload_signal():
@@ -36,51 +72,28 @@ def upload_signal():
         return jsonify({'error': 'Invalid file type or no file selected'}), 400
         
     try:
-        # Save the file temporarily
-        temp_filename = str(uuid.uuid4()) + '.' + file.filename.rsplit('.', 1)[1].lower()
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], temp_filename)
-        file.save(filepath)
-        
-        # 1. Load Audio and Get Fs (uses pydub)
-        signal_time_series, Fs = load_audio_to_numpy(filepath)
+        # 1. Decode straight from the upload stream (in memory, or spilled by UploadRequest if large)
+        signal_time_series, Fs = load_audio_from_stream(file.stream, file.filename, current_app.config['UPLOAD_FOLDER'])
         
         if signal_time_series is None:
             return jsonify({'error': 'Could not process audio file. Check audio format/dependencies.'}), 500
         
-        # 2. Compute Initial DSP (uses custom_fft/spectrogram)
-        fft_data_full = custom_fft(signal_time_series)
-        frequencies, magnitudes_db, phases = get_fft_components(fft_data_full, Fs)
-        spectrogram_matrix = custom_spectrogram(signal_time_series, Fs)
+        # 2. Initial DSP (custom_fft/spectrogram), or the stored analysis of the same audio
+        artifact, reused = ANALYSIS_STORE.analyze(signal_time_series, Fs)
         
-        # 3. Cache Data 
+        # 3. Cache Data: a new signal_id with its own EQ state on the shared analysis
         signal_id = str(uuid.uuid4())
         
-        SIGNAL_CACHE[signal_id] = {
-            'Fs': Fs,
-            'time_series': signal_time_series, 
-            'input_fft': fft_data_full,        
-            'current_fft': fft_data_full,      # Output spectrum starts as input
-            'current_signal': signal_time_series, # Output signal starts as input
-            'output_path': None                
-        }
-        
-        # 4. Clean up the original uploaded file
-        os.remove(filepath)
-        
-        # 5. Prepare data for React visualization (chunking for large arrays)
-        sample_step = max(1, len(signal_time_series) // 2000)
+        SIGNAL_CACHE[signal_id] = artifact.signal_entry()
         
         return jsonify({
             'message': 'Signal loaded and processed successfully.',
             'signal_id': signal_id,
+            'analysis_id': artifact.digest,
+            'reused_analysis': reused,
             'Fs': Fs,
             'duration': len(signal_time_series) / Fs,
-            'data': {
-                'full_time_series': signal_time_series.tolist(), # <-- UPDATED TO SEND FULL ARRAY
-                'frequencies': frequencies.tolist(),
-                'magnitudes_db': magnitudes_db.tolist(),
-                'spectrogram_data': spectrogram_matrix.tolist()
-            }
+            'data': artifact.upload_payload() # full time series, magnitude plot and spectrogram
         }), 200
     
     
@@ -97,7 +110,8 @@ def download_output_signal():
     if not signal_id or signal_id not in SIGNAL_CACHE:
         return jsonify({'error': 'Signal ID not found or invalid.'}), 404
         
-    signal_data = SIGNAL_CACHE[signal_id]
+    # One committed version: a concurrent /apply cannot hand us a half-updated output
+    signal_data = SIGNAL_CACHE[signal_id].snapshot()
     
     try:
         # Generate temporary file path
@@ -125,4 +139,62 @@ def download_output_signal():
         
     except Exception as e:
         print(f"Server error during download: {e}")
-        return jsonify({'error': f'An unexpected error occurred during audio output: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'An unexpected error occurred during audio output: {str(e)}'}), 500
+
+
+# --- 5. /api/audio/upload_progressive (POST) ---
+# For long files: returns a signal_id at once (202) and decodes in the background.
+# The client polls /analysis_status for spectrogram columns and envelope bins as
+# they are computed; the signal joins SIGNAL_CACHE when the status is 'ready'.
+def _cache_ingested_signal(ingest):
+    SIGNAL_CACHE[ingest.signal_id] = ingest.artifact.signal_entry()
+
+
+def _prune_ingests():
+    with INGESTS_LOCK:
+        finished = [signal_id for signal_id, ingest in INGESTS.items() if ingest.status in (READY, FAILED)]
+        for signal_id in finished[:max(0, len(finished) - MAX_FINISHED_INGESTS)]:
+            del INGESTS[signal_id]
+
+
+@audio_bp.route('/upload_progressive', methods=['POST'])
+def upload_signal_progressive():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part in the request'}), 400
+
+    file = request.files['file']
+    if file.filename == '' or not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type or no file selected'}), 400
+
+    signal_id = str(uuid.uuid4())
+    ingest = SignalIngest(signal_id, file.filename, os.path.join(current_app.config['UPLOAD_FOLDER'], f"ingest_{signal_id}"))
+    # The ingest thread owns the upload from here on: detach it so request teardown does not close it
+    stream = file.stream
+    file.stream = io.BytesIO()
+
+    _prune_ingests()
+    with INGESTS_LOCK:
+        INGESTS[signal_id] = ingest
+    submit(ingest.run, stream, on_ready=_cache_ingested_signal)
+
+    return jsonify({
+        'message': 'Upload received; decoding in the background.',
+        'signal_id': signal_id,
+        'status_url': f"/api/audio/analysis_status?signal_id={signal_id}"
+    }), 202
+
+
+# --- 6. /api/audio/analysis_status (GET) ---
+# ?since_column=N&since_bin=M returns only the spectrogram columns / envelope
+# bins after the ones already received ('next_column' / 'next_bin').
+@audio_bp.route('/analysis_status', methods=['GET'])
+def analysis_status():
+    signal_id = request.args.get('signal_id')
+    with INGESTS_LOCK:
+        ingest = INGESTS.get(signal_id)
+    if ingest is None:
+        return jsonify({'error': 'Signal ID not found or invalid.'}), 404
+
+    since_column = request.args.get('since_column', 0, type=int)
+    since_bin = request.args.get('since_bin', 0, type=int)
+    return jsonify(ingest.status_dict(since_column, since_bin)), 200
@@ -1,5 +1,6 @@
-from flask import Blueprint, request, jsonify, current_app, send_from_directory
-import os, sys
+from flask import Blueprint, request, jsonify, current_app, send_from_directory, send_file
+import os, sys, io
+import soundfile as sf
 import numpy as np
 import time
 
@@ -13,9 +14,11 @@ from blueprints.audio_bp import SIGNAL_CACHE
 from custom_fft import custom_fft, custom_ifft, get_fft_components
 from spectrogram import custom_spectrogram
 from equalizer_core import apply_equalization
-from ai_separator import run_demucs_separation, run_speechbrain_separation, save_signal_to_temp
+from ai_separator import separate_music, separate_voices, separate_music_streaming
 from recombination_core import apply_eq_and_recombine, calculate_performance_metrics
 from utils.equalizer_core import calculate_static_output
+from executor import submit, StageTimer
+from separation_presets import preset_catalog
 equalizer_bp = Blueprint('equalizer_bp', __name__)
 
 # --- Helper to generate common response data (prevents code repetition) ---
@@ -28,9 +31,6 @@ def generate_viz_data(time_series, Fs, fft_data_full):
     # 2. Compute the new spectrogram
     spectrogram_matrix = custom_spectrogram(time_series, Fs)
 
-    # 3. Chunk the time series for fast visualization in the frontend
-    sample_step = max(1, len(time_series) // 2000)
-    
     return {
         'new_magnitudes_db': magnitudes_db.tolist(),
         'spectrogram_data': spectrogram_matrix.tolist(),
@@ -39,42 +39,52 @@ def generate_viz_data(time_series, Fs, fft_data_full):
 
 
 # --- 2. /api/equalizer/apply (POST) ---
+# Optional 'request_seq': any number that grows with each slider move (e.g. a
+# timestamp in ms). A request that arrives after a newer one was already applied
+# is dropped with 409 instead of overwriting it with an older scheme.
 @equalizer_bp.route('/apply', methods=['POST'])
 def apply_equalizer():
     data = request.get_json()
     signal_id = data.get('signal_id')
     equalization_scheme = data.get('equalization_scheme')
+    request_seq = data.get('request_seq')
 
     if not signal_id or signal_id not in SIGNAL_CACHE:
         return jsonify({'error': 'Signal ID not found or invalid.'}), 404
-        
-    if not equalization_scheme:
-        # If the scheme is empty, we just reconstruct the original signal
-        pass 
 
+    # An empty scheme reconstructs the original signal
     signal_data = SIGNAL_CACHE[signal_id]
     
+    # A. Equalize the current spectrum first, so a malformed band is rejected before it is stored
+    base = signal_data.snapshot()
     try:
-        # A. Apply Equalization to the Input FFT (using the new core utility)
-        new_fft_data = apply_equalization(
-            signal_data['input_fft'], signal_data['Fs'], equalization_scheme
-        )
-        
-        # B. Inverse FFT (IFFT) to get the new sound wave
-        new_time_series_complex = custom_ifft(new_fft_data)
-        
-        # C. Update Cache (The processed signal is now the 'current' signal)
-        # We take the real part as the original time series was real
-        new_time_series_real = new_time_series_complex.real
-        signal_data['current_fft'] = new_fft_data
-        signal_data['current_signal'] = new_time_series_real
+        equalized_fft = apply_equalization(base['input_fft'], base['Fs'], equalization_scheme or [])
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid equalization scheme: {e}'}), 400
+
+    try:
+        # B. Update Cache: only the scheme is stored, committed as a new version of the
+        # entry; the equalized spectrum (input FFT x band gains) and its IFFT are derived from it
+        state = signal_data.commit({'eq_scheme': equalization_scheme or []}, request_seq=request_seq)
+        if state is None:
+            return jsonify({
+                'error': 'A newer equalization was already applied to this signal; request dropped.',
+                'signal_id': signal_id,
+                'stale': True
+            }), 409
+
+        # C. Equalized spectrum and the new sound wave (real part, as the original time series was real),
+        # read from the committed version even if another request commits a newer one meanwhile
+        new_fft_data = equalized_fft if state.version == base.version + 1 else state['current_fft']
+        new_time_series_real = state['current_signal']
         
         # D. Generate Visualization Data
-        viz_data = generate_viz_data(new_time_series_real, signal_data['Fs'], new_fft_data)
+        viz_data = generate_viz_data(new_time_series_real, state['Fs'], new_fft_data)
         
         return jsonify({
             'message': 'Equalization applied successfully.',
             'signal_id': signal_id,
+            'version': state.version,
             **viz_data
         }), 200
 
@@ -121,9 +131,8 @@ def set_visualization_scale():
     if not signal_id or signal_id not in SIGNAL_CACHE:
         return jsonify({'error': 'Signal ID not found or invalid.'}), 404
         
-    signal_data = SIGNAL_CACHE[signal_id]
+    signal_data = SIGNAL_CACHE[signal_id].snapshot()
     Fs = signal_data['Fs']
-    N = len(signal_data['current_fft'])
     
     # --- STUB: Placeholder for Audiogram logic ---
     if scale_type == 'audiogram':
@@ -146,6 +155,159 @@ def set_visualization_scale():
     }), 200
 
 
+# --- AI Pipelines ---
+# Plain functions (no request context) shared by the synchronous routes below and
+# by the background job API in jobs_bp. Invalid modes raise ValueError.
+AI_SEPARATION_MODES = {'musical': separate_music, 'voices': separate_voices}
+AI_EQUALIZATION_MODES = {'musical': separate_music, 'voices': separate_voices, 'human': separate_voices}
+
+
+def _scaled_progress(progress_callback, start, end):
+    """ Maps a stage's 0-1 progress onto [start, end] of the overall pipeline. """
+    if progress_callback is None:
+        return None
+    return lambda fraction: progress_callback(start + (end - start) * fraction)
+
+
+def _separator_options(separator, preset):
+    """ Speed/quality presets only apply to Demucs (musical mode). """
+    return {'preset': preset} if separator is separate_music else {}
+
+
+def run_ai_separation(signal_data, mode_name, progress_callback=None, preset=None):
+    """ Separates the cached signal with the mode's AI model and stores the sources in the cache. """
+    separator = AI_SEPARATION_MODES.get(mode_name)
+    if separator is None:
+        raise ValueError('Invalid mode for AI separation.')
+
+    # 1. Run the AI model directly on the cached signal (no temp files)
+    state = signal_data.snapshot()
+    sources, source_sr = separator(
+        state['current_signal'], state['Fs'], progress_callback=progress_callback,
+        **_separator_options(separator, preset)
+    )
+
+    # 2. Store the separated sources in the cache (exported only on download)
+    signal_data.commit({'ai_sources': sources, 'ai_sources_sr': source_sr})
+
+    # 3. Return keys for the frontend to render playback buttons
+    return {
+        'message': f"AI Separation complete using {mode_name} model.",
+        'sources': list(sources.keys()) # e.g., ['vocals', 'drums', 'bass']
+    }
+
+
+def run_ai_separation_stream(signal_data, store_dir, progress_callback=None, preset=None):
+    """
+    Streaming Demucs separation: stems are appended segment by segment to a
+    StemStreamStore kept in the cache as 'ai_stream', so the completed prefix can
+    be downloaded and equalized before the whole track is done.
+    """
+    previous = signal_data.get('ai_stream')
+    if previous is not None and (previous.complete or previous.error):
+        previous.delete()
+
+    def _publish(store):
+        signal_data['ai_stream'] = store
+
+    def _progress(fraction):
+        if progress_callback is None:
+            return
+        store = signal_data.get('ai_stream')
+        seconds = store.available_samples / store.sample_rate if store is not None else 0.0
+        progress_callback(fraction, f"{seconds:.1f}s of stems ready")
+
+    state = signal_data.snapshot()
+    store = separate_music_streaming(
+        state['current_signal'], state['Fs'], store_dir,
+        progress_callback=_progress, on_ready=_publish, preset=preset
+    )
+    return {
+        'message': "Streaming AI Separation complete using musical model.",
+        **store.status()
+    }
+
+
+def run_stream_equalization(signal_data, eq_scheme):
+    """ Equalizes and recombines the completed prefix of the streaming stems. """
+    store = signal_data.get('ai_stream')
+    if store is None:
+        raise ValueError('No streaming separation has been started for this signal.')
+    if store.available_samples == 0:
+        return {'ai_time_series': [], **store.status()}
+
+    reconstructed_signal = apply_eq_and_recombine(
+        store.snapshot(), signal_data['Fs'], eq_scheme, source_sr=store.sample_rate
+    )
+    return {
+        'ai_time_series': reconstructed_signal.tolist(),
+        **store.status()
+    }
+
+
+def run_ai_equalization(signal_id, signal_data, mode_name, eq_scheme, progress_callback=None, preset=None):
+    """ Static EQ vs. AI-separated EQ comparison; returns the frontend response payload. """
+    # Validated before any work is handed to the pool
+    separator = AI_EQUALIZATION_MODES.get(mode_name)
+    if separator is None:
+        raise ValueError('Invalid preset. Must be Musical or Human.')
+
+    state = signal_data.snapshot()
+    Fs = state['Fs']
+    input_time_series = state['current_signal']
+    timer = StageTimer()
+
+    def _static_baseline():
+        with timer.stage('static_baseline'):
+            return calculate_static_output(input_time_series, Fs, eq_scheme)
+
+    def _visualization(reconstructed_signal):
+        # We need FFT for the graph, but NOT for the metric comparison
+        with timer.stage('visualization'):
+            reconstructed_fft = custom_fft(reconstructed_signal)
+            frequencies, magnitudes_db, phases = get_fft_components(reconstructed_fft, Fs)
+            return frequencies, magnitudes_db
+
+    # --- 0. Static Baseline (Time Domain) ---
+    # Runs on the shared pool while the AI model separates the sources
+    static_future = submit(_static_baseline)
+
+    # --- 1. AI Separation ---
+    with timer.stage('separation'):
+        sources, source_sr = separator(
+            input_time_series, Fs, progress_callback=_scaled_progress(progress_callback, 0.0, 0.8),
+            **_separator_options(separator, preset)
+        )
+
+    # --- 2. Custom Equalization & Recombination (Time Domain) ---
+    with timer.stage('recombination'):
+        reconstructed_signal = apply_eq_and_recombine(sources, Fs, eq_scheme, source_sr=source_sr)
+    if progress_callback is not None:
+        progress_callback(0.9)
+
+    # --- 3. Visualization Data (concurrently with the metrics) ---
+    viz_future = submit(_visualization, reconstructed_signal)
+
+    # --- 4. Metric Calculation ---
+    # FIX IS HERE: Use reconstructed_signal (Time) vs static_time_series (Time)
+    static_time_series = static_future.result()
+    with timer.stage('metrics'):
+        performance_metrics = calculate_performance_metrics(static_time_series, reconstructed_signal)
+    frequencies, magnitudes_db = viz_future.result()
+
+    timer.report('equalize_with_ai')
+
+    # --- 5. Return Frontend Format ---
+    return {
+        'signal_id': signal_id,
+        'ai_frequency_arr': frequencies.tolist(),
+        'ai_magnitude_arr': magnitudes_db.tolist(),
+        'ai_time_series': reconstructed_signal.tolist(), 
+        'performance': performance_metrics,
+        'timings': timer.as_dict()
+    }
+
+
 # --- NEW ENDPOINT 1: /api/equalizer/separate_ai (POST) ---
 
 @equalizer_bp.route('/separate_ai', methods=['POST'])
@@ -153,48 +315,18 @@ def separate_with_ai():
     data = request.get_json()
     signal_id = data.get('signal_id')
     mode_name = data.get('mode_name') # Should be 'musical' or 'voices'
+    preset = data.get('separation_preset') # 'fast', 'balanced' or 'best' (musical only)
 
     if not signal_id or signal_id not in SIGNAL_CACHE:
         return jsonify({'error': 'Signal ID not found or invalid.'}), 404
         
     signal_data = SIGNAL_CACHE[signal_id]
     
-    # 1. RETRIEVE UPLOAD FOLDER PATH (Correct way)
-    UPLOAD_FOLDER = current_app.config['UPLOAD_FOLDER'] 
-    Fs = signal_data['Fs']
-    time_series = signal_data['current_signal']
-    
     try:
-        # 2. Save the signal from cache to a temporary file for AI input
-        temp_input_path = save_signal_to_temp(time_series, Fs, signal_id, UPLOAD_FOLDER)
-        
-        # Create a unique sub-folder for this signal's AI outputs
-        output_dir = os.path.join(UPLOAD_FOLDER, signal_id)
-        os.makedirs(output_dir, exist_ok=True)
-
-        # 3. Determine which AI model to run
-        if mode_name == 'musical':
-            source_paths = run_demucs_separation(temp_input_path, Fs, output_dir)
-            
-        elif mode_name == 'voices':
-            source_paths = run_speechbrain_separation(temp_input_path, Fs, output_dir)
-            
-        else:
-            os.remove(temp_input_path)
-            return jsonify({'error': 'Invalid mode for AI separation.'}), 400
-
-        # 4. Store the output source file paths in the cache
-        signal_data['ai_sources'] = source_paths
-        
-        # 5. Cleanup temporary AI input file
-        os.remove(temp_input_path) 
-        
-        # 6. Return keys for the frontend to render playback buttons
-        return jsonify({
-            'message': f"AI Separation complete using {mode_name} model.",
-            'sources': list(source_paths.keys()) # e.g., ['vocals', 'drums', 'bass']
-        }), 200
+        return jsonify(run_ai_separation(signal_data, mode_name, preset=preset)), 200
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error during AI separation: {e}")
         return jsonify({'error': f'AI separation failed: {str(e)}'}), 500
@@ -212,21 +344,32 @@ def download_ai_source():
         
     signal_data = SIGNAL_CACHE[signal_id]
     
-    if 'ai_sources' not in signal_data or source_key not in signal_data['ai_sources']:
+    stream = signal_data.get('ai_stream')
+    if source_key in signal_data.get('ai_sources', {}):
+        source_audio = signal_data['ai_sources'][source_key]
+        source_sr = signal_data['ai_sources_sr']
+    elif stream is not None and source_key in stream.source_names:
+        # Streaming separation: serve the prefix that is already complete
+        source_audio = np.clip(stream.read(source_key), -1.0, 1.0)
+        source_sr = stream.sample_rate
+    else:
         return jsonify({'error': f'AI source "{source_key}" not found for this signal.'}), 404
-        
-    source_filepath = signal_data['ai_sources'][source_key]
-    output_filename = os.path.basename(source_filepath)
     
     try:
-        # Serve the file for streaming
-        response = send_from_directory(
-            directory=os.path.dirname(source_filepath),
-            path=output_filename,
-            as_attachment=False, 
-            mimetype='audio/wav'
-        )
+        # Encode the in-memory source as a WAV and serve it for streaming
+        wav_buffer = io.BytesIO()
+        sf.write(wav_buffer, source_audio, int(source_sr), format='WAV', subtype='PCM_16')
+        wav_buffer.seek(0)
         
+        response = send_file(
+            wav_buffer,
+            mimetype='audio/wav',
+            as_attachment=False,
+            download_name=f"{source_key}.wav"
+        )
+        if stream is not None and source_key not in signal_data.get('ai_sources', {}):
+            response.headers['X-Available-Seconds'] = str(stream.status()['available_seconds'])
+            response.headers['X-Stream-Complete'] = str(stream.complete).lower()
         return response
         
     except Exception as e:
@@ -234,69 +377,7 @@ def download_ai_source():
         return jsonify({'error': f'An unexpected error occurred during audio output: {str(e)}'}), 500
     
 
-# # --- NEW ENDPOINT: /api/equalizer/equalize_with_ai (POST) ---
-# @equalizer_bp.route('/equalize_with_ai', methods=['POST'])
-# def equalize_with_ai_comparison():
-#     data = request.get_json()
-#     signal_id = data.get('signal_id')
-#     customized_mode_preset = data.get('customized_mode_preset')
-#     mode_name = customized_mode_preset.lower() if customized_mode_preset else None # e.g., 'musical'
-#     eq_scheme = data.get('equalizer_scheme')
-
-#     if not signal_id or signal_id not in SIGNAL_CACHE:
-#         return jsonify({'error': 'Signal ID not found or invalid.'}), 404
-        
-#     if not customized_mode_preset or not mode_name:
-#         return jsonify({'error': 'Customized mode preset is missing or invalid.'}), 400
-        
-#     if not eq_scheme:
-#         return jsonify({'error': 'Equalization scheme is missing.'}), 400
-        
-#     signal_data = SIGNAL_CACHE[signal_id]
-#     UPLOAD_FOLDER = current_app.config['UPLOAD_FOLDER'] 
-#     Fs = signal_data['Fs']
-    
-#     # Use the current signal (if it has been previously equalized, otherwise uses input)
-#     input_time_series = signal_data['current_signal']
-    
-#     try:
-#         static_time_series = calculate_static_output(input_time_series, Fs, eq_scheme)
-#         # --- 1. AI Separation ---
-#         temp_input_path = save_signal_to_temp(input_time_series, Fs, signal_id, UPLOAD_FOLDER)
-#         output_dir = os.path.join(UPLOAD_FOLDER, signal_id, f"ai_run_{int(time.time())}") # Unique folder for this run
-#         os.makedirs(output_dir, exist_ok=True)
-
-#         if mode_name == 'musical':
-#             source_paths = run_demucs_separation(temp_input_path, Fs, output_dir)
-#         elif mode_name == 'human' or mode_name == 'voices':
-#             source_paths = run_speechbrain_separation(temp_input_path, Fs, output_dir)
-#         else:
-#             os.remove(temp_input_path)
-#             return jsonify({'error': 'Invalid preset. Must be Musical or Human.'}), 400
-
-#         # --- 2. Custom Equalization & Recombination ---
-#         reconstructed_signal = apply_eq_and_recombine(source_paths, Fs, eq_scheme, UPLOAD_FOLDER)
-        
-#         # --- 3. Visualization Data for the Reconstructed Signal ---
-#         reconstructed_fft = custom_fft(reconstructed_signal)
-#         frequencies, magnitudes_db, phases = get_fft_components(reconstructed_fft, Fs)
-        
-#         # --- 4. Metric Calculation (Placeholder) ---
-#         performance_metrics = calculate_performance_metrics(static_time_series, reconstructed_fft)
-        
-#         # --- 5. Return Frontend Format ---
-#         return jsonify({
-#             'signal_id': signal_id,
-#             'ai_frequency_arr': frequencies.tolist(),
-#             'ai_magnitude_arr': magnitudes_db.tolist(),
-#             'ai_time_series': reconstructed_signal.tolist(), # Full time series for cine viewer
-#             'performance': performance_metrics
-#         }), 200
-
-#     except Exception as e:
-#         print(f"Error in equalize_with_ai: {e}")
-#         return jsonify({'error': f'An unexpected error occurred during AI comparison: {str(e)}'}), 500    
-
+# --- /api/equalizer/equalize_with_ai (POST) ---
 @equalizer_bp.route('/equalize_with_ai', methods=['POST'])
 def equalize_with_ai_comparison():
     data = request.get_json()
@@ -304,60 +385,65 @@ def equalize_with_ai_comparison():
     customized_mode_preset = data.get('customized_mode_preset')
     mode_name = customized_mode_preset.lower() if customized_mode_preset else None
     eq_scheme = data.get('equalizer_scheme')
+    preset = data.get('separation_preset')
 
     if not signal_id or signal_id not in SIGNAL_CACHE:
         return jsonify({'error': 'Signal ID not found or invalid.'}), 404
         
-    if not customized_mode_preset or not mode_name:
-        return jsonify({'error': 'Customized mode preset is missing or invalid.'}), 400
+    if not customized_mode_preset or mode_name not in AI_EQUALIZATION_MODES:
+        return jsonify({'error': 'Invalid preset. Must be Musical or Human.'}), 400
         
     if not eq_scheme:
         return jsonify({'error': 'Equalization scheme is missing.'}), 400
         
     signal_data = SIGNAL_CACHE[signal_id]
-    # Ensure you are importing os, time, current_app, etc.
-    UPLOAD_FOLDER = current_app.config['UPLOAD_FOLDER'] 
-    Fs = signal_data['Fs']
-    input_time_series = signal_data['current_signal']
     
     try:
-        # --- 0. Static Baseline (Time Domain) ---
-        static_time_series = calculate_static_output(input_time_series, Fs, eq_scheme)
-
-        # --- 1. AI Separation ---
-        temp_input_path = save_signal_to_temp(input_time_series, Fs, signal_id, UPLOAD_FOLDER)
-        output_dir = os.path.join(UPLOAD_FOLDER, signal_id, f"ai_run_{int(time.time())}") 
-        os.makedirs(output_dir, exist_ok=True)
-
-        if mode_name == 'musical':
-            source_paths = run_demucs_separation(temp_input_path, Fs, output_dir)
-        elif mode_name in ['human', 'voices']: # Flexible check
-            source_paths = run_speechbrain_separation(temp_input_path, Fs, output_dir)
-        else:
-            if os.path.exists(temp_input_path): os.remove(temp_input_path)
-            return jsonify({'error': 'Invalid preset. Must be Musical or Human.'}), 400
-
-        # --- 2. Custom Equalization & Recombination (Time Domain) ---
-        reconstructed_signal = apply_eq_and_recombine(source_paths, Fs, eq_scheme, UPLOAD_FOLDER)
-        
-        # --- 3. Visualization Data ---
-        # We need FFT for the graph, but NOT for the metric comparison
-        reconstructed_fft = custom_fft(reconstructed_signal)
-        frequencies, magnitudes_db, phases = get_fft_components(reconstructed_fft, Fs)
-        
-        # --- 4. Metric Calculation ---
-        # FIX IS HERE: Use reconstructed_signal (Time) vs static_time_series (Time)
-        performance_metrics = calculate_performance_metrics(static_time_series, reconstructed_signal)
-        
-        # --- 5. Return Frontend Format ---
-        return jsonify({
-            'signal_id': signal_id,
-            'ai_frequency_arr': frequencies.tolist(),
-            'ai_magnitude_arr': magnitudes_db.tolist(),
-            'ai_time_series': reconstructed_signal.tolist(), 
-            'performance': performance_metrics
-        }), 200
+        return jsonify(run_ai_equalization(signal_id, signal_data, mode_name, eq_scheme, preset=preset)), 200
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error in equalize_with_ai: {e}")
-        return jsonify({'error': f'An unexpected error occurred: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'An unexpected error occurred: {str(e)}'}), 500
+
+
+# --- NEW ENDPOINT 3: /api/equalizer/equalize_stream (POST) ---
+# Equalizes the stems of a running streaming separation (started through
+# /api/jobs/separate_ai_stream) up to the point they are already available.
+@equalizer_bp.route('/equalize_stream', methods=['POST'])
+def equalize_stream_prefix():
+    data = request.get_json()
+    signal_id = data.get('signal_id')
+    eq_scheme = data.get('equalizer_scheme')
+
+    if not signal_id or signal_id not in SIGNAL_CACHE:
+        return jsonify({'error': 'Signal ID not found or invalid.'}), 404
+
+    if not eq_scheme:
+        return jsonify({'error': 'Equalization scheme is missing.'}), 400
+
+    try:
+        return jsonify(run_stream_equalization(SIGNAL_CACHE[signal_id], eq_scheme)), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in equalize_stream: {e}")
+        return jsonify({'error': f'An unexpected error occurred: {str(e)}'}), 500
+
+
+# --- NEW ENDPOINT 4: /api/equalizer/separation_presets (GET) ---
+# Lists the Demucs speed/quality presets with the real-time factor measured on
+# this host; with a signal_id, also the expected wait for that signal.
+@equalizer_bp.route('/separation_presets', methods=['GET'])
+def list_separation_presets():
+    signal_id = request.args.get('signal_id')
+    duration = None
+    if signal_id:
+        if signal_id not in SIGNAL_CACHE:
+            return jsonify({'error': 'Signal ID not found or invalid.'}), 404
+        signal_data = SIGNAL_CACHE[signal_id].snapshot()
+        duration = len(signal_data['time_series']) / signal_data['Fs']
+
+    return jsonify({'presets': preset_catalog(duration)}), 200
@@ -0,0 +1,176 @@
+# Backend/blueprints/jobs_bp.py
+
+from flask import Blueprint, request, jsonify, current_app
+import os, sys, time
+
+# --- 1. Utility Imports ---
+# Configure paths to import utils correctly
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+from blueprints.audio_bp import SIGNAL_CACHE
+from blueprints.equalizer_bp import (
+    run_ai_separation, run_ai_equalization, run_ai_separation_stream, AI_SEPARATION_MODES, AI_EQUALIZATION_MODES
+)
+from job_manager import JOB_MANAGER, FINISHED_STATES, COMPLETED
+from separation_presets import resolve_preset
+
+jobs_bp = Blueprint('jobs_bp', __name__)
+
+# Asynchronous versions of /api/equalizer/separate_ai and /equalize_with_ai:
+# submit returns a job_id right away (202), the client polls /<job_id> for
+# status and progress, then fetches /<job_id>/result.
+
+
+def _separation_job(job, signal_data, mode_name, preset):
+    return run_ai_separation(signal_data, mode_name, progress_callback=job.report_progress, preset=preset)
+
+
+def _equalization_job(job, signal_id, signal_data, mode_name, eq_scheme, preset):
+    return run_ai_equalization(
+        signal_id, signal_data, mode_name, eq_scheme, progress_callback=job.report_progress, preset=preset
+    )
+
+
+def _stream_separation_job(job, signal_data, store_dir, preset):
+    return run_ai_separation_stream(signal_data, store_dir, progress_callback=job.report_progress, preset=preset)
+
+
+def _check_preset(preset):
+    """ Returns an error response for an unknown separation preset, else None. """
+    try:
+        resolve_preset(preset)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return None
+
+
+def _accepted(job):
+    return jsonify({
+        'message': 'Job submitted.',
+        'job_id': job.id,
+        'status_url': f"/api/jobs/{job.id}",
+        'result_url': f"/api/jobs/{job.id}/result"
+    }), 202
+
+
+# --- 2. /api/jobs/separate_ai (POST) ---
+@jobs_bp.route('/separate_ai', methods=['POST'])
+def submit_separation():
+    data = request.get_json()
+    signal_id = data.get('signal_id')
+    mode_name = data.get('mode_name') # Should be 'musical' or 'voices'
+    preset = data.get('separation_preset')
+
+    if not signal_id or signal_id not in SIGNAL_CACHE:
+        return jsonify({'error': 'Signal ID not found or invalid.'}), 404
+
+    if mode_name not in AI_SEPARATION_MODES:
+        return jsonify({'error': 'Invalid mode for AI separation.'}), 400
+
+    invalid = _check_preset(preset)
+    if invalid:
+        return invalid
+
+    job = JOB_MANAGER.submit(
+        'separate_ai', _separation_job, SIGNAL_CACHE[signal_id], mode_name, preset,
+        params={'signal_id': signal_id, 'mode_name': mode_name, 'separation_preset': preset}
+    )
+    return _accepted(job)
+
+
+# --- 3. /api/jobs/equalize_with_ai (POST) ---
+@jobs_bp.route('/equalize_with_ai', methods=['POST'])
+def submit_equalization():
+    data = request.get_json()
+    signal_id = data.get('signal_id')
+    customized_mode_preset = data.get('customized_mode_preset')
+    mode_name = customized_mode_preset.lower() if customized_mode_preset else None
+    eq_scheme = data.get('equalizer_scheme')
+    preset = data.get('separation_preset')
+
+    if not signal_id or signal_id not in SIGNAL_CACHE:
+        return jsonify({'error': 'Signal ID not found or invalid.'}), 404
+
+    if mode_name not in AI_EQUALIZATION_MODES:
+        return jsonify({'error': 'Invalid preset. Must be Musical or Human.'}), 400
+
+    if not eq_scheme:
+        return jsonify({'error': 'Equalization scheme is missing.'}), 400
+
+    invalid = _check_preset(preset)
+    if invalid:
+        return invalid
+
+    job = JOB_MANAGER.submit(
+        'equalize_with_ai', _equalization_job, signal_id, SIGNAL_CACHE[signal_id], mode_name, eq_scheme, preset,
+        params={'signal_id': signal_id, 'mode_name': mode_name, 'separation_preset': preset}
+    )
+    return _accepted(job)
+
+
+# --- 4. /api/jobs/separate_ai_stream (POST) ---
+# Musical separation in fixed-length segments: while the job runs, the finished
+# prefix is served by /api/equalizer/download_source and /equalize_stream, and
+# the job message reports how many seconds of stems are ready.
+@jobs_bp.route('/separate_ai_stream', methods=['POST'])
+def submit_stream_separation():
+    data = request.get_json()
+    signal_id = data.get('signal_id')
+    preset = data.get('separation_preset')
+
+    if not signal_id or signal_id not in SIGNAL_CACHE:
+        return jsonify({'error': 'Signal ID not found or invalid.'}), 404
+
+    invalid = _check_preset(preset)
+    if invalid:
+        return invalid
+
+    store_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], signal_id, f"ai_stream_{int(time.time() * 1000)}")
+    job = JOB_MANAGER.submit(
+        'separate_ai_stream', _stream_separation_job, SIGNAL_CACHE[signal_id], store_dir, preset,
+        params={'signal_id': signal_id, 'mode_name': 'musical', 'separation_preset': preset}
+    )
+    return _accepted(job)
+
+
+# --- 5. /api/jobs/<job_id> (GET) ---
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    return jsonify(job.to_dict()), 200
+
+
+# --- 6. /api/jobs/<job_id>/result (GET) ---
+@jobs_bp.route('/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+
+    if job.status not in FINISHED_STATES:
+        return jsonify({'error': 'Job has not finished yet.', **job.to_dict()}), 409
+
+    if job.status != COMPLETED:
+        return jsonify({'error': job.error or f'Job {job.status}.', **job.to_dict()}), 410
+
+    result_json = job.result_json
+    if result_json is None:
+        return jsonify({'error': 'Job result expired; submit the job again.', **job.to_dict()}), 410
+
+    return current_app.response_class(result_json, status=200, mimetype='application/json')
+
+
+# --- 7. /api/jobs/<job_id>/cancel (POST) ---
+@jobs_bp.route('/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+
+    if not JOB_MANAGER.cancel(job_id):
+        return jsonify({'error': f'Job already {job.status}.', **job.to_dict()}), 409
+
+    return jsonify({'message': 'Cancellation requested.', **job.to_dict()}), 202
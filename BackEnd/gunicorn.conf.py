@@ -0,0 +1,44 @@
+# Backend/gunicorn.conf.py
+#
+# Multi-process serving (Linux/macOS):  pip install gunicorn
+#     cd BackEnd && gunicorn -c gunicorn.conf.py
+#
+# With preload_app the master runs create_app() and loads the separation models
+# once; the forked workers then share the weight pages copy-on-write instead of
+# each holding its own copy. /metrics reports each worker's RSS/PSS.
+#
+# One worker by default. Signals move to the shared store (SIGNAL_STORE=shared)
+# when WEB_WORKERS > 1, but background jobs (/api/jobs), progressive uploads
+# (/api/audio/upload_progressive) and streamed stems are still kept by the
+# worker that started them (see shared_signal_store's 'local' values): a poll
+# reaching another worker gets 404. The synchronous routes (upload, /apply,
+# downloads, blocking AI separation) work on any worker; if the others are
+# used, put the workers behind a load balancer with sticky sessions (e.g.
+# nginx ip_hash).
+import os
+import sys
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', 1))
+threads = int(os.environ.get('WEB_THREADS', 4))
+timeout = int(os.environ.get('WEB_TIMEOUT', 600))   # separations of long files take minutes
+wsgi_app = 'app:create_app()'
+
+if workers > 1:
+    os.environ.setdefault('SIGNAL_STORE', 'shared')
+
+preload_app = os.environ.get('FORK_SHARED_MODELS', '1') == '1'
+if preload_app:
+    os.environ['FORK_SHARED_MODELS'] = '1'
+
+
+def post_fork(server, worker):
+    ai_separator = sys.modules.get('ai_separator')
+    if ai_separator is None or not preload_app:
+        return
+    # Split the cores between the workers instead of every worker using all of them
+    torch_threads = os.environ.get('TORCH_THREADS_PER_WORKER')
+    torch_threads = int(torch_threads) if torch_threads else max(1, (os.cpu_count() or 1) // workers)
+    ai_separator.torch.set_num_threads(torch_threads)
+    ai_separator.MODEL_REGISTRY.after_fork(warmup=os.environ.get('MODEL_WARMUP', '1') == '1')
+    server.log.info(f"Worker {worker.pid}: sharing preloaded models, {torch_threads} torch threads")
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+import soundfile as sf
+import torch
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+from ai_separator import MODEL_REGISTRY, DEMUCS_MODEL_NAME, _import_apply_model
+from resampler import resample
+
+# --- CONFIGURATION ---
+MUSIC_INPUT = os.path.join(BASE_DIR, 'input', 'audio_example.mp3')
+CLIP_SECONDS = 20
+CONCURRENT_REQUESTS = 4
+BATCH_SIZES = [1, 2, 4, 8]
+BATCH_WAIT_MS = 20
+
+
+def load_clip(path, target_sr):
+    """ First CLIP_SECONDS of the file as a [1, 2, samples] tensor at target_sr. """
+    wav, sr = sf.read(path, dtype='float32', always_2d=True)
+    wav = resample(wav.T, sr, target_sr)[:, :CLIP_SECONDS * target_sr]
+    if wav.shape[0] == 1:
+        wav = np.repeat(wav, 2, axis=0)
+    return torch.from_numpy(np.ascontiguousarray(wav[:2])).unsqueeze(0)
+
+
+def run_concurrent(apply_model, model, clip):
+    """ Separates the clip from CONCURRENT_REQUESTS threads at once, like simultaneous /separate_ai calls. """
+    def _request():
+        with torch.no_grad():
+            apply_model(model, clip, device='cpu', split=True, overlap=0.25, progress=False)
+
+    threads = [threading.Thread(target=_request) for _ in range(CONCURRENT_REQUESTS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    apply_model = _import_apply_model()
+    model = MODEL_REGISTRY.load(DEMUCS_MODEL_NAME, warmup=True)
+    clip = load_clip(MUSIC_INPUT, model.samplerate)
+    audio_seconds = CLIP_SECONDS * CONCURRENT_REQUESTS
+
+    print(f"\n--- {CONCURRENT_REQUESTS} concurrent requests x {CLIP_SECONDS}s, "
+          f"{BATCH_WAIT_MS} ms window, {torch.get_num_threads()} threads ---")
+    print(f"{'batch':>5} {'wall (s)':>9} {'audio s / s':>12} {'speedup':>8} {'mean batch':>11}")
+
+    serial_wall = None
+    for batch_size in BATCH_SIZES:
+        MODEL_REGISTRY.configure_batching(batch_size, BATCH_WAIT_MS)
+        before = MODEL_REGISTRY.batching_stats().get(f"{DEMUCS_MODEL_NAME}:{MODEL_REGISTRY.default_variant}", {})
+        wall = run_concurrent(apply_model, model, clip)
+        after = MODEL_REGISTRY.batching_stats()[f"{DEMUCS_MODEL_NAME}:{MODEL_REGISTRY.default_variant}"]
+
+        batches = after['batches'] - before.get('batches', 0)
+        items = after['items'] - before.get('items', 0)
+        serial_wall = serial_wall or wall
+        print(f"{batch_size:>5} {wall:>9.2f} {audio_seconds / wall:>12.2f} "
+              f"{serial_wall / wall:>7.2f}x {items / max(batches, 1):>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
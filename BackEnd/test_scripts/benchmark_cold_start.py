@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+# --- Configure paths ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# --- CONFIGURATION ---
+RUNS = 5
+HEAVY_MODULES = ['torch', 'torchaudio', 'demucs', 'librosa', 'scipy', 'numba', 'asteroid']
+# Every run is appended here, so start-up regressions show up across commits
+HISTORY_FILE = os.path.join(BASE_DIR, 'cache', 'benchmarks', 'cold_start.jsonl')
+
+# Runs in a fresh interpreter: times the blueprint imports and create_app() separately
+PROBE = r"""
+import json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, os.getcwd())
+import app as app_module
+imported = time.perf_counter()
+app_module.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - start,
+    'create_app_s': created - imported,
+    'modules': [name for name in HEAVY_MODULES if name in sys.modules],
+}))
+"""
+
+
+def run_probe(env):
+    """ One cold start in a subprocess; returns the probe's timings and the heavy modules it imported. """
+    code = f"HEAVY_MODULES = {HEAVY_MODULES!r}\n" + PROBE
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_s'] = wall
+    return timings
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    # No preload and no background warm-up: measures what create_app() itself costs
+    env = dict(os.environ, PRELOAD_MODELS='', BACKGROUND_WARMUP='0')
+    runs = [run_probe(env) for _ in range(RUNS)]
+
+    print(f"\n--- create_app() cold start, {RUNS} fresh processes ---")
+    print(f"{'run':>3} {'import (s)':>11} {'create_app (s)':>15} {'process (s)':>12}")
+    for i, r in enumerate(runs, 1):
+        print(f"{i:>3} {r['import_s']:>11.3f} {r['create_app_s']:>15.3f} {r['process_s']:>12.3f}")
+
+    best = min(runs, key=lambda r: r['import_s'] + r['create_app_s'])
+    heavy = runs[0]['modules']
+    print(f"Best: {best['import_s'] + best['create_app_s']:.3f}s to a ready app object")
+    print(f"Heavy modules imported at start-up: {', '.join(heavy) if heavy else 'none'}")
+
+    os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+    with open(HISTORY_FILE, 'a') as f:
+        f.write(json.dumps({
+            'timestamp': time.time(),
+            'revision': git_revision(),
+            'import_s': round(best['import_s'], 4),
+            'create_app_s': round(best['create_app_s'], 4),
+            'heavy_modules': heavy,
+        }) + '\n')
+    print(f"Appended to {HISTORY_FILE}")
+
+
+if __name__ == '__main__':
+    main()
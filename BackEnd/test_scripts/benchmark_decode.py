@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import soundfile as sf
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+from audio_util import load_audio_to_numpy, _read_librosa
+
+# --- CONFIGURATION ---
+MUSIC_INPUT = os.path.join(BASE_DIR, 'test_scripts', 'audio_example.mp3')
+LONG_SECONDS = 600   # a 10 minute upload
+SAMPLE_RATE = 44100
+
+
+def time_call(fn, path):
+    start = time.perf_counter()
+    signal, Fs = fn(path)
+    return time.perf_counter() - start, signal
+
+
+def main():
+    rng = np.random.default_rng(0)
+    stereo = rng.uniform(-0.5, 0.5, (LONG_SECONDS * SAMPLE_RATE, 2)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {
+            f'{LONG_SECONDS}s WAV (PCM_16)': os.path.join(tmp, 'long.wav'),
+            f'{LONG_SECONDS}s FLAC': os.path.join(tmp, 'long.flac'),
+            'example MP3': MUSIC_INPUT,
+        }
+        sf.write(files[f'{LONG_SECONDS}s WAV (PCM_16)'], stereo, SAMPLE_RATE, subtype='PCM_16')
+        sf.write(files[f'{LONG_SECONDS}s FLAC'], stereo, SAMPLE_RATE)
+
+        _read_librosa(MUSIC_INPUT)   # import librosa outside the timed region
+        print(f"\n{'file':>22} {'librosa (s)':>12} {'dispatcher (s)':>15} {'speedup':>8} {'max diff':>10}")
+        for label, path in files.items():
+            librosa_s, reference = time_call(_read_librosa, path)
+            fast_s, signal = time_call(load_audio_to_numpy, path)
+            n = min(len(reference), len(signal))
+            diff = float(np.max(np.abs(reference[:n] - signal[:n]))) if n else 0.0
+            print(f"{label:>22} {librosa_s:>12.3f} {fast_s:>15.3f} {librosa_s / fast_s:>7.1f}x {diff:>10.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import subprocess
+import urllib.request
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+from process_memory import memory_report, child_pids
+
+# --- CONFIGURATION ---
+WORKERS = 4
+PORT = 5057
+MODELS = 'htdemucs,multidecoder_dprnn'
+READY_TIMEOUT_S = 600
+
+
+def wait_ready(master):
+    """ Polls /ready until every worker answers 200 a few times in a row (or the master dies). """
+    deadline = time.time() + READY_TIMEOUT_S
+    streak = 0
+    while time.time() < deadline and master.poll() is None:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{PORT}/ready", timeout=5) as response:
+                streak = streak + 1 if response.status == 200 else 0
+        except Exception:
+            streak = 0
+        if streak >= WORKERS * 2:
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def measure(shared):
+    """ Starts gunicorn with or without the preloaded master and reports every process's memory. """
+    env = dict(
+        os.environ,
+        BIND=f"127.0.0.1:{PORT}",
+        WEB_WORKERS=str(WORKERS),
+        FORK_SHARED_MODELS='1' if shared else '0',
+        PRELOAD_MODELS=MODELS,
+        PRELOAD_BACKGROUND='0',
+    )
+    master = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=BASE_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(master):
+            raise RuntimeError("gunicorn did not become ready")
+        time.sleep(2)
+        return memory_report(master.pid), [memory_report(pid) for pid in child_pids(master.pid)]
+    finally:
+        master.terminate()
+        master.wait()
+
+
+def main():
+    print(f"\n--- {WORKERS} gunicorn workers serving {MODELS} ---")
+    for shared in (False, True):
+        master, workers = measure(shared)
+        label = 'preloaded in master (copy-on-write)' if shared else 'loaded per worker'
+        print(f"\n{label}")
+        print(f"{'process':>10} {'RSS (MB)':>9} {'PSS (MB)':>9} {'shared':>8} {'private':>8}")
+        for name, report in [('master', master)] + [(f"worker {i}", w) for i, w in enumerate(workers, 1)]:
+            print(f"{name:>10} {report.get('rss_mb', 0):>9.1f} {report.get('pss_mb', 0):>9.1f} "
+                  f"{report.get('shared_mb', 0):>8.1f} {report.get('private_mb', 0):>8.1f}")
+        total_pss = master.get('pss_mb', 0) + sum(w.get('pss_mb', 0) for w in workers)
+        print(f"{'total PSS':>10} {total_pss:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
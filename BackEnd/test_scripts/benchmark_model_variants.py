@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import numpy as np
+import soundfile as sf
+import torch
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+from ai_separator import (
+    MODEL_REGISTRY, MODEL_VARIANTS, DEMUCS_MODEL_NAME, VOICE_MODEL_NAME, VOICE_MODEL_SAMPLE_RATE
+)
+from resampler import resample
+from voice_separator import separate_long_recording
+
+# --- CONFIGURATION ---
+MUSIC_INPUT = os.path.join(BASE_DIR, 'input', 'audio_example.mp3')
+VOICE_INPUT = os.path.join(BASE_DIR, 'input', '5_mixture.wav')
+REPEATS = 3
+
+
+def load_mixture(path, target_sr):
+    """ Reads a file as (channels, samples) float32 at target_sr. """
+    wav, sr = sf.read(path, dtype='float32', always_2d=True)
+    return resample(wav.T, sr, target_sr).astype(np.float32)
+
+
+def sdr(reference, estimate):
+    """ Signal-to-distortion ratio (dB) of estimate against reference. """
+    min_len = min(reference.shape[-1], estimate.shape[-1])
+    reference, estimate = reference[..., :min_len], estimate[..., :min_len]
+    noise = np.sum((reference - estimate) ** 2)
+    return 10 * np.log10(np.sum(reference ** 2) / max(noise, 1e-12))
+
+
+def run_demucs(model, mixture):
+    from demucs.apply import apply_model
+    wav = torch.from_numpy(mixture).unsqueeze(0)
+    if wav.shape[1] == 1:
+        wav = wav.repeat(1, 2, 1)
+    with torch.no_grad():
+        return apply_model(model, wav, device='cpu', split=True, overlap=0.25, progress=False)[0].numpy()
+
+
+def run_voice(model, mixture):
+    with torch.no_grad():
+        return separate_long_recording(model, torch.from_numpy(mixture[:1])).numpy()
+
+
+def benchmark(name, mixture, sample_rate, run_fn):
+    duration = mixture.shape[-1] / sample_rate
+    print(f"\n--- {name}: {duration:.1f}s of audio, {torch.get_num_threads()} threads ---")
+    print(f"{'variant':<8} {'load (s)':>9} {'RTF':>7} {'SDR vs fp32 (dB)':>17}")
+
+    baseline = None
+    for variant in MODEL_VARIANTS:
+        start = time.perf_counter()
+        model = MODEL_REGISTRY.load(name, variant, warmup=True)
+        load_s = time.perf_counter() - start
+
+        timings = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            output = run_fn(model, mixture)
+            timings.append(time.perf_counter() - start)
+        rtf = min(timings) / duration
+
+        if baseline is None:
+            baseline = output
+            sdr_text = 'reference'
+        else:
+            sdr_text = f"{sdr(baseline, output):.2f}"
+        print(f"{variant:<8} {load_s:>9.2f} {rtf:>7.3f} {sdr_text:>17}")
+
+        MODEL_REGISTRY.unload(name, variant)
+
+
+def main():
+    demucs_sr = 44100
+    benchmark(DEMUCS_MODEL_NAME, load_mixture(MUSIC_INPUT, demucs_sr), demucs_sr, run_demucs)
+    benchmark(VOICE_MODEL_NAME, load_mixture(VOICE_INPUT, VOICE_MODEL_SAMPLE_RATE), VOICE_MODEL_SAMPLE_RATE, run_voice)
+
+
+if __name__ == '__main__':
+    main()
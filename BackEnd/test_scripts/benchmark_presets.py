@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import numpy as np
+import soundfile as sf
+import torch
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+from ai_separator import MODEL_REGISTRY, _demucs_settings, _demucs_separate_array, _import_apply_model
+from separation_presets import PRESETS, PRESET_TIMINGS
+
+# --- CONFIGURATION ---
+MUSIC_INPUT = os.path.join(BASE_DIR, 'input', 'audio_example.mp3')
+CLIP_SECONDS = 30
+
+
+def main():
+    wav, sr = sf.read(MUSIC_INPUT, dtype='float32', always_2d=True)
+    wav = wav.T[:, :CLIP_SECONDS * sr]
+    if wav.shape[0] == 1:
+        wav = np.repeat(wav, 2, axis=0)
+    wav = np.ascontiguousarray(wav[:2])
+    duration = wav.shape[1] / sr
+    apply_model = _import_apply_model()
+
+    print(f"\n--- {duration:.1f}s clip, {torch.get_num_threads()} threads ---")
+    print(f"{'preset':<9} {'model':<12} {'variant':<7} {'overlap':>7} {'shifts':>6} {'RTF':>7} {'wait / min audio':>17}")
+    for name in PRESETS:
+        _, settings = _demucs_settings(name)
+        # Load and warm up outside the timed region
+        MODEL_REGISTRY.load(settings['model'], settings['variant'], warmup=True)
+
+        start = time.perf_counter()
+        _demucs_separate_array(apply_model, wav, sr, settings)
+        elapsed = time.perf_counter() - start
+
+        # Recorded like a live request, so /api/equalizer/separation_presets reports it
+        PRESET_TIMINGS.record(name, duration, elapsed)
+        rtf = elapsed / duration
+        print(f"{name:<9} {settings['model']:<12} {settings['variant']:<7} {settings['overlap']:>7} "
+              f"{settings['shifts']:>6} {rtf:>7.3f} {rtf * 60:>16.1f}s")
+
+    print(f"\nMeasured RTFs saved to {PRESET_TIMINGS.path}")
+
+
+if __name__ == '__main__':
+    main()
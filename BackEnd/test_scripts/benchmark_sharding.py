@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import numpy as np
+import soundfile as sf
+import torch
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+import ai_separator
+from ai_separator import configure_sharding, shutdown_sharding, _demucs_separate_sharded, _demucs_separate_array, _import_apply_model, _get_shard_pool
+
+# --- CONFIGURATION ---
+MUSIC_INPUT = os.path.join(BASE_DIR, 'input', 'audio_example.mp3')
+REPEAT_TO_SECONDS = 300   # tile the example up to a "long file"
+WORKER_COUNTS = [2, 4, 8, 16]
+
+
+def load_long_input(path):
+    wav, sr = sf.read(path, dtype='float32', always_2d=True)
+    wav = wav.T
+    if wav.shape[0] == 1:
+        wav = np.repeat(wav, 2, axis=0)
+    repeats = int(np.ceil(REPEAT_TO_SECONDS * sr / wav.shape[1]))
+    return np.tile(wav[:2], (1, repeats))[:, :REPEAT_TO_SECONDS * sr], sr
+
+
+def main():
+    wav, sr = load_long_input(MUSIC_INPUT)
+    cores = os.cpu_count() or 1
+    print(f"\n--- {REPEAT_TO_SECONDS}s input, {cores} cores ---")
+    print(f"{'workers':>7} {'threads':>7} {'wall (s)':>9} {'RTF':>7} {'speedup':>8}   (1* = single in-process pass)")
+
+    start = time.perf_counter()
+    _demucs_separate_array(_import_apply_model(), wav, sr)
+    single_wall = time.perf_counter() - start
+    print(f"{'1*':>7} {torch.get_num_threads():>7} {single_wall:>9.2f} {single_wall / REPEAT_TO_SECONDS:>7.3f} {'1.00x':>8}")
+
+    for workers in WORKER_COUNTS:
+        if workers > cores:
+            break
+        configure_sharding(workers, max(1, cores // workers), min_seconds=0)
+        # Start the workers (and load their models) outside the timed region
+        pool = _get_shard_pool()
+        list(pool.map(abs, range(workers)))
+
+        start = time.perf_counter()
+        _demucs_separate_sharded(wav, sr)
+        wall = time.perf_counter() - start
+        threads = ai_separator.SHARD_SETTINGS['threads_per_worker']
+        print(f"{workers:>7} {threads:>7} {wall:>9.2f} {wall / REPEAT_TO_SECONDS:>7.3f} {single_wall / wall:>7.2f}x")
+        shutdown_sharding()
+
+
+if __name__ == '__main__':
+    main()
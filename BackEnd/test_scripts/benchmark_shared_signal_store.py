@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import uuid
+import shutil
+import multiprocessing as mp
+import numpy as np
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+from process_memory import memory_report
+from signal_store import compact_signal_entry
+from shared_signal_store import SharedSignalStore, DEFAULT_SHARED_DIR
+
+# --- CONFIGURATION ---
+WORKERS = 4
+SECONDS = 300
+FS = 44100
+LOOKUPS = 200
+DIRECTORY = DEFAULT_SHARED_DIR + '_benchmark'
+
+
+def reader(signal_id, results):
+    """ One 'worker': looks the signal up repeatedly and touches every page of its arrays. """
+    store = SharedSignalStore(DIRECTORY)
+    before = memory_report()
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        entry = store[signal_id]
+    lookup_ms = (time.perf_counter() - start) * 1000 / LOOKUPS
+    checksum = float(np.sum(entry['time_series'])) + float(np.sum(np.abs(entry['half_spectrum'])))
+    after = memory_report()
+    results.put((os.getpid(), lookup_ms, checksum,
+                 after.get('private_mb', 0) - before.get('private_mb', 0), after.get('shared_mb', 0)))
+
+
+def main():
+    shutil.rmtree(DIRECTORY, ignore_errors=True)
+    store = SharedSignalStore(DIRECTORY)
+    signal = np.random.default_rng(0).standard_normal(SECONDS * FS).astype(np.float32) * 0.1
+    # np.fft stands in for custom_fft (same power-of-two length and dtype)
+    fft = np.fft.fft(signal, 1 << (len(signal) - 1).bit_length())
+    signal_id = str(uuid.uuid4())
+    store[signal_id] = compact_signal_entry(FS, signal, fft)
+    print(f"\n--- {WORKERS} processes reading one {SECONDS}s signal "
+          f"({store.stats()['shared_bytes'] / 2**20:.0f} MB in {DIRECTORY}) ---")
+
+    context = mp.get_context('spawn')
+    results = context.Queue()
+    workers = [context.Process(target=reader, args=(signal_id, results)) for _ in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    rows = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    print(f"{'pid':>8} {'lookup (ms)':>12} {'private +MB':>12} {'shared MB':>10}")
+    for pid, lookup_ms, _, private_mb, shared_mb in rows:
+        print(f"{pid:>8} {lookup_ms:>12.3f} {private_mb:>12.1f} {shared_mb:>10.1f}")
+    print(f"all processes read the same data: {len({round(row[2], 3) for row in rows}) == 1}")
+    store.clear()
+    shutil.rmtree(DIRECTORY, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
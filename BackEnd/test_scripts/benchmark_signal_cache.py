@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import uuid
+import numpy as np
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+from process_memory import memory_report
+from signal_store import SignalCache, compact_signal_entry
+
+# --- CONFIGURATION ---
+SIGNALS = 24
+SECONDS_PER_SIGNAL = 60
+FS = 44100
+MEMORY_BUDGET_MB = 256
+SPILL_DIR = os.path.join(BASE_DIR, 'cache', 'benchmarks', 'signal_spill')
+
+
+def make_entry(rng):
+    """ Same layout as /api/audio/upload followed by one /api/equalizer/apply (output derived lazily). """
+    signal = rng.standard_normal(SECONDS_PER_SIGNAL * FS).astype(np.float32) * 0.1
+    # np.fft stands in for custom_fft (same power-of-two length and dtype)
+    fft = np.fft.fft(signal, 1 << (len(signal) - 1).bit_length())
+    entry = compact_signal_entry(FS, signal, fft)
+    entry['eq_scheme'] = [{'freq_start_hz': 0, 'freq_end_hz': FS / 2, 'scale_factor': 0.5}]
+    return entry
+
+
+def main():
+    cache = SignalCache(MEMORY_BUDGET_MB, ttl_seconds=3600, spill_dir=SPILL_DIR, max_spill_mb=16384)
+    rng = np.random.default_rng(0)
+    ids = []
+    for _ in range(SIGNALS):
+        ids.append(str(uuid.uuid4()))
+        cache[ids[-1]] = make_entry(rng)
+    stats = cache.stats()
+    report = memory_report()
+
+    print(f"\n--- {SIGNALS} signals of {SECONDS_PER_SIGNAL}s @ {FS} Hz, {MEMORY_BUDGET_MB} MB budget ---")
+    print(f"resident: {stats['resident_entries']} entries, {stats['resident_bytes'] / 2**20:.1f} MB")
+    print(f"spilled:  {stats['spilled_entries']} entries, {stats['spill_bytes'] / 2**20:.1f} MB on disk")
+    print(f"process RSS: {report.get('rss_mb', report.get('peak_rss_mb', 0)):.1f} MB")
+
+    start = time.perf_counter()
+    cache[ids[0]]
+    reload_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    cache[ids[0]]
+    hit_ms = (time.perf_counter() - start) * 1000
+    print(f"lookup of a spilled signal: {reload_ms:.1f} ms (reload), then {hit_ms:.3f} ms (resident)")
+    cache.clear()
+
+
+if __name__ == '__main__':
+    main()
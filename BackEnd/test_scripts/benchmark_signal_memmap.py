@@ -0,0 +1,65 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+# --- CONFIGURATION ---
+SIGNALS = 8
+SECONDS_PER_SIGNAL = 180
+FS = 44100
+MEMMAP_DIR = os.path.join(BASE_DIR, 'cache', 'benchmarks', 'signal_memmap')
+
+# Runs in a fresh interpreter per mode so the RSS numbers do not mix
+CHILD = r"""
+import os, sys, json, uuid
+import numpy as np
+sys.path.append(sys.argv[1])
+from process_memory import memory_report
+from signal_store import configure_signal_cache, SIGNAL_CACHE, compact_signal_entry
+
+signals, seconds, fs, memmap_dir = int(sys.argv[2]), float(sys.argv[3]), int(sys.argv[4]), sys.argv[5]
+spill_dir = os.path.join(sys.argv[1], '..', 'cache', 'benchmarks', 'signal_spill')
+configure_signal_cache(1 << 20, 3600, spill_dir, 16384, memmap_dir=memmap_dir or None)
+rng = np.random.default_rng(0)
+for _ in range(signals):
+    # Same entry as /api/audio/upload followed by one /api/equalizer/apply (output derived lazily)
+    signal = rng.standard_normal(int(seconds * fs)).astype(np.float32) * 0.1
+    # np.fft stands in for custom_fft (same power-of-two length and dtype, much faster to set up)
+    fft = np.fft.fft(signal, 1 << (len(signal) - 1).bit_length())
+    signal_id = str(uuid.uuid4())
+    SIGNAL_CACHE[signal_id] = compact_signal_entry(fs, signal, fft)
+    SIGNAL_CACHE[signal_id]['eq_scheme'] = [{'freq_start_hz': 0, 'freq_end_hz': fs / 2, 'scale_factor': 0.5}]
+    del signal, fft
+print(json.dumps({'memory': memory_report(), 'signal_cache': SIGNAL_CACHE.stats()}))
+"""
+
+
+def run(memmap_dir):
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, os.path.join(BASE_DIR, 'utils'), str(SIGNALS),
+         str(SECONDS_PER_SIGNAL), str(FS), memmap_dir],
+        capture_output=True, text=True, check=True
+    ).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def main():
+    print(f"\n--- {SIGNALS} cached signals of {SECONDS_PER_SIGNAL}s @ {FS} Hz ---")
+    print(f"{'arrays':>10} {'RSS (MB)':>9} {'on disk (MB)':>13} {'time (s)':>9}")
+    for label, memmap_dir in (('in RAM', ''), ('memmapped', MEMMAP_DIR)):
+        report = run(memmap_dir)
+        rss = report['memory'].get('rss_mb', report['memory'].get('peak_rss_mb', 0))
+        on_disk = report['signal_cache']['memmap']['bytes'] / (1024.0 * 1024.0)
+        print(f"{label:>10} {rss:>9.1f} {on_disk:>13.1f} {report['seconds']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import resource
+import multiprocessing
+import numpy as np
+import soundfile as sf
+import torch
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+# --- CONFIGURATION ---
+VOICE_INPUT = os.path.join(BASE_DIR, 'input', '5_mixture.wav')
+REPEAT_TO_SECONDS = 600   # tile the example up to a long meeting
+MICRO_BATCH_SIZES = [1, 2, 4, 8, 16, 32, None]   # None = every slice in one batch (old behaviour)
+
+
+def load_long_mixture(sample_rate):
+    from resampler import resample
+    wav, sr = sf.read(VOICE_INPUT, dtype='float32', always_2d=True)
+    mono = resample(wav.mean(axis=1), sr, sample_rate)
+    repeats = int(np.ceil(REPEAT_TO_SECONDS * sample_rate / len(mono)))
+    return np.tile(mono, repeats)[:REPEAT_TO_SECONDS * sample_rate]
+
+
+def run_one(micro_batch_size, queue):
+    """ Runs in a fresh process so ru_maxrss is the peak of this micro-batch size only. """
+    from ai_separator import MODEL_REGISTRY, VOICE_MODEL_NAME, VOICE_MODEL_SAMPLE_RATE
+    from voice_separator import separate_long_recording, output_buffer_bytes
+
+    model = MODEL_REGISTRY.load(VOICE_MODEL_NAME, warmup=True)
+    mixture = torch.from_numpy(load_long_mixture(VOICE_MODEL_SAMPLE_RATE))
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    with torch.no_grad():
+        separate_long_recording(model, mixture, micro_batch_size=micro_batch_size)
+    elapsed = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # The output buffers are bounded by the recording length, not the micro-batch (see separate_long_recording)
+    buffers_mb = output_buffer_bytes(model.decoder_select.n_srcs, len(mixture)) / 2 ** 20
+    queue.put((elapsed, (peak_kb - baseline_kb) / 1024, buffers_mb))
+
+
+def main():
+    ctx = multiprocessing.get_context('spawn')
+    print(f"\n--- MultiDecoderDPRNN on {REPEAT_TO_SECONDS}s, {torch.get_num_threads()} threads ---")
+    print(f"{'micro-batch':>11} {'time (s)':>9} {'audio s / s':>12} {'peak extra MB':>14} {'of it buffers MB':>17}")
+    for micro_batch_size in MICRO_BATCH_SIZES:
+        queue = ctx.Queue()
+        worker = ctx.Process(target=run_one, args=(micro_batch_size, queue))
+        worker.start()
+        worker.join()
+        label = 'all' if micro_batch_size is None else str(micro_batch_size)
+        if worker.exitcode != 0:
+            print(f"{label:>11} {'failed (exit ' + str(worker.exitcode) + ', likely out of memory)':>36}")
+            continue
+        elapsed, peak_mb, buffers_mb = queue.get()
+        print(f"{label:>11} {elapsed:>9.2f} {REPEAT_TO_SECONDS / elapsed:>12.2f} {peak_mb:>14.1f} {buffers_mb:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
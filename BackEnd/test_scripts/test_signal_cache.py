@@ -0,0 +1,102 @@
+"""
+Behaviour checks for the signal cache (utils/signal_store.py): LRU and
+idle-TTL eviction, spilling to disk with transparent reload, and the spill
+budget. Runs in-process (no server needed):
+    python test_scripts/test_signal_cache.py     (or: python -m pytest test_scripts/test_signal_cache.py)
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+from signal_store import SignalCache, compact_signal_entry
+
+# --- CONFIGURATION ---
+FS = 8000
+SAMPLES = 1 << 16           # float32 signal + complex64 half-spectrum: ~0.5 MB per entry
+ENTRY_MB = 0.5
+
+
+def make_entry(seed=0):
+    signal = np.random.default_rng(seed).standard_normal(SAMPLES).astype(np.float32) * 0.1
+    return compact_signal_entry(FS, signal, np.fft.fft(signal))
+
+
+def make_cache(max_memory_mb=64, ttl_seconds=3600, max_spill_mb=64):
+    spill_dir = tempfile.mkdtemp(prefix='signal_spill_')
+    return SignalCache(max_memory_mb, ttl_seconds, spill_dir, max_spill_mb), spill_dir
+
+
+# --- LRU / TTL eviction and spill ---
+def test_least_recently_used_entry_is_spilled_and_reloaded():
+    cache, spill_dir = make_cache(max_memory_mb=2.5 * ENTRY_MB)
+    try:
+        cache['a'] = make_entry(0)
+        cache['b'] = make_entry(1)
+        cache.get('a')                      # 'b' is now the least recently used
+        cache['c'] = make_entry(2)
+
+        stats = cache.stats()
+        assert stats['evictions'] == 1 and stats['spilled_entries'] == 1
+        assert stats['resident_bytes'] <= stats['max_memory_bytes']
+        assert os.path.exists(os.path.join(spill_dir, 'b.npz'))
+        assert set(cache) == {'a', 'b', 'c'}
+
+        # Reloading 'b' brings back the same data and spills the next LRU entry ('a')
+        np.testing.assert_array_equal(cache['b']['time_series'], make_entry(1)['time_series'])
+        assert cache.stats()['reloads'] == 1
+        assert os.path.exists(os.path.join(spill_dir, 'a.npz'))
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def test_idle_entry_expires_to_disk_after_ttl():
+    cache, spill_dir = make_cache(ttl_seconds=0.2)
+    try:
+        cache['a'] = make_entry(0)
+        time.sleep(0.3)
+        cache['b'] = make_entry(1)          # any later access evicts what has been idle too long
+
+        stats = cache.stats()
+        assert stats['expirations'] == 1 and stats['resident_entries'] == 1
+        assert 'a' in cache
+        np.testing.assert_array_equal(cache['a']['time_series'], make_entry(0)['time_series'])
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def test_spill_budget_forgets_the_oldest_spilled_signal():
+    cache, spill_dir = make_cache(max_memory_mb=1.5 * ENTRY_MB, max_spill_mb=2.5 * ENTRY_MB)
+    try:
+        cache['a'] = make_entry(0)
+        cache['b'] = make_entry(1)          # spills 'a'
+        cache['c'] = make_entry(2)          # spills 'b'; two files fit the spill budget
+        assert cache.stats()['dropped'] == 0
+        cache['d'] = make_entry(3)          # spills 'c'; three do not, so 'a' is deleted
+
+        assert cache.stats()['dropped'] == 1
+        assert 'a' not in cache and cache.get('a') is None
+        assert all(key in cache for key in 'bcd')
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_') and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+    print("=" * 60)
+    print("✓ All tests passed!" if not failed else f"✗ {failed} of {len(tests)} tests failed!")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,125 @@
+"""
+Behaviour checks for signal entries (utils/signal_store.py): versions,
+dropping stale writes (409 from /api/equalizer/apply) and immutable
+snapshots. Runs in-process (no server needed):
+    python test_scripts/test_signal_versioning.py     (or: python -m pytest test_scripts/test_signal_versioning.py)
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+import soundfile as sf
+
+# --- Configure paths to import utils correctly ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+
+from signal_store import SignalCache, compact_signal_entry
+
+# --- CONFIGURATION ---
+FS = 8000
+SAMPLES = 1 << 16           # float32 signal + complex64 half-spectrum: ~0.5 MB per entry
+ENTRY_MB = 0.5
+SCHEME = [{'freq_start_hz': 0, 'freq_end_hz': 1000, 'scale_factor': 0.5}]
+
+
+def make_entry(seed=0):
+    signal = np.random.default_rng(seed).standard_normal(SAMPLES).astype(np.float32) * 0.1
+    return compact_signal_entry(FS, signal, np.fft.fft(signal))
+
+
+def make_cache(max_memory_mb=64, ttl_seconds=3600, max_spill_mb=64):
+    spill_dir = tempfile.mkdtemp(prefix='signal_spill_')
+    return SignalCache(max_memory_mb, ttl_seconds, spill_dir, max_spill_mb), spill_dir
+
+
+# --- Versions and stale writes ---
+def test_commit_bumps_version_and_drops_stale_request_seq():
+    cache, spill_dir = make_cache()
+    try:
+        cache['a'] = make_entry()
+        entry = cache['a']
+        assert entry.version == 0
+
+        state = entry.commit({'eq_scheme': SCHEME}, request_seq=5)
+        assert state is not None and state.version == 1
+
+        # Older and equal sequence numbers lose against the committed one
+        assert entry.commit({'eq_scheme': []}, request_seq=3) is None
+        assert entry.commit({'eq_scheme': []}, request_seq=5) is None
+        assert entry.version == 1 and entry['eq_scheme'] == SCHEME
+
+        assert entry.commit({'eq_scheme': []}, request_seq=6).version == 2
+        assert entry['eq_scheme'] == []
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def test_apply_answers_409_to_an_out_of_order_request():
+    os.environ.setdefault('SIGNAL_SNAPSHOT_DIR', '')
+    os.environ.setdefault('ANALYSIS_STORE_DIR', '')
+    os.environ.setdefault('PRELOAD_MODELS', '')
+    from app import create_app
+    client = create_app().test_client()
+
+    buffer = io.BytesIO()
+    sf.write(buffer, make_entry()['time_series'], FS, format='WAV')
+    buffer.seek(0)
+    upload = client.post('/api/audio/upload', data={'file': (buffer, 'a.wav')}, content_type='multipart/form-data')
+    assert upload.status_code == 200
+    signal_id = upload.get_json()['signal_id']
+
+    def apply(scheme, request_seq):
+        return client.post('/api/equalizer/apply', json={
+            'signal_id': signal_id, 'equalization_scheme': scheme, 'request_seq': request_seq
+        })
+
+    newer = apply(SCHEME, 20)
+    assert newer.status_code == 200
+    older = apply([], 10)
+    assert older.status_code == 409 and older.get_json()['stale'] is True
+    # The dropped request changed nothing
+    assert apply(SCHEME, 30).get_json()['version'] == newer.get_json()['version'] + 1
+
+    # A malformed band is rejected before it is stored
+    assert apply([{'bad': 1}], 40).status_code == 400
+    assert client.get(f'/api/audio/download_output?signal_id={signal_id}').status_code == 200
+
+
+# --- Snapshots ---
+def test_snapshot_does_not_change_after_a_later_commit():
+    cache, spill_dir = make_cache()
+    try:
+        cache['a'] = make_entry()
+        entry = cache['a']
+        before = entry.snapshot()
+        original = np.array(before['current_signal'])
+
+        entry['eq_scheme'] = SCHEME
+        after = entry.snapshot()
+
+        assert before.version == 0 and after.version == 1
+        assert before['eq_scheme'] is None and after['eq_scheme'] == SCHEME
+        np.testing.assert_array_equal(before['current_signal'], original)
+        assert not np.allclose(after['current_signal'], original)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_') and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+    print("=" * 60)
+    print("✓ All tests passed!" if not failed else f"✗ {failed} of {len(tests)} tests failed!")
+    sys.exit(1 if failed else 0)
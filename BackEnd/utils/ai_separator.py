@@ -3,12 +3,28 @@ import sys
 import soundfile as sf
 import numpy as np
 import time 
-import torch # The core AI framework
-import torchaudio # Audio processing utility
-import librosa
+import threading
 import subprocess
+import multiprocessing
+import functools
+import gc
+from concurrent.futures import ProcessPoolExecutor, as_completed
 # Configure paths to import utils correctly
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(BASE_DIR, 'utils'))
+from executor import parallel_map
+from resampler import resample, StreamingResampler
+from separation_cache import SEPARATION_CACHE, make_separation_key
+from stem_stream import StemStreamStore, crossfade_weights, plan_segments, overlap_add
+from voice_separator import separate_long_recording, DEFAULT_SLICE_SIZE, DEFAULT_MICRO_BATCH_SIZE
+from separation_presets import resolve_preset, preset_model_names, PRESET_TIMINGS
+from batch_scheduler import attach_batch_scheduler, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS
+from lazy_import import lazy_import
+
+# torch is imported by the first model load / separation (or the background
+# warm-up), so importing this module keeps server start-up fast
+torch = lazy_import('torch')
+
 MODELS_DIR = os.path.join(BASE_DIR, 'models')
 
 # --- FFmpeg Configuration ---
@@ -123,248 +139,700 @@ def _setup_ffmpeg_path():
     print(f"  Checked paths: {FFMPEG_POSSIBLE_PATHS}")
     return False
 
-# Setup FFmpeg path on module import
-_setup_ffmpeg_path()
+_FFMPEG_READY = None
+_FFMPEG_LOCK = threading.Lock()
+
+
+def ensure_ffmpeg():
+    """ Runs the FFmpeg PATH setup once, on first use by a model (no subprocesses at import time). """
+    global _FFMPEG_READY
+    if _FFMPEG_READY is None:
+        with _FFMPEG_LOCK:
+            if _FFMPEG_READY is None:
+                _FFMPEG_READY = _setup_ffmpeg_path()
+    return _FFMPEG_READY
+
 
 # --- GLOBAL MODEL INITIALIZATION (Loads models once when server starts) ---
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+_DEVICE = None
+
+
+def get_device():
+    """ 'cuda' or 'cpu', resolved (and torch imported) on first call. """
+    global _DEVICE
+    if _DEVICE is None:
+        _DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+    return _DEVICE
+
 
-# Initialize SpeechBrain separator as None, will be loaded lazily on first use
-# Demucs uses CLI subprocess, so no global separator needed
-SPEECHBRAIN_SEPARATOR = None
+# --- MODEL REGISTRY ---
+# Every separation model is loaded once per process and shared across requests.
+# Models load lazily on first use, or eagerly (with a warm-up pass) when
+# create_app() calls MODEL_REGISTRY.preload().
+DEMUCS_MODEL_NAME = 'htdemucs'
+VOICE_MODEL_NAME = 'multidecoder_dprnn'
+VOICE_MODEL_SAMPLE_RATE = 8000
+VOICE_MODEL_HUB_ID = "JunzheJosephZhu/MultiDecoderDPRNN"
+# Every pretrained Demucs model a separation preset can ask for
+DEMUCS_MODEL_NAMES = sorted(set(preset_model_names()) | {DEMUCS_MODEL_NAME})
 
-def _check_demucs_installed():
-    """Check if Demucs is installed and accessible via CLI."""
+
+def _load_demucs_model(model_name=DEMUCS_MODEL_NAME):
+    """ Loads a pretrained Demucs model (htdemucs by default) on the inference device in eval mode. """
     try:
-        import demucs
-        # Try to run demucs CLI to verify it works
-        result = subprocess.run(
-            [sys.executable, "-m", "demucs.separate", "--help"],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        return result.returncode == 0
-    except (ImportError, subprocess.TimeoutExpired, FileNotFoundError):
-        return False
+        from demucs.pretrained import get_model
+    except ImportError as e:
+        raise ImportError("Demucs not installed. Install with: pip install demucs") from e
+    ensure_ffmpeg()
+
+    print(f"Loading Demucs model ({model_name}) on {get_device()}...")
+    model = get_model(model_name)
+    model.to(get_device())
+    model.eval()
+    return model
+
+
+def _warmup_demucs_model(model):
+    """ Runs one second of silence through htdemucs so the first request pays no init cost. """
+    from demucs.apply import apply_model
+    silence = torch.zeros(1, model.audio_channels, model.samplerate, device=get_device())
+    with torch.no_grad():
+        apply_model(model, silence, device=get_device(), split=True, overlap=0.25, progress=False)
+
+
+def _load_voice_model():
+    """ Loads the MultiDecoderDPRNN voice separator (class definition in dprnn_model.py). """
+    try:
+        from dprnn_model import MultiDecoderDPRNN
+    except ImportError as e:
+        raise ImportError("MultiDecoderDPRNN requires asteroid. Install with: pip install asteroid") from e
+
+    # Older checkpoints pickle PyTorch Lightning callbacks
+    try:
+        import pytorch_lightning.callbacks.model_checkpoint
+        import pytorch_lightning.callbacks.early_stopping
+        torch.serialization.add_safe_globals([
+            pytorch_lightning.callbacks.model_checkpoint.ModelCheckpoint,
+            pytorch_lightning.callbacks.early_stopping.EarlyStopping
+        ])
+    except (ImportError, AttributeError):
+        pass
+
+    print(f"Loading MultiDecoderDPRNN ({VOICE_MODEL_HUB_ID}) on {get_device()}...")
+    model = MultiDecoderDPRNN.from_pretrained(VOICE_MODEL_HUB_ID)
+    model.to(get_device())
+    model.eval()
+    return model
+
+
+def _warmup_voice_model(model):
+    """ Separates one second of silence at the model's sample rate. """
+    silence = torch.zeros(1, VOICE_MODEL_SAMPLE_RATE, device=get_device())
+    with torch.no_grad():
+        separate_long_recording(model, silence)
+
+
+# --- CPU INFERENCE VARIANTS ---
+# Besides the fp32 eager model, each separator can be served as:
+#   'int8'   - dynamic int8 quantization of its Linear/LSTM/GRU layers
+#   'traced' - its heavy network traced into a TorchScript graph
+# Variants are built once and cached under models/optimized/, keyed by torch
+# version so an upgrade never loads a stale build.
+MODEL_VARIANTS = ('fp32', 'int8', 'traced')
+OPTIMIZED_MODELS_DIR = os.path.join(MODELS_DIR, 'optimized')
+
 
-def _load_speechbrain_separator():
-    """Lazy load SpeechBrain separator from local models directory."""
-    global SPEECHBRAIN_SEPARATOR
-    if SPEECHBRAIN_SEPARATOR is None:
+def _variant_cache_path(name, variant, suffix=''):
+    torch_version = torch.__version__.split('+')[0]
+    return os.path.join(OPTIMIZED_MODELS_DIR, f"{name}-{variant}{suffix}-torch{torch_version}.pt")
+
+
+def _quantize_dynamic_int8(model):
+    """ Dynamic int8 quantization of the recurrent and linear layers (weights int8, activations fp32). """
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear, torch.nn.LSTM, torch.nn.GRU}, dtype=torch.qint8
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _traced_demucs_class():
+    """ Defined on first use, since subclassing torch.nn.Module needs torch imported. """
+    class _TracedDemucs(torch.nn.Module):
+        """
+        TorchScript graph of a single Demucs model. Keeps the plain attributes
+        (samplerate, sources, segment, ...) that demucs.apply reads from the model.
+        """
+
+        def __init__(self, traced, source_model):
+            super().__init__()
+            self.traced = traced
+            for attr, value in vars(source_model).items():
+                if not attr.startswith('_') and not isinstance(value, (torch.nn.Module, torch.Tensor)):
+                    setattr(self, attr, value)
+            if hasattr(type(source_model), 'valid_length'):
+                self.valid_length = type(source_model).valid_length.__get__(self)
+
+        def forward(self, mix):
+            return self.traced(mix)
+
+    return _TracedDemucs
+
+
+def _demucs_submodels(model):
+    """ Demucs pretrained models are bags; returns the list holding the inner models. """
+    return model.models if hasattr(model, 'models') else None
+
+
+def _trace_demucs(model):
+    """ Traces every inner htdemucs on one fixed-length segment (apply_model always feeds that length). """
+    traced_parts = []
+    for inner in _demucs_submodels(model):
+        segment_length = int(float(inner.segment) * inner.samplerate)
+        example = torch.zeros(1, inner.audio_channels, segment_length)
+        with torch.no_grad():
+            traced_parts.append(torch.jit.trace(inner, example, check_trace=False))
+    return traced_parts
+
+
+def _trace_voice_masker(model):
+    """ Traces the DPRNN masker, which holds nearly all of MultiDecoderDPRNN's compute. """
+    n_filters = model.masker.in_chan
+    example = torch.zeros(2, n_filters, 4000)
+    with torch.no_grad():
+        return [torch.jit.trace(model.masker, example, check_trace=False)]
+
+
+def _install_traced_parts(name, model, traced_parts):
+    """ Swaps traced graphs into a freshly loaded fp32 model. """
+    if name in DEMUCS_MODEL_NAMES:
+        inner_models = _demucs_submodels(model)
+        for i, traced in enumerate(traced_parts):
+            inner_models[i] = _traced_demucs_class()(traced, inner_models[i])
+    else:
+        model.masker = traced_parts[0]
+    return model
+
+
+def build_model_variant(name, variant, base_loader):
+    """
+    Returns the requested CPU variant of a model, building it from the fp32
+    weights on first use and loading it from the on-disk cache afterwards.
+    """
+    if variant == 'fp32':
+        return base_loader()
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant '{variant}'. Choose from {MODEL_VARIANTS}.")
+    if get_device() != "cpu":
+        raise ValueError(f"Model variant '{variant}' is CPU-only (current device: {get_device()}).")
+
+    os.makedirs(OPTIMIZED_MODELS_DIR, exist_ok=True)
+
+    if variant == 'int8':
+        cache_path = _variant_cache_path(name, variant)
+        if os.path.exists(cache_path):
+            print(f"Loading cached int8 variant of '{name}' from {cache_path}")
+            return torch.load(cache_path, map_location='cpu', weights_only=False).eval()
+        print(f"Building int8 variant of '{name}'...")
+        model = _quantize_dynamic_int8(base_loader()).eval()
+        torch.save(model, cache_path)
+        return model
+
+    # 'traced': the graphs are cached separately and installed into the fp32 model
+    model = base_loader()
+    trace_fn = _trace_demucs if name in DEMUCS_MODEL_NAMES else _trace_voice_masker
+    part_count = len(_demucs_submodels(model)) if name in DEMUCS_MODEL_NAMES else 1
+    part_paths = [_variant_cache_path(name, variant, f"-{i}") for i in range(part_count)]
+
+    if all(os.path.exists(path) for path in part_paths):
+        print(f"Loading cached TorchScript graphs of '{name}'")
+        traced_parts = [torch.jit.load(path, map_location='cpu') for path in part_paths]
+    else:
+        print(f"Tracing '{name}' to TorchScript...")
         try:
-            from speechbrain.pretrained import SepformerSeparation
-            
-            # Verify models directory exists
-            if not os.path.exists(MODELS_DIR):
-                raise FileNotFoundError(f"Models directory not found: {MODELS_DIR}")
-            
-            # Verify required files exist
-            required_files = ['hyperparams.yaml', 'encoder.ckpt', 'decoder.ckpt', 'masknet.ckpt']
-            for file in required_files:
-                file_path = os.path.join(MODELS_DIR, file)
-                if not os.path.exists(file_path):
-                    raise FileNotFoundError(f"Required model file not found: {file_path}")
-            
-            print(f"Loading SpeechBrain model from {MODELS_DIR} (Device: {DEVICE})...")
-            SPEECHBRAIN_SEPARATOR = SepformerSeparation.from_hparams(
-                source=MODELS_DIR,  # Local directory instead of HuggingFace repo
-                savedir=MODELS_DIR,
-                run_opts={"device": DEVICE}
-            )
-            print("SpeechBrain model loaded successfully.")
-        except ImportError as e:
-            raise ImportError("SpeechBrain not installed. Install with: pip install speechbrain") from e
+            traced_parts = trace_fn(model)
         except Exception as e:
-            raise RuntimeError(f"Failed to load SpeechBrain model from {MODELS_DIR}: {str(e)}") from e
-    return SPEECHBRAIN_SEPARATOR
-# -------------------------------------------------------------------------
+            print(f"⚠ Warning: Could not trace '{name}', serving fp32 eager instead: {e}")
+            return model
+        for traced, path in zip(traced_parts, part_paths):
+            torch.jit.save(traced, path)
+
+    return _install_traced_parts(name, model, traced_parts).eval()
+
 
-# def save_signal_to_temp(signal_array, Fs, signal_id, UPLOAD_FOLDER):
+def _demucs_batch_targets(model):
     """
-    Saves the current signal (from cache) to a temporary WAV file for AI input.
-    Uses PCM_16 format which is widely compatible and doesn't require torchcodec.
+    Inner htdemucs models whose forward() can be batched across requests:
+    demucs.apply always feeds them fixed-length segments. TorchScript graphs
+    were traced at batch size 1 and are left alone.
     """
-    temp_input_filename = f"ai_input_{signal_id}.wav"
-    temp_input_filepath = os.path.join(UPLOAD_FOLDER, temp_input_filename)
-    
-    # Ensure signal is in the right format (float32, normalized to [-1, 1])
-    if signal_array.dtype != np.float32:
-        signal_array = signal_array.astype(np.float32)
-    
-    # Normalize to prevent clipping
-    max_val = np.max(np.abs(signal_array))
+    inner_models = _demucs_submodels(model) or [model]
+    return [inner for inner in inner_models if not isinstance(inner, _traced_demucs_class())]
+
+
+class ModelRegistry:
+    """
+    Loads each registered separation model once and hands the same instance to
+    every request. Loading is guarded per model, so concurrent first requests
+    never load the same weights twice.
+
+    Every model can be served in any of MODEL_VARIANTS; `default_variant` is
+    used when a caller does not ask for one.
+
+    Models registered with batch_targets get a BatchScheduler in front of each
+    target module, so equal-length segments from concurrent requests share one
+    forward pass (see configure_batching).
+
+    Lifecycle: register() -> load()/preload() -> get() ... -> unload()/shutdown().
+    `ready` is True once every model requested through preload() is loaded and warm.
+    """
+
+    def __init__(self, default_variant='fp32'):
+        self.default_variant = default_variant
+        self.max_batch_size = DEFAULT_MAX_BATCH_SIZE
+        self.max_batch_wait_ms = DEFAULT_MAX_WAIT_MS
+        self._specs = {}          # name -> (loader, warmup, batch_targets)
+        self._schedulers = {}     # 'name:variant' -> [BatchScheduler]
+        self._models = {}         # 'name:variant' -> loaded model
+        self._warm = set()
+        self._required = {}       # 'name:variant' -> whether a warm-up was requested
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def register(self, name, loader, warmup=None, batch_targets=None):
+        """
+        Declares a model and how to load (and optionally warm up) it.
+        batch_targets(model) returns the submodules whose forward() may be batched.
+        """
+        with self._lock:
+            self._specs[name] = (loader, warmup, batch_targets)
+
+    def configure_batching(self, max_batch_size, max_wait_ms):
+        """ Sets the cross-request batch size and wait window (1 disables batching). """
+        self.max_batch_size = int(max_batch_size)
+        self.max_batch_wait_ms = float(max_wait_ms)
+        for schedulers in self._schedulers.values():
+            for scheduler in schedulers:
+                scheduler.configure(self.max_batch_size, self.max_batch_wait_ms)
+
+    def _key(self, name, variant):
+        return f"{name}:{variant or self.default_variant}"
+
+    def _load_lock(self, key):
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+    @property
+    def names(self):
+        return list(self._specs.keys())
+
+    @property
+    def ready(self):
+        """ True once every preloaded model is loaded and warmed up. """
+        return all(
+            key in self._models and (not needs_warmup or key in self._warm)
+            for key, needs_warmup in self._required.items()
+        )
+
+    def is_loaded(self, name, variant=None):
+        return self._key(name, variant) in self._models
+
+    def load(self, name, variant=None, warmup=False):
+        """ Loads a model if it is not resident yet (optionally running its warm-up) and returns it. """
+        if name not in self._specs:
+            raise KeyError(f"Unknown separation model: {name}")
+        loader, warmup_fn, batch_targets = self._specs[name]
+        variant = variant or self.default_variant
+        key = self._key(name, variant)
+
+        with self._load_lock(key):
+            model = self._models.get(key)
+            if model is None:
+                start = time.perf_counter()
+                model = build_model_variant(name, variant, loader)
+                if batch_targets is not None:
+                    self._schedulers[key] = [
+                        attach_batch_scheduler(target, self.max_batch_size, self.max_batch_wait_ms, name=key)
+                        for target in batch_targets(model)
+                    ]
+                self._models[key] = model
+                print(f"✓ Model '{key}' loaded in {time.perf_counter() - start:.2f}s")
+
+            if warmup and key not in self._warm:
+                if warmup_fn is not None:
+                    start = time.perf_counter()
+                    warmup_fn(model)
+                    print(f"✓ Model '{key}' warmed up in {time.perf_counter() - start:.2f}s")
+                self._warm.add(key)
+
+        return model
+
+    def get(self, name, variant=None):
+        """ Returns the shared model instance, loading it on first use. """
+        model = self._models.get(self._key(name, variant))
+        if model is not None:
+            return model
+        return self.load(name, variant)
+
+    def preload(self, names=None, variant=None, warmup=True, background=False):
+        """
+        Eagerly loads (and warms up) the given models, or every registered one.
+        With background=True the loading runs in a daemon thread and the call
+        returns at once; `ready` stays False until it has finished.
+        """
+        names = self.names if names is None else list(names)
+        for name in names:
+            key = self._key(name, variant)
+            self._required[key] = self._required.get(key, False) or warmup
+        if background:
+            thread = threading.Thread(
+                target=self._preload_quietly, args=(names, variant, warmup), name='model-preload', daemon=True
+            )
+            thread.start()
+            return thread
+        for name in names:
+            self.load(name, variant, warmup=warmup)
+
+    def _preload_quietly(self, names, variant, warmup):
+        for name in names:
+            try:
+                self.load(name, variant, warmup=warmup)
+            except Exception as e:
+                print(f"⚠ Warning: Background preload of '{name}' failed: {e}")
+
+    def share_for_fork(self):
+        """
+        Prepares the loaded models to be inherited by forked workers: weights
+        are frozen (no autograd state is ever written to them) and moved into
+        shared memory, and every object allocated so far is frozen out of the
+        garbage collector so collections in the workers do not dirty (and copy)
+        the pages holding them. Call in the master, right before forking.
+        """
+        for key, model in self._models.items():
+            try:
+                for param in model.parameters():
+                    param.requires_grad_(False)
+                model.share_memory()
+            except Exception as e:
+                print(f"⚠ Warning: Could not move '{key}' to shared memory, relying on copy-on-write: {e}")
+        gc.collect()
+        gc.freeze()
+        print(f"✓ Shared {len(self._models)} model(s) with forked workers: {', '.join(self._models) or 'none'}")
+
+    def after_fork(self, warmup=True):
+        """
+        Called in each forked worker: locks are recreated (a fork copies them
+        in whatever state they were) and the inherited models are warmed up in
+        the background, since the master only loaded them.
+        """
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        if warmup and self._models:
+            names, variants = zip(*(key.split(':', 1) for key in self._models))
+            for variant in set(variants):
+                self.preload([n for n, v in zip(names, variants) if v == variant], variant, warmup=True, background=True)
+
+    def unload(self, name, variant=None):
+        """ Drops a model so its weights can be freed; the next get() reloads it. """
+        key = self._key(name, variant)
+        with self._load_lock(key):
+            self._models.pop(key, None)
+            self._warm.discard(key)
+            for scheduler in self._schedulers.pop(key, []):
+                scheduler.close()
+        if _DEVICE == "cuda":
+            torch.cuda.empty_cache()
+
+    def shutdown(self):
+        """ Unloads every model (called when the app exits). """
+        for key in list(self._models.keys()):
+            name, variant = key.split(':', 1)
+            self.unload(name, variant)
+        self._required.clear()
+
+    def batching_stats(self):
+        """ Per-model batch counters, merged over the model's batched submodules. """
+        stats = {}
+        for key, schedulers in self._schedulers.items():
+            batches = sum(s.batches for s in schedulers)
+            items = sum(s.items for s in schedulers)
+            stats[key] = {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_batch_wait_ms,
+                'batches': batches,
+                'items': items,
+                'mean_batch_size': round(items / batches, 3) if batches else 0.0,
+                'largest_batch': max((s.largest_batch for s in schedulers), default=0),
+            }
+        return stats
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'device': _DEVICE,          # None until the first model load resolves it
+            'default_variant': self.default_variant,
+            'models': {
+                key: {'loaded': True, 'warm': key in self._warm}
+                for key in self._models
+            }
+        }
+
+
+MODEL_REGISTRY = ModelRegistry()
+for _demucs_name in DEMUCS_MODEL_NAMES:
+    MODEL_REGISTRY.register(
+        _demucs_name, functools.partial(_load_demucs_model, _demucs_name), _warmup_demucs_model, _demucs_batch_targets
+    )
+MODEL_REGISTRY.register(VOICE_MODEL_NAME, _load_voice_model, _warmup_voice_model)
+
+DEMUCS_SOURCE_NAMES = ['drums', 'bass', 'other', 'vocals']
+
+
+def warm_imports():
+    """
+    Imports torch and the Demucs API and probes FFmpeg, without loading any
+    weights. Run from a background thread at start-up so the first separation
+    request does not pay for the imports.
+    """
+    start = time.perf_counter()
+    try:
+        get_device()
+        _import_apply_model()
+        print(f"✓ AI dependencies imported in {time.perf_counter() - start:.2f}s (Device: {get_device()})")
+    except Exception as e:
+        print(f"⚠ Warning: Background import of AI dependencies failed: {e}")
+
+
+def start_background_warmup():
+    """ Runs warm_imports() in a daemon thread and returns the thread. """
+    thread = threading.Thread(target=warm_imports, name='ai-import-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+# --- PROGRESS REPORTING ---
+# demucs.apply walks its segments through `tqdm.tqdm(...)` when progress=True.
+# The shim below stands in for that module and forwards each finished segment
+# to the callback registered by the calling thread (if any), so concurrent
+# separations each see only their own progress.
+_progress_state = threading.local()
+
+
+class _SegmentProgressShim:
+    def __init__(self, real_tqdm):
+        self._real_tqdm = real_tqdm
+
+    def tqdm(self, iterable, *args, **kwargs):
+        callback = getattr(_progress_state, 'callback', None)
+        if callback is None:
+            return self._real_tqdm.tqdm(iterable, *args, **kwargs)
+        return _iterate_with_progress(list(iterable), callback)
+
+    def __getattr__(self, name):
+        return getattr(self._real_tqdm, name)
+
+
+def _iterate_with_progress(items, callback):
+    total = len(items)
+    for i, item in enumerate(items):
+        yield item
+        # The loop body has now run the segment through the model
+        callback((i + 1) / total)
+
+
+class separation_progress:
+    """ Context manager routing segment progress of this thread's separation to callback(fraction). """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def __enter__(self):
+        self._previous = getattr(_progress_state, 'callback', None)
+        _progress_state.callback = self.callback
+        return self
+
+    def __exit__(self, *exc):
+        _progress_state.callback = self._previous
+        return False
+
+
+def _import_apply_model():
+    """ Imports demucs.apply.apply_model with a helpful error if Demucs is missing. """
+    ensure_ffmpeg()
+    try:
+        import demucs.apply as demucs_apply
+    except ImportError as e:
+        raise ImportError(
+            f"Could not import Demucs API. Error: {e}\n"
+            "Please ensure Demucs is installed: pip install demucs\n"
+            "Try: pip install --upgrade demucs"
+        ) from e
+    if not isinstance(demucs_apply.tqdm, _SegmentProgressShim):
+        demucs_apply.tqdm = _SegmentProgressShim(demucs_apply.tqdm)
+    return demucs_apply.apply_model
+
+
+def _prepare_model_input(signal):
+    """
+    Brings a cached signal into the range the models expect, without any
+    16-bit quantization: float32, normalized only if it would clip.
+    Returns a [channels, samples] array.
+    """
+    signal_array = np.asarray(signal, dtype=np.float32)
+    if signal_array.ndim == 1:
+        signal_array = signal_array.reshape(1, -1)
+
+    max_val = np.max(np.abs(signal_array)) if signal_array.size else 0.0
     if max_val > 1.0:
         signal_array = signal_array / max_val
+    return signal_array
+
+
+def _normalize_stem(source_audio_mono):
+    """ Peak-normalizes a stem to 0.95 (or down to 1.0 if it clips), as the WAV export always did. """
+    max_val = np.max(np.abs(source_audio_mono))
+    if max_val > 1.0:
+        return source_audio_mono / max_val
+    if max_val > 0:
+        # Normalize to use full dynamic range if not clipping
+        return source_audio_mono / max_val * 0.95  # Leave some headroom
+    return source_audio_mono
+
+
+def _demucs_settings(preset=None):
+    """
+    Resolves a separation preset (config/separation_presets.json) into Demucs
+    settings; a preset without a CPU variant uses the registry default.
+    """
+    name, settings = resolve_preset(preset)
+    settings['variant'] = settings['variant'] or MODEL_REGISTRY.default_variant
+    if get_device() != "cpu" and settings['variant'] != 'fp32':
+        settings['variant'] = 'fp32'  # int8/traced builds are CPU-only
+    return name, settings
+
+
+def _apply_model_kwargs(settings):
+    """ demucs.apply.apply_model arguments for the given settings. """
+    kwargs = {'split': True, 'overlap': settings['overlap'], 'shifts': settings['shifts']}
+    if settings['segment'] is not None:
+        kwargs['segment'] = settings['segment']
+    return kwargs
+
+
+def _demucs_separate_array(apply_model, wav, sr, settings=None):
+    """
+    Runs Demucs (model and apply settings from _demucs_settings) on a
+    [channels, samples] float32 array.
+    Returns ({source_name: mono float32 array}, model_sample_rate).
+    """
+    settings = settings or _demucs_settings()[1]
+    # Shared model from the registry (downloaded and loaded only on first use)
+    model = MODEL_REGISTRY.get(settings['model'], settings['variant'])
+    
+    # Get model sample rate
+    model_sr = model.samplerate
     
-    # Save as PCM_16 WAV (standard format, widely compatible)
-    sf.write(temp_input_filepath, signal_array, int(Fs), format='WAV', subtype='PCM_16')
+    # Resample if needed (all channels in one call, cached polyphase filter)
+    if sr != model_sr:
+        print(f"Resampling from {sr} Hz to {model_sr} Hz...")
+        wav = resample(wav, sr, model_sr)
     
-    # Verify the file was created and is readable
-    if not os.path.exists(temp_input_filepath):
-        raise RuntimeError(f"Failed to create temporary audio file: {temp_input_filepath}")
+    # Convert to tensor and add batch dimension
+    wav_tensor = torch.from_numpy(np.ascontiguousarray(wav)).float().unsqueeze(0).to(get_device())  # [batch=1, channels, samples]
     
-    return temp_input_filepath
+    # Apply separation
+    print("Running separation (this may take a while)...")
+    with torch.no_grad():
+        sources = apply_model(model, wav_tensor, device=get_device(), progress=True, **_apply_model_kwargs(settings))
+    
+    # sources shape: [batch, sources, channels, samples]
+    # Expected sources order: ['drums', 'bass', 'other', 'vocals']
+    sources = sources.squeeze(0).cpu().numpy()  # [sources=4, channels, samples]
+    
+    separated = {}
+    for i, source_name in enumerate(DEMUCS_SOURCE_NAMES):
+        if i >= sources.shape[0]:
+            print(f"⚠ Warning: Source index {i} out of range (only {sources.shape[0]} sources)")
+            continue
+        # Convert to mono (average channels)
+        separated[source_name] = np.mean(sources[i], axis=0).astype(np.float32)
+    
+    return separated, model_sr
+
 
-def save_signal_to_temp(signal_array, Fs, signal_id, UPLOAD_FOLDER):
+def export_sources(sources, sample_rate, output_dir, subtype='PCM_16'):
     """
-    Saves the current signal (from cache) to a temporary WAV file for AI input.
-    Uses PCM_16 format which is widely compatible and doesn't require torchcodec.
+    Optional export of separated sources ({name: 1D array}) as WAV files.
+    Returns {name: file path}.
     """
-    temp_input_filename = f"ai_input_{signal_id}.wav"
-    temp_input_filepath = os.path.join(UPLOAD_FOLDER, temp_input_filename)
-    
-    # Ensure signal is in the right format (float32, normalized to [-1, 1])
-    if signal_array.dtype != np.float32:
-        signal_array = signal_array.astype(np.float32)
-    
-    # Normalize to prevent clipping
-    max_val = np.max(np.abs(signal_array))
-    if max_val > 1.0:
-        signal_array = signal_array / max_val
+    os.makedirs(output_dir, exist_ok=True)
 
-    # --- Convert mono → stereo for Demucs ---
-    if signal_array.ndim == 1:  
-        signal_array = np.stack([signal_array, signal_array], axis=1)  
-        # shape becomes (samples, 2)
+    def _export(item):
+        source_name, source_audio = item
+        output_path = os.path.join(output_dir, f"{source_name}.wav")
+        sf.write(output_path, source_audio, int(sample_rate), format='WAV', subtype=subtype)
+        return source_name, output_path
+
+    # Sources are written concurrently on the shared pool
+    sources_dict = dict(parallel_map(_export, sources.items()))
+    print(f"✓ Exported {len(sources_dict)} sources to {output_dir}")
+    return sources_dict
 
-    # Save as PCM_16 WAV
-    sf.write(temp_input_filepath, signal_array, int(Fs), format='WAV', subtype='PCM_16')
-    
-    if not os.path.exists(temp_input_filepath):
-        raise RuntimeError(f"Failed to create temporary audio file: {temp_input_filepath}")
-    
-    return temp_input_filepath
 
 # --- 1. DEMUCS IMPLEMENTATION ---
-def run_demucs_separation(input_filepath, Fs, output_dir):
+def separate_music(signal, Fs, progress_callback=None, preset=None):
     """
-    Runs the Demucs model (htdemucs) on the file and saves stems to output_dir.
-    Uses Python API with soundfile to avoid torchcodec issues.
+    Runs the Demucs model on an in-memory signal (1D mono or [channels, samples]).
+    Mono input is duplicated to stereo for the model.
+    preset picks the speed/quality settings ('fast', 'balanced', 'best'; None ->
+    default); an unknown preset raises ValueError.
+    progress_callback(fraction) is called after every processed segment.
+    Returns: ({'drums', 'bass', 'other', 'vocals': mono float32 array}, model_sample_rate)
     """
-    print(f"Running Demucs on {input_filepath} (Device: {DEVICE})...")
+    preset_name, settings = _demucs_settings(preset)
+    print(f"Running Demucs ({preset_name}: {settings['model']}) on {np.shape(signal)} samples @ {Fs} Hz (Device: {get_device()})...")
     
     try:
-        # Try to import Demucs API
-        try:
-            from demucs.pretrained import get_model
-            from demucs.apply import apply_model
-        except ImportError as e:
-            raise ImportError(
-                f"Could not import Demucs API. Error: {e}\n"
-                "Please ensure Demucs is installed: pip install demucs\n"
-                "Try: pip install --upgrade demucs"
-            ) from e
-        
-        # Load audio using soundfile (avoids torchcodec/torchaudio)
-        print("Loading audio file...")
-        wav, sr = sf.read(input_filepath, dtype='float32')
-        
-        # Demucs expects audio in shape [channels, samples]
-        # soundfile returns [samples, channels] for multi-channel
-        if len(wav.shape) == 1:
-            # Mono audio
-            wav = wav.reshape(1, -1)  # [1, samples]
+        apply_model = _import_apply_model()
+
+        # Demucs expects audio in shape [channels, samples], at most stereo
+        wav = _prepare_model_input(signal)
+        if wav.shape[0] == 1:
+            wav = np.repeat(wav, 2, axis=0)
+        elif wav.shape[0] > 2:
+            wav = wav[:2]  # Take first 2 channels if more than stereo
+
+        # Identical input + model settings -> reuse the cached stems
+        separation_params = {'variant': settings['variant'], **_apply_model_kwargs(settings)}
+        sharded = _use_sharding(wav.shape[1] / Fs)
+        if sharded:
+            separation_params['shards'] = {
+                'segment': SHARD_SETTINGS['segment_seconds'], 'overlap': SHARD_SETTINGS['overlap_seconds']
+            }
+        cache_key = make_separation_key(wav, Fs, settings['model'], separation_params)
+        cached = SEPARATION_CACHE.get(cache_key)
+
+        if cached is not None:
+            print("✓ Separation cache hit, skipping Demucs")
+            separated, sr = cached
         else:
-            # Multi-channel: transpose to [channels, samples]
-            wav = wav.T  # [channels, samples]
-            if wav.shape[0] > 2:
-                wav = wav[:2]  # Take first 2 channels if more than stereo
-        
-        # Convert to tensor and add batch dimension
-        wav_tensor = torch.from_numpy(wav).float().unsqueeze(0).to(DEVICE)  # [batch=1, channels, samples]
-        
-        # Load model (this will download on first use)
-        print("Loading Demucs model (htdemucs)...")
-        model = get_model('htdemucs')
-        model.to(DEVICE)
-        model.eval()
-        
-        # Get model sample rate
-        model_sr = model.samplerate
-        
-        # Resample if needed
-        if sr != model_sr:
-            print(f"Resampling from {sr} Hz to {model_sr} Hz...")
-            # Resample each channel separately
-            if wav.shape[0] == 1:
-                # Mono
-                wav_resampled = librosa.resample(wav[0], orig_sr=sr, target_sr=model_sr)
-                wav_resampled = wav_resampled.reshape(1, -1)
+            start = time.perf_counter()
+            if sharded:
+                separated, sr = _demucs_separate_sharded(wav, Fs, progress_callback, settings)
             else:
-                # Multi-channel: resample each channel
-                wav_resampled = np.array([
-                    librosa.resample(wav[i], orig_sr=sr, target_sr=model_sr)
-                    for i in range(wav.shape[0])
-                ])
-            wav = wav_resampled
-            wav_tensor = torch.from_numpy(wav).float().unsqueeze(0).to(DEVICE)
-            sr = model_sr
-        
-        # Apply separation
-        print("Running separation (this may take a while)...")
-        with torch.no_grad():
-            sources = apply_model(model, wav_tensor, device=DEVICE, split=True, overlap=0.25, progress=True)
-        
-        # sources shape: [batch, sources, channels, samples]
-        # Expected sources order: ['drums', 'bass', 'other', 'vocals']
-        sources = sources.squeeze(0).cpu().numpy()  # [sources=4, channels, samples]
-        
-        # Create output directory structure
-        input_file_base = os.path.splitext(os.path.basename(input_filepath))[0]
-        final_stems_path = os.path.join(output_dir, "htdemucs", input_file_base)
-        os.makedirs(final_stems_path, exist_ok=True)
-        
-        # Save each source using soundfile (avoids torchcodec)
-        source_names = ['drums', 'bass', 'other', 'vocals']
-        sources_dict = {}
-        
-        print("Saving separated sources...")
-        for i, source_name in enumerate(source_names):
-            if i >= sources.shape[0]:
-                print(f"⚠ Warning: Source index {i} out of range (only {sources.shape[0]} sources)")
-                continue
-            
-            source_audio = sources[i]  # [channels, samples]
-            
-            # Convert to mono if stereo (take mean of channels)
-            if source_audio.shape[0] > 1:
-                # Average channels for mono output
-                source_audio_mono = np.mean(source_audio, axis=0)
-            else:
-                source_audio_mono = source_audio[0]
-            
-            # Ensure it's 1D
-            if len(source_audio_mono.shape) > 1:
-                source_audio_mono = source_audio_mono.flatten()
-            
-            # Normalize to prevent clipping (but preserve dynamics)
-            max_val = np.max(np.abs(source_audio_mono))
-            if max_val > 1.0:
-                source_audio_mono = source_audio_mono / max_val
-            elif max_val > 0:
-                # Normalize to use full dynamic range if not clipping
-                source_audio_mono = source_audio_mono / max_val * 0.95  # Leave some headroom
-            
-            # Save with soundfile (use model sample rate)
-            output_path = os.path.join(final_stems_path, f"{source_name}.wav")
-            try:
-                sf.write(output_path, source_audio_mono, int(sr), format='WAV', subtype='PCM_16')
-                
-                if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                    file_size = os.path.getsize(output_path)
-                    sources_dict[source_name] = output_path
-                    print(f"✓ Saved {source_name}: {output_path} ({file_size} bytes)")
-                else:
-                    print(f"⚠ Warning: File created but is empty: {output_path}")
-            except Exception as e:
-                print(f"⚠ Warning: Failed to save {source_name}: {e}")
-        
-        if not sources_dict:
-            raise RuntimeError("Failed to save any separated sources.")
-        
-        print(f"✓ Successfully separated and saved {len(sources_dict)} sources")
-        return sources_dict
+                with separation_progress(progress_callback):
+                    separated, sr = _demucs_separate_array(apply_model, wav, Fs, settings)
+            # Measured speed of this preset on this host (shown to the UI as expected wait)
+            PRESET_TIMINGS.record(preset_name, wav.shape[1] / Fs, time.perf_counter() - start)
+            SEPARATION_CACHE.put(cache_key, separated, sr)
+        if progress_callback is not None:
+            progress_callback(1.0)
+
+        if not separated:
+            raise RuntimeError("Demucs returned no separated sources.")
+
+        stems = {source_name: _normalize_stem(audio) for source_name, audio in separated.items()}
+        print(f"✓ Successfully separated {len(stems)} sources")
+        return stems, sr
         
     except ImportError as e:
         # If Python API doesn't work, provide helpful error
@@ -383,69 +851,322 @@ def run_demucs_separation(input_filepath, Fs, output_dir):
         error_msg += "3. Or try downgrading PyTorch: pip install torch==2.4.0 torchaudio==2.4.0"
         raise RuntimeError(error_msg) from e
 
-def run_speechbrain_separation(input_filepath, Fs, output_dir):
+
+# --- 1b. STREAMING DEMUCS (progressive stems) ---
+STREAM_SEGMENT_SECONDS = 30.0
+STREAM_OVERLAP_SECONDS = 2.0
+
+
+def _stream_model_input(wav, sr, model_sr, block_samples):
+    """ Yields the [channels, samples] input at model_sr in blocks, resampling incrementally. """
+    total = wav.shape[1]
+    if sr == model_sr:
+        for start in range(0, total, block_samples):
+            yield wav[:, start:start + block_samples]
+        return
+    resampler = StreamingResampler(sr, model_sr)
+    for start in range(0, total, block_samples):
+        stop = min(start + block_samples, total)
+        block = resampler.process(wav[:, start:stop], final=stop >= total)
+        if block.shape[1]:
+            yield block
+
+
+def separate_music_streaming(signal, Fs, store_dir, segment_seconds=STREAM_SEGMENT_SECONDS,
+                             overlap_seconds=STREAM_OVERLAP_SECONDS, progress_callback=None, on_ready=None,
+                             preset=None):
     """
-    Runs the MultiDecoderDPRNN model with safety checks for Sample Rate and Channels.
+    Streaming variant of separate_music for long inputs: the signal is cut into
+    fixed-length segments that overlap by overlap_seconds, each segment is run
+    through the shared Demucs model on its own, neighbouring segments are joined
+    with a linear crossfade and every finished block is appended to a
+    StemStreamStore in store_dir.
+
+    on_ready(store) is called as soon as the store exists, so callers can
+    publish it and serve the completed prefix while separation continues.
+    Peak memory during separation is bounded by the segment size rather than the track length.
+    Stems are not peak-normalized (the final peak is unknown until the end).
+    Once complete, the stems are read back once and put in SEPARATION_CACHE.
+    preset selects the model settings as in separate_music.
+    Returns the completed StemStreamStore.
     """
-    print(f"Running MultiDecoderDPRNN on {input_filepath} (Device: {DEVICE})...")
-    
-    # 1. Load the model
-    model = _load_voice_model()
-    os.makedirs(output_dir, exist_ok=True)
+    preset_name, settings = _demucs_settings(preset)
+    print(f"Running streaming Demucs on {np.shape(signal)} samples @ {Fs} Hz "
+          f"({segment_seconds}s segments, {overlap_seconds}s overlap)...")
+
+    apply_model = _import_apply_model()
+
+    wav = _prepare_model_input(signal)
+    if wav.shape[0] == 1:
+        wav = np.repeat(wav, 2, axis=0)
+    elif wav.shape[0] > 2:
+        wav = wav[:2]
+
+    model = MODEL_REGISTRY.get(settings['model'], settings['variant'])
+    model_sr = model.samplerate
+    store = StemStreamStore(store_dir, DEMUCS_SOURCE_NAMES, model_sr)
+    store.total_samples = -(-wav.shape[1] * model_sr // int(Fs))
+    if on_ready is not None:
+        on_ready(store)
+
+    # A finished full-length separation of the same input is reused as one block
+    separation_params = {'variant': settings['variant'], **_apply_model_kwargs(settings)}
+    cache_key = make_separation_key(wav, Fs, settings['model'], separation_params)
+    cached = SEPARATION_CACHE.get(cache_key)
+    if cached is not None:
+        print("✓ Separation cache hit, filling the stream in one block")
+        store.append({name: _normalize_stem(audio) for name, audio in cached[0].items()})
+        store.finish()
+        if progress_callback is not None:
+            progress_callback(1.0)
+        return store
+
+    segment_len = int(segment_seconds * model_sr)
+    overlap = int(overlap_seconds * model_sr)
+    if segment_len <= overlap:
+        raise ValueError("segment_seconds must be larger than overlap_seconds.")
+    hop = segment_len - overlap
+    fade_in = crossfade_weights(overlap)
+
+    def _run_segment(segment):
+        wav_tensor = torch.from_numpy(np.ascontiguousarray(segment)).float().unsqueeze(0).to(get_device())
+        with torch.no_grad():
+            sources = apply_model(model, wav_tensor, device=get_device(), progress=False, **_apply_model_kwargs(settings))
+        sources = sources.squeeze(0).cpu().numpy()
+        return {name: np.mean(sources[i], axis=0).astype(np.float32) for i, name in enumerate(DEMUCS_SOURCE_NAMES)}
+
+    tail = None  # last `overlap` samples of the previous segment, waiting for the crossfade
+
+    def _emit(stems, final):
+        nonlocal tail
+        head_len = 0
+        if tail is not None:
+            head_len = min(overlap, len(stems[DEMUCS_SOURCE_NAMES[0]]))
+            w = fade_in[:head_len]
+            store.append({
+                name: tail[name][:head_len] * (1.0 - w) + stems[name][:head_len] * w
+                for name in DEMUCS_SOURCE_NAMES
+            })
+        keep = 0 if final else overlap
+        length = len(stems[DEMUCS_SOURCE_NAMES[0]])
+        store.append({name: stems[name][head_len:length - keep] for name in DEMUCS_SOURCE_NAMES})
+        tail = None if final else {name: stems[name][length - keep:] for name in DEMUCS_SOURCE_NAMES}
 
-    # 2. Load Audio
     try:
-        mixture, file_fs = torchaudio.load(input_filepath)
-        
-        # --- SAFETY CHECK 1: FORCE MONO ---
-        # If stereo (2, N), average to mono (1, N)
-        if mixture.shape[0] > 1:
-            mixture = torch.mean(mixture, dim=0, keepdim=True)
-
-        # --- SAFETY CHECK 2: RESAMPLE IF NEEDED ---
-        # Most Asteroid/DPRNN models expect 8000 Hz. 
-        # If your model is 8k but file is 44k, we must resample.
-        MODEL_SAMPLE_RATE = 8000 
-        
-        if file_fs != MODEL_SAMPLE_RATE:
-            resampler = torchaudio.transforms.Resample(orig_freq=file_fs, new_freq=MODEL_SAMPLE_RATE)
-            mixture = resampler(mixture)
+        pending = np.zeros((2, 0), dtype=np.float32)
+        for block in _stream_model_input(wav, int(Fs), model_sr, block_samples=max(1, hop * int(Fs) // model_sr)):
+            pending = np.concatenate([pending, block.astype(np.float32)], axis=1)
+            while pending.shape[1] >= segment_len + overlap:
+                # More input follows this segment, so keep its tail for the next crossfade
+                _emit(_run_segment(pending[:, :segment_len]), final=False)
+                pending = pending[:, hop:]
+                if progress_callback is not None:
+                    progress_callback(store.available_samples / max(store.total_samples, 1))
 
-        mixture = mixture.to(DEVICE)
+        # Remaining input: one last (possibly shorter) segment, emitted in full
+        if pending.shape[1] > (0 if tail is None else overlap):
+            _emit(_run_segment(pending), final=True)
+        elif tail is not None:
+            store.append(tail)
+        store.finish()
+    except BaseException as e:
+        store.finish(error=str(e) or type(e).__name__)
+        raise
 
-    except Exception as e:
-        raise RuntimeError(f"Failed to load/process audio file: {e}")
+    # The assembled stems serve the next blocking or streamed separation of this input
+    SEPARATION_CACHE.put(cache_key, store.snapshot(), model_sr)
+
+    if progress_callback is not None:
+        progress_callback(1.0)
+    print(f"✓ Streaming separation complete ({store.available_samples / model_sr:.1f}s per stem)")
+    return store
+
+
+# --- 1c. SHARDED DEMUCS (process pool) ---
+# One Demucs forward pass only scales over a few intra-op threads. For long
+# CPU inputs the track is cut into overlapping segments that run in separate
+# worker processes, each holding its own model copy with a fixed thread count,
+# and the stems are stitched back with windowed overlap-add.
+# Disabled until configure_sharding() is given workers (SHARD_WORKERS in app.py).
+SHARD_SETTINGS = {
+    'workers': 0,
+    'threads_per_worker': 1,
+    'min_seconds': 60.0,
+    'segment_seconds': 30.0,
+    'overlap_seconds': 2.0,
+}
+_SHARD_POOL = None
+_SHARD_POOL_LOCK = threading.Lock()
+
+
+def configure_sharding(workers, threads_per_worker=None, min_seconds=60.0, segment_seconds=30.0, overlap_seconds=2.0):
+    """ Applies the app configuration (called from create_app); the pool itself starts on first use. """
+    shutdown_sharding()
+    workers = max(0, int(workers))
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // max(workers, 1))
+    SHARD_SETTINGS.update({
+        'workers': workers,
+        'threads_per_worker': int(threads_per_worker),
+        'min_seconds': float(min_seconds),
+        'segment_seconds': float(segment_seconds),
+        'overlap_seconds': float(overlap_seconds),
+    })
+
+
+def shutdown_sharding():
+    global _SHARD_POOL
+    with _SHARD_POOL_LOCK:
+        if _SHARD_POOL is not None:
+            _SHARD_POOL.shutdown(wait=False, cancel_futures=True)
+            _SHARD_POOL = None
+
+
+def _use_sharding(duration_seconds):
+    return get_device() == "cpu" and SHARD_SETTINGS['workers'] > 1 and duration_seconds >= SHARD_SETTINGS['min_seconds']
+
+
+def _get_shard_pool():
+    """ Starts the worker processes on first use ('spawn', so no torch thread state is forked). """
+    global _SHARD_POOL
+    with _SHARD_POOL_LOCK:
+        if _SHARD_POOL is None:
+            _SHARD_POOL = ProcessPoolExecutor(
+                max_workers=SHARD_SETTINGS['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_shard_worker_init,
+                initargs=(SHARD_SETTINGS['threads_per_worker'], MODEL_REGISTRY.default_variant)
+            )
+            print(f"✓ Started {SHARD_SETTINGS['workers']} Demucs shard workers "
+                  f"({SHARD_SETTINGS['threads_per_worker']} threads each)")
+        return _SHARD_POOL
+
+
+def _shard_worker_init(threads, variant):
+    """ Runs once in every worker process: pins its thread count and loads its own model copy. """
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    MODEL_REGISTRY.default_variant = variant
+    MODEL_REGISTRY.configure_batching(1, 0)  # one caller per process, nothing to batch
+    settings = _demucs_settings()[1]
+    MODEL_REGISTRY.get(settings['model'], settings['variant'])
+
+
+def _shard_worker_separate(segment, settings):
+    """ Separates one [channels, samples] segment at the model rate; returns [sources, samples] mono stems. """
+    apply_model = _import_apply_model()
+    model = MODEL_REGISTRY.get(settings['model'], settings['variant'])
+    with torch.no_grad():
+        sources = apply_model(model, torch.from_numpy(segment).unsqueeze(0), device='cpu',
+                              progress=False, **_apply_model_kwargs(settings))
+    return sources[0].numpy().mean(axis=1).astype(np.float32)
+
+
+def _demucs_separate_sharded(wav, sr, progress_callback=None, settings=None):
+    """
+    Sharded counterpart of _demucs_separate_array for long inputs.
+    Returns ({source_name: mono float32 array}, model_sample_rate).
+    """
+    settings = settings or _demucs_settings()[1]
+    model_sr = MODEL_REGISTRY.get(settings['model'], settings['variant']).samplerate
+    if sr != model_sr:
+        wav = resample(wav, sr, model_sr)
+    wav = np.ascontiguousarray(wav, dtype=np.float32)
+
+    total = wav.shape[1]
+    overlap = int(SHARD_SETTINGS['overlap_seconds'] * model_sr)
+    segments = plan_segments(total, int(SHARD_SETTINGS['segment_seconds'] * model_sr), overlap)
+    print(f"Running sharded separation: {len(segments)} segments on {SHARD_SETTINGS['workers']} processes...")
+
+    pool = _get_shard_pool()
+    futures = {pool.submit(_shard_worker_separate, wav[:, start:stop], settings): start for start, stop in segments}
+    results = []
+    try:
+        for done, future in enumerate(as_completed(futures), start=1):
+            results.append((futures[future], future.result()))
+            if progress_callback is not None:
+                progress_callback(done / len(futures))
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+    stitched = overlap_add(sorted(results, key=lambda item: item[0]), total, overlap)
+    return {name: stitched[i] for i, name in enumerate(DEMUCS_SOURCE_NAMES)}, model_sr
+
+
+# --- 2. VOICE SEPARATION (MultiDecoderDPRNN) ---
+# Slices pushed through the network per forward pass (bounds activation memory)
+VOICE_SETTINGS = {'slice_size': DEFAULT_SLICE_SIZE, 'micro_batch_size': DEFAULT_MICRO_BATCH_SIZE}
 
-    # 3. Perform Separation
+
+def configure_voice_separation(micro_batch_size):
+    """ Applies the app configuration (called from create_app). """
+    VOICE_SETTINGS['micro_batch_size'] = max(1, int(micro_batch_size))
+
+
+def separate_voices(signal, Fs, progress_callback=None):
+    """
+    Runs the MultiDecoderDPRNN model on an in-memory signal, with safety checks
+    for Sample Rate and Channels.
+    progress_callback(fraction) is called before and after inference.
+    Returns: ({'speaker_1', 'speaker_2', ...: float32 array}, model_sample_rate)
+    """
+    print(f"Running MultiDecoderDPRNN on {np.shape(signal)} samples @ {Fs} Hz (Device: {get_device()})...")
+
+    # --- SAFETY CHECK 1: FORCE MONO ---
+    # If stereo (2, N), average to mono (1, N)
+    mixture = _prepare_model_input(signal)
+    if mixture.shape[0] > 1:
+        mixture = np.mean(mixture, axis=0, keepdims=True)
+
+    # Most Asteroid/DPRNN models expect 8000 Hz. 
+    MODEL_SAMPLE_RATE = VOICE_MODEL_SAMPLE_RATE
+
+    # Identical input + model settings -> reuse the cached speakers
+    cache_key = make_separation_key(
+        mixture, Fs, VOICE_MODEL_NAME, {'variant': MODEL_REGISTRY.default_variant, 'stitch': 'hann'}
+    )
+    cached = SEPARATION_CACHE.get(cache_key)
+    if cached is not None:
+        print("✓ Separation cache hit, skipping MultiDecoderDPRNN")
+        if progress_callback is not None:
+            progress_callback(1.0)
+        return cached[0], MODEL_SAMPLE_RATE
+
+    if progress_callback is not None:
+        progress_callback(0.0)
+
+    # --- SAFETY CHECK 2: RESAMPLE IF NEEDED ---
+    # If your model is 8k but the signal is 44k, we must resample.
+    if Fs != MODEL_SAMPLE_RATE:
+        mixture = resample(mixture, Fs, MODEL_SAMPLE_RATE)
+
+    # Perform Separation with the shared model from the registry
+    # (batched slice alignment + Hann overlap-add instead of forward_wav's stitching loop)
     try:
+        model = MODEL_REGISTRY.get(VOICE_MODEL_NAME)
         with torch.no_grad():
-            est_sources = model.separate(mixture)
+            est_sources = separate_long_recording(
+                model, torch.from_numpy(np.ascontiguousarray(mixture)).to(get_device()),
+                slice_size=VOICE_SETTINGS['slice_size'], micro_batch_size=VOICE_SETTINGS['micro_batch_size']
+            )
             est_sources = est_sources.cpu()
     except Exception as e:
         raise RuntimeError(f"Inference failed on MultiDecoderDPRNN: {e}")
 
-    # 4. Save Outputs
     if est_sources.ndim == 3 and est_sources.shape[0] == 1:
         est_sources = est_sources.squeeze(0)
 
-    sources_dict = {}
-    print(f"Saving {est_sources.shape[0]} separated sources...")
-    
-    for i in range(est_sources.shape[0]):
-        source_key = f"speaker_{i+1}"
-        output_filename = f"{source_key}.wav"
-        output_path = os.path.join(output_dir, output_filename)
-        
-        source_tensor = est_sources[i]
-        if source_tensor.ndim == 1:
-            source_tensor = source_tensor.unsqueeze(0)
-            
-        # IMPORTANT: Save at the MODEL'S sample rate (8000), not the original Fs
-        torchaudio.save(output_path, source_tensor, MODEL_SAMPLE_RATE)
-        sources_dict[source_key] = output_path
-
-    if not sources_dict:
-        raise RuntimeError("Model ran but failed to save any output files.")
-
-    print(f"✓ MultiDecoderDPRNN separation complete. Saved {list(sources_dict.keys())}")
-    return sources_dict
\ No newline at end of file
+    speakers = {
+        f"speaker_{i+1}": est_sources[i].reshape(-1).numpy().astype(np.float32)
+        for i in range(est_sources.shape[0])
+    }
+    if not speakers:
+        raise RuntimeError("MultiDecoderDPRNN ran but produced no sources.")
+
+    SEPARATION_CACHE.put(cache_key, speakers, MODEL_SAMPLE_RATE)
+    if progress_callback is not None:
+        progress_callback(1.0)
+    print(f"✓ MultiDecoderDPRNN separation complete. Separated {list(speakers.keys())}")
+    return speakers, MODEL_SAMPLE_RATE
@@ -0,0 +1,236 @@
+# BackEnd/utils/analysis_store.py
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+import numpy as np
+
+from custom_fft import custom_fft, get_fft_components
+from spectrogram import custom_spectrogram
+
+# --- Defaults (overridden by create_app) ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_ANALYSIS_DIR = os.path.join(BASE_DIR, 'cache', 'analysis')
+DEFAULT_DISK_MB = 4096
+ENVELOPE_BIN_SECONDS = 0.01
+META_NAME = 'meta.json'
+ARRAY_NAMES = ('signal', 'half_spectrum', 'magnitudes_db', 'spectrogram', 'envelope_min', 'envelope_max')
+
+
+def pcm_digest(signal, Fs):
+    """ Content address of a decoded upload: hash of its float32 PCM and sample rate (not of the file bytes). """
+    pcm = np.ascontiguousarray(signal, dtype=np.float32)
+    digest = hashlib.sha256()
+    digest.update(pcm.tobytes())
+    digest.update(str(pcm.shape).encode())
+    digest.update(str(int(Fs)).encode())
+    return digest.hexdigest()
+
+
+def waveform_envelope(signal, Fs, bin_seconds=ENVELOPE_BIN_SECONDS):
+    """ (min, max) of the waveform per bin_seconds bin, the last bin partial; as progressive_ingest.WaveformEnvelope. """
+    bin_samples = max(1, int(round(Fs * bin_seconds)))
+    usable = len(signal) - len(signal) % bin_samples
+    bins = np.asarray(signal[:usable]).reshape(-1, bin_samples)
+    minimum, maximum = bins.min(axis=1), bins.max(axis=1)
+    if usable < len(signal):
+        minimum = np.append(minimum, signal[usable:].min())
+        maximum = np.append(maximum, signal[usable:].max())
+    return minimum.astype(np.float32), maximum.astype(np.float32)
+
+
+class AnalysisArtifact:
+    """
+    Everything the upload routes compute for one decoded signal: the signal,
+    the non-negative half of its custom_fft spectrum, the magnitude plot, the
+    spectrogram and the waveform envelope. Never changed once written; signal
+    entries reference its arrays and keep their own EQ state.
+    """
+
+    def __init__(self, digest, Fs, fft_size, arrays):
+        self.digest = digest
+        self.Fs = int(Fs)
+        self.fft_size = int(fft_size)
+        self.arrays = arrays   # {name in ARRAY_NAMES: array}, memory-mapped once stored
+
+    @property
+    def frequencies(self):
+        """ The frequency axis of magnitudes_db (as get_fft_components computes it). """
+        return np.linspace(0, self.Fs / 2, self.fft_size // 2, endpoint=False)
+
+    def signal_entry(self):
+        """ A new SIGNAL_CACHE entry on this artifact (the signal_store.compact_signal_entry layout, arrays shared). """
+        return {
+            'Fs': self.Fs,
+            'time_series': self.arrays['signal'],
+            'half_spectrum': self.arrays['half_spectrum'],
+            'fft_size': self.fft_size,
+            'eq_scheme': None,
+            'output_path': None,
+            'analysis_id': self.digest
+        }
+
+    def upload_payload(self):
+        """ The 'data' of an /upload response. """
+        return {
+            'full_time_series': self.arrays['signal'].tolist(),
+            'frequencies': self.frequencies.tolist(),
+            'magnitudes_db': self.arrays['magnitudes_db'].tolist(),
+            'spectrogram_data': self.arrays['spectrogram'].tolist()
+        }
+
+
+class AnalysisStore:
+    """
+    Content-addressed store of AnalysisArtifacts, one directory per PCM digest
+    holding each array as a .npy file and a meta.json. Uploading the same audio
+    again (by any user, worker process or after a restart) finds the artifact
+    and skips the FFT and spectrogram. Artifacts are opened as read-only
+    memmaps, so all signal_ids on one artifact share its pages. Beyond
+    max_disk_bytes the least recently used are deleted (signals still mapping
+    them keep their data).
+    With directory=None artifacts are computed but not kept.
+    """
+
+    def __init__(self, directory=DEFAULT_ANALYSIS_DIR, max_disk_mb=DEFAULT_DISK_MB):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.configure(directory, max_disk_mb)
+
+    def configure(self, directory, max_disk_mb):
+        self.directory = directory
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest)
+
+    # --- Lookups ---
+    def get(self, digest):
+        """ The stored artifact for a digest (arrays memory-mapped), or None. """
+        if not self.directory:
+            return None
+        path = self._path(digest)
+        try:
+            with open(os.path.join(path, META_NAME)) as f:
+                meta = json.load(f)
+            arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in ARRAY_NAMES}
+            os.utime(path)   # last use, for the LRU
+        except (OSError, ValueError, KeyError):
+            return None
+        return AnalysisArtifact(digest, meta['Fs'], meta['fft_size'], arrays)
+
+    def analyze(self, signal, Fs, spectrogram=None, envelope=None):
+        """
+        The artifact of a decoded signal and whether it was reused: looked up
+        by pcm_digest, or computed and stored. A spectrogram matrix and (min,
+        max) envelope already computed while decoding are taken as they are.
+        """
+        digest = pcm_digest(signal, Fs)
+        artifact = self.get(digest)
+        with self._lock:
+            if artifact is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if artifact is not None:
+            return artifact, True
+
+        signal = np.asarray(signal, dtype=np.float32)
+        fft = custom_fft(signal)
+        _, magnitudes_db, _ = get_fft_components(fft, Fs)
+        if spectrogram is None:
+            spectrogram = custom_spectrogram(signal, Fs)
+        if envelope is None:
+            envelope = waveform_envelope(signal, Fs)
+        arrays = {
+            'signal': signal,
+            'half_spectrum': np.asarray(fft[:len(fft) // 2 + 1], dtype=np.complex64),
+            'magnitudes_db': np.asarray(magnitudes_db, dtype=np.float32),
+            'spectrogram': np.asarray(spectrogram, dtype=np.float32),
+            'envelope_min': np.asarray(envelope[0], dtype=np.float32),
+            'envelope_max': np.asarray(envelope[1], dtype=np.float32),
+        }
+        artifact = AnalysisArtifact(digest, Fs, len(fft), arrays)
+        if self.directory:
+            try:
+                artifact = self._put(artifact)
+            except OSError as e:
+                print(f"⚠ Warning: Could not store the analysis of {digest[:12]}: {e}")
+        return artifact, False
+
+    # --- Writes ---
+    def _put(self, artifact):
+        """ Writes the artifact once (another process may have just done so) and returns it memory-mapped. """
+        path = self._path(artifact.digest)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        os.makedirs(tmp_path)
+        try:
+            for name, array in artifact.arrays.items():
+                np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+            with open(os.path.join(tmp_path, META_NAME), 'w') as f:
+                json.dump({'Fs': artifact.Fs, 'fft_size': artifact.fft_size, 'created': time.time()}, f)
+            os.rename(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+        self._evict(keep=artifact.digest)
+        return self.get(artifact.digest) or artifact
+
+    def _evict(self, keep=None):
+        """ Deletes least recently used artifacts beyond max_disk_bytes. """
+        found = []
+        for name in os.listdir(self.directory):
+            path = self._path(name)
+            if name.endswith('.tmp') or not os.path.isdir(path):
+                continue
+            nbytes = sum(entry.stat().st_size for entry in os.scandir(path))
+            found.append((os.path.getmtime(path), name, nbytes))
+        total = sum(nbytes for _, _, nbytes in found)
+        for _, name, nbytes in sorted(found):
+            if total <= self.max_disk_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(self._path(name), ignore_errors=True)
+            total -= nbytes
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self):
+        artifacts, nbytes = 0, 0
+        if self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                path = self._path(name)
+                if not name.endswith('.tmp') and os.path.isdir(path):
+                    artifacts += 1
+                    nbytes += sum(entry.stat().st_size for entry in os.scandir(path))
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'artifacts': artifacts,
+                'disk_bytes': nbytes,
+                'max_disk_bytes': self.max_disk_bytes,
+                'directory': self.directory,
+            }
+
+
+# Process-wide store shared by every upload route
+ANALYSIS_STORE = AnalysisStore()
+
+
+def configure_analysis_store(directory, max_disk_mb):
+    """ Applies the app configuration to the shared store (called from create_app); an empty directory disables it. """
+    ANALYSIS_STORE.configure(directory or None, max_disk_mb)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return ANALYSIS_STORE
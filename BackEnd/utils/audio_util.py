@@ -1,28 +1,282 @@
 # Backend/utils/audio_util.py
 
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
 import numpy as np
 import soundfile as sf
-import librosa
+
+# --- Decoder Dispatch ---
+# WAV/FLAC are read by soundfile straight into float32 at their own rate;
+# compressed formats are decoded by an FFmpeg subprocess into a float32 pipe.
+# librosa is only the fallback when neither can read the file.
+NATIVE_FORMATS = {'wav', 'flac'}
+FFMPEG_FORMATS = {'mp3', 'opus', 'ogg', 'm4a', 'aac', 'webm'}
+# Containers FFmpeg cannot decode from a pipe (the index may sit at the end of the file)
+SEEKABLE_ONLY_FORMATS = {'m4a'}
+READ_BLOCK_FRAMES = 1 << 16
+FFMPEG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ffmpeg', 'bin')
+
+
+def _ffmpeg_binary():
+    """ The bundled BackEnd/ffmpeg/bin build if present, otherwise ffmpeg from PATH (None if missing). """
+    return shutil.which('ffmpeg', path=FFMPEG_DIR) or shutil.which('ffmpeg')
+
+
+def _average_channels(block, out, scale=1.0):
+    """ out[:] = scale * mean of block's columns ([frames, channels]), one vectorized add per channel. """
+    np.copyto(out, block[:, 0], casting='unsafe')
+    for channel in range(1, block.shape[1]):
+        out += block[:, channel]
+    out *= scale / block.shape[1]
+    return out
+
+
+def _read_native(filepath):
+    """ soundfile block reads into one preallocated float32 buffer, averaging channels block by block. """
+    with sf.SoundFile(filepath) as f:
+        Fs, channels, frames = f.samplerate, f.channels, f.frames
+        signal = np.empty(frames, dtype=np.float32)
+        if channels == 1 and f.subtype != 'PCM_16':
+            read = f.read(frames, dtype='float32', out=signal)
+            return signal[:len(read)], Fs
+
+        # 16-bit PCM is read as int16 and scaled here (same 1/32768 as libsndfile, half the bytes to copy)
+        pcm16 = f.subtype == 'PCM_16'
+        block = np.empty((READ_BLOCK_FRAMES, channels), dtype=np.int16 if pcm16 else np.float32)
+        scale = 1.0 / 32768.0 if pcm16 else 1.0
+        position = 0
+        while position < frames:
+            read = f.read(min(READ_BLOCK_FRAMES, frames - position), dtype=block.dtype.name, out=block)
+            if len(read) == 0:
+                break
+            _average_channels(read, signal[position:position + len(read)], scale)
+            position += len(read)
+    return signal[:position], Fs
+
+
+def _parse_wav_stream_header(stream):
+    """ Reads a RIFF/WAVE header off a pipe up to the start of the samples; returns (sample rate, channels). """
+    riff = stream.read(12)
+    if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        raise ValueError("FFmpeg did not produce a WAV stream")
+    Fs = channels = None
+    while True:
+        chunk_header = stream.read(8)
+        if len(chunk_header) < 8:
+            raise ValueError("WAV stream ended before the data chunk")
+        chunk_id, chunk_size = chunk_header[:4], struct.unpack('<I', chunk_header[4:])[0]
+        if chunk_id == b'data':
+            # Size is a placeholder on a pipe: the samples run to the end of the stream
+            return Fs, channels
+        body = stream.read(chunk_size + (chunk_size & 1))
+        if chunk_id == b'fmt ':
+            channels, Fs = struct.unpack('<HI', body[2:8])
+
+
+def _downmix_interleaved_inplace(data, channels):
+    """
+    Averages interleaved float32 samples held in a bytearray down to mono,
+    writing each block's mean over the front of the same buffer (the output
+    never catches up with unread input), then trims the buffer to the result.
+    """
+    frames = len(data) // (4 * channels)
+    if channels > 1:
+        interleaved = np.frombuffer(data, dtype=np.float32, count=frames * channels)
+        samples = interleaved.reshape(frames, channels)
+        mono = np.empty(READ_BLOCK_FRAMES, dtype=np.float32)
+        for start in range(0, frames, READ_BLOCK_FRAMES):
+            stop = min(start + READ_BLOCK_FRAMES, frames)
+            interleaved[start:stop] = _average_channels(samples[start:stop], mono[:stop - start])
+        del interleaved, samples   # release the buffer export so it can be resized
+    del data[frames * 4:]
+    return np.frombuffer(data, dtype=np.float32)
+
+
+def _feed_pipe(source, pipe):
+    """ Copies a file object into a subprocess's stdin (run on its own thread). """
+    try:
+        while True:
+            chunk = source.read(READ_BLOCK_FRAMES * 4)
+            if not chunk:
+                break
+            pipe.write(chunk)
+    except (BrokenPipeError, OSError):
+        pass   # FFmpeg exited early; its return code reports why
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+
+def _stop_ffmpeg(process, feeder):
+    """ Closes the pipes, waits for FFmpeg (and the stdin feeder) and returns its stderr text. """
+    process.stdout.close()
+    stderr = process.stderr.read().decode(errors='replace').strip()
+    process.stderr.close()
+    process.wait()
+    if feeder is not None:
+        feeder.join()
+    return stderr
+
+
+@contextmanager
+def _ffmpeg_pcm(source):
+    """
+    Runs FFmpeg on a path or a readable file object (fed through stdin) and
+    yields (Fs, channels, pipe) where the pipe carries interleaved float32
+    samples at the original rate. Raises RuntimeError if FFmpeg fails.
+    """
+    ffmpeg = _ffmpeg_binary()
+    if ffmpeg is None:
+        raise FileNotFoundError("FFmpeg not found")
+    from_stream = not isinstance(source, (str, os.PathLike))
+    # No '-ac 1': FFmpeg's mono downmix scales by 1/sqrt(2), not the plain channel average
+    command = [ffmpeg, '-nostdin', '-v', 'error', '-i', 'pipe:0' if from_stream else source,
+               '-vn', '-map_metadata', '-1', '-c:a', 'pcm_f32le', '-f', 'wav', '-']
+    process = subprocess.Popen(command, stdin=subprocess.PIPE if from_stream else None,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    feeder = None
+    if from_stream:
+        feeder = threading.Thread(target=_feed_pipe, args=(source, process.stdin), daemon=True)
+        feeder.start()
+
+    try:
+        Fs, channels = _parse_wav_stream_header(process.stdout)
+    except ValueError as e:
+        # Usually FFmpeg gave up on the input; its stderr says why
+        stderr = _stop_ffmpeg(process, feeder)
+        raise RuntimeError(f"FFmpeg failed: {stderr or e}") from None
+    try:
+        yield Fs, channels, process.stdout
+    finally:
+        stderr = _stop_ffmpeg(process, feeder)
+    if process.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed: {stderr}")
+
+
+def _read_ffmpeg(source):
+    """ Decodes a compressed file with FFmpeg into float32 at its original rate, then averages the channels. """
+    with _ffmpeg_pcm(source) as (Fs, channels, pcm):
+        data = bytearray()
+        while True:
+            chunk = pcm.read(READ_BLOCK_FRAMES * 4)
+            if not chunk:
+                break
+            data += chunk
+    return _downmix_interleaved_inplace(data, channels), Fs
+
+
+def _read_librosa(filepath):
+    # Imported here: librosa (numba, scipy) adds seconds to server start-up
+    import librosa
+    signal, Fs = librosa.load(filepath, sr=None, mono=True)
+    return signal.astype(np.float32, copy=False), Fs
+
 
 def load_audio_to_numpy(filepath):
-    """ 
-    Loads an audio file using librosa, which bypasses the pydub/audioop dependency issues.
-    Returns: 1D float64 NumPy array and the sampling rate (Fs).
     """
+    Decodes an audio file to mono at its original sampling rate.
+    WAV/FLAC go through soundfile, compressed formats through FFmpeg, and
+    librosa is tried last if those fail.
+    Returns: 1D float32 NumPy array and the sampling rate (Fs).
+    """
+    extension = os.path.splitext(filepath)[1].lstrip('.').lower()
+    decoders = []
+    if extension in NATIVE_FORMATS:
+        decoders.append(_read_native)
+    elif extension in FFMPEG_FORMATS:
+        decoders.append(_read_ffmpeg)
+    decoders.append(_read_librosa)
+
+    for decoder in decoders:
+        try:
+            signal_float, Fs = decoder(filepath)
+            return signal_float, int(Fs)
+        except Exception as e:
+            print(f"⚠ Warning: {decoder.__name__} could not decode {os.path.basename(filepath)}: {e}")
+    print(f"Error processing audio file: no decoder could read {filepath}")
+    return None, None
+
+def load_audio_from_stream(stream, filename, spill_dir=None):
+    """
+    Decodes an uploaded file object (e.g. request.files['file'].stream) without
+    saving it first: WAV/FLAC are block-read by soundfile and compressed formats
+    are piped into FFmpeg. Only when that fails, or the container needs random
+    access, is the upload copied to a temporary file in spill_dir and decoded
+    from disk. Returns the same as load_audio_to_numpy.
+    """
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    decoders = []
+    if extension in NATIVE_FORMATS:
+        decoders.append(_read_native)
+    elif extension in FFMPEG_FORMATS and extension not in SEEKABLE_ONLY_FORMATS:
+        decoders.append(_read_ffmpeg)
+
+    for decoder in decoders:
+        try:
+            stream.seek(0)
+            signal_float, Fs = decoder(stream)
+            return signal_float, int(Fs)
+        except Exception as e:
+            print(f"⚠ Warning: {decoder.__name__} could not decode {filename} from the upload stream: {e}")
+
+    stream.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=f".{extension}", dir=spill_dir, delete=False) as spill:
+        shutil.copyfileobj(stream, spill, READ_BLOCK_FRAMES * 16)
     try:
-        # Load audio data (y) and original sampling rate (Fs)
-        # mono=True ensures downmix, sr=None preserves original Fs
-        signal_float, Fs = librosa.load(filepath, sr=None, mono=True)
-        
-        # Librosa loads as float32; convert to float64 for consistency 
-        signal_float = signal_float.astype(np.float64)
-        
-        return signal_float, Fs
-        
-    except Exception as e:
-        print(f"Error processing audio file with librosa: {e}")
-        return None, None
+        return load_audio_to_numpy(spill.name)
+    finally:
+        os.remove(spill.name)
+
+
+def iter_audio_blocks(source, filename, block_frames=READ_BLOCK_FRAMES):
+    """
+    Decodes a path or file object incrementally, yielding (Fs, block) with
+    each block a 1D float32 mono array of up to block_frames samples.
+    WAV/FLAC are read by soundfile, the formats in FFMPEG_FORMATS by FFmpeg.
+    Without FFmpeg (or for a SEEKABLE_ONLY_FORMATS upload stream) the whole
+    file is decoded first by load_audio_to_numpy's decoders, then yielded.
+    """
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    from_stream = not isinstance(source, (str, os.PathLike))
+    streamable = _ffmpeg_binary() is not None and not (from_stream and extension in SEEKABLE_ONLY_FORMATS)
+    if extension in NATIVE_FORMATS:
+        with sf.SoundFile(source) as f:
+            pcm16 = f.subtype == 'PCM_16'
+            block = np.empty((block_frames, f.channels), dtype=np.int16 if pcm16 else np.float32)
+            scale = 1.0 / 32768.0 if pcm16 else 1.0
+            while True:
+                read = f.read(block_frames, dtype=block.dtype.name, out=block)
+                if len(read) == 0:
+                    break
+                yield f.samplerate, _average_channels(read, np.empty(len(read), dtype=np.float32), scale)
+    elif extension in FFMPEG_FORMATS and streamable:
+        with _ffmpeg_pcm(source) as (Fs, channels, pcm):
+            frame_bytes = 4 * channels
+            while True:
+                chunk = pcm.read(block_frames * frame_bytes)
+                usable = len(chunk) - len(chunk) % frame_bytes
+                if usable == 0:
+                    break
+                interleaved = np.frombuffer(chunk, dtype=np.float32, count=usable // 4).reshape(-1, channels)
+                yield Fs, _average_channels(interleaved, np.empty(len(interleaved), dtype=np.float32))
+    elif extension in FFMPEG_FORMATS:
+        signal, Fs = load_audio_from_stream(source, filename) if from_stream else load_audio_to_numpy(source)
+        if signal is None:
+            hint = "" if _ffmpeg_binary() is not None else " (FFmpeg is not installed)"
+            raise ValueError(f"Could not decode {filename}{hint}.")
+        for start in range(0, len(signal), block_frames):
+            yield Fs, signal[start:start + block_frames]
+    else:
+        raise ValueError(f"Unsupported audio format: .{extension}")
+
 
 def save_numpy_to_wav(signal_float, Fs, filepath):
     """ Saves a normalized float NumPy array to a WAV file using soundfile. """
-    sf.write(filepath, signal_float, Fs, format='WAV', subtype='PCM_16')
\ No newline at end of file
+    sf.write(filepath, signal_float, Fs, format='WAV', subtype='PCM_16')
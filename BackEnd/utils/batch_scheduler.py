@@ -0,0 +1,166 @@
+# BackEnd/utils/batch_scheduler.py
+import os
+import time
+import threading
+import weakref
+from concurrent.futures import Future
+from lazy_import import lazy_import
+
+torch = lazy_import('torch')
+
+# --- Cross-request Batching ---
+# Concurrent separations all call the same shared model one segment at a time.
+# The scheduler sits in front of a module's forward(): calls that arrive within
+# a short window with the same input shape are concatenated along the batch
+# dimension, run as one forward pass, and the outputs are split back to callers.
+DEFAULT_MAX_BATCH_SIZE = 4
+DEFAULT_MAX_WAIT_MS = 20.0
+
+# Every live scheduler, so a forked worker can reset the ones it inherited
+_SCHEDULERS = weakref.WeakSet()
+
+
+class BatchScheduler:
+    """
+    Groups concurrent run(x) calls into batched run_batch(torch.cat(xs)) calls.
+    A batch is dispatched once it holds max_batch_size items or its oldest item
+    has waited max_wait_ms. Only inputs with identical shape (apart from the
+    batch dimension) and dtype are batched together.
+    """
+
+    def __init__(self, run_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, name='batch'):
+        self.run_batch = run_batch
+        self.name = name
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []   # [(shape key, tensor, future, enqueued_at)]
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        _SCHEDULERS.add(self)
+
+    def _reset_after_fork(self):
+        """ A forked child inherits the queue but not the dispatcher thread; start over empty. """
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def configure(self, max_batch_size, max_wait_ms):
+        with self._cond:
+            self.max_batch_size = int(max_batch_size)
+            self.max_wait = max_wait_ms / 1000.0
+            self._cond.notify_all()
+
+    def run(self, x):
+        """ Drop-in for the wrapped forward(x): blocks until this input's slice of a batch is ready. """
+        if self.max_batch_size <= 1 or self._closed:
+            self._count(x.shape[0])
+            return self._forward(x)
+
+        future = Future()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=f"{self.name}-scheduler", daemon=True)
+                self._thread.start()
+            self._pending.append(((tuple(x.shape[1:]), x.dtype, x.device), x, future, time.monotonic()))
+            self._cond.notify_all()
+        return future.result()
+
+    def _forward(self, x):
+        with torch.no_grad():
+            return self.run_batch(x)
+
+    def _count(self, batch_size):
+        self.batches += 1
+        self.items += batch_size
+        self.largest_batch = max(self.largest_batch, batch_size)
+
+    def _next_batch(self):
+        """ Waits for a full batch (or the oldest item's deadline) and removes it from the queue. """
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+
+            key, _, _, oldest = self._pending[0]
+            while True:
+                queued = sum(item[1].shape[0] for item in self._pending if item[0] == key)
+                remaining = oldest + self.max_wait - time.monotonic()
+                if queued >= self.max_batch_size or remaining <= 0 or self._closed:
+                    break
+                self._cond.wait(remaining)
+
+            batch, size = [], 0
+            for item in self._pending:
+                if item[0] != key:
+                    continue
+                if batch and size + item[1].shape[0] > self.max_batch_size:
+                    break
+                batch.append(item)
+                size += item[1].shape[0]
+            self._pending = [item for item in self._pending if not any(item is b for b in batch)]
+            return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            inputs = [item[1] for item in batch]
+            futures = [item[2] for item in batch]
+            sizes = [x.shape[0] for x in inputs]
+            self._count(sum(sizes))
+            try:
+                output = self._forward(inputs[0] if len(inputs) == 1 else torch.cat(inputs, dim=0))
+                outputs = [output] if len(inputs) == 1 else torch.split(output, sizes, dim=0)
+            except BaseException as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, out in zip(futures, outputs):
+                future.set_result(out)
+
+    def close(self):
+        """ Flushes the queue and stops the dispatcher thread. """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': round(self.max_wait * 1000.0, 3),
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': round(self.items / self.batches, 3) if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+        }
+
+
+def _reset_schedulers_after_fork():
+    for scheduler in list(_SCHEDULERS):
+        scheduler._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_schedulers_after_fork)
+
+
+def attach_batch_scheduler(module, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, name='batch'):
+    """
+    Routes module(x) through a BatchScheduler by shadowing the instance's
+    forward(). Returns the scheduler (already attached ones are reused).
+    """
+    scheduler = getattr(module, '_batch_scheduler', None)
+    if scheduler is not None:
+        scheduler.configure(max_batch_size, max_wait_ms)
+        return scheduler
+    scheduler = BatchScheduler(module.forward, max_batch_size, max_wait_ms, name=name)
+    module._batch_scheduler = scheduler
+    module.forward = scheduler.run
+    return scheduler
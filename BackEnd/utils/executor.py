@@ -0,0 +1,130 @@
+# BackEnd/utils/executor.py
+import os
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Shared Worker Pool ---
+# One pool per process, configured by create_app() and reused by every request.
+# Stems, metrics and visualizations are independent NumPy-heavy jobs, so they
+# are fanned out here instead of each request spawning its own threads.
+THREAD_NAME_PREFIX = 'stem-worker'
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def default_worker_count():
+    """ Number of workers used when none is configured (one per host core). """
+    return os.cpu_count() or 1
+
+
+def init_executor(max_workers=None):
+    """
+    Creates (or replaces) the shared thread pool.
+    Called once from create_app() with the configured worker count.
+    """
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=False)
+        _EXECUTOR = ThreadPoolExecutor(
+            max_workers=max_workers or default_worker_count(),
+            thread_name_prefix=THREAD_NAME_PREFIX
+        )
+        return _EXECUTOR
+
+
+def get_executor():
+    """ Returns the shared pool, creating a default-sized one if create_app() was not used. """
+    if _EXECUTOR is None:
+        return init_executor()
+    return _EXECUTOR
+
+
+def shutdown_executor(wait=True):
+    """ Stops the shared pool (used on app teardown and by benchmark scripts). """
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=wait)
+            _EXECUTOR = None
+
+
+def _in_worker_thread():
+    return threading.current_thread().name.startswith(THREAD_NAME_PREFIX)
+
+
+def submit(func, *args, **kwargs):
+    """
+    Schedules func on the shared pool and returns a Future.
+    From inside a pool worker the call runs inline, so nested fan-outs can never
+    deadlock waiting for a free worker.
+    """
+    if _in_worker_thread():
+        future = _CompletedFuture()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return get_executor().submit(func, *args, **kwargs)
+
+
+def parallel_map(func, items):
+    """ Applies func to every item on the shared pool and returns the results in input order. """
+    items = list(items)
+    if len(items) <= 1 or _in_worker_thread():
+        return [func(item) for item in items]
+    return list(get_executor().map(func, items))
+
+
+class _CompletedFuture:
+    """ Minimal Future stand-in for work that already ran inline. """
+
+    def __init__(self):
+        self._result = None
+        self._exception = None
+
+    def set_result(self, result):
+        self._result = result
+
+    def set_exception(self, exception):
+        self._exception = exception
+
+    def result(self, timeout=None):
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
+# --- Per-Stage Timing ---
+class StageTimer:
+    """
+    Collects wall-clock durations (in ms) for named pipeline stages.
+    Safe to use from several pool workers at once.
+    """
+
+    def __init__(self):
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._timings[name] = round(elapsed_ms, 2)
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._timings)
+
+    def report(self, label):
+        """ Prints the collected timings on one line for the server log. """
+        parts = ', '.join(f"{name}={ms:.1f}ms" for name, ms in self.as_dict().items())
+        print(f"[{label}] stage timings: {parts}")
@@ -0,0 +1,201 @@
+# BackEnd/utils/job_manager.py
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Background Job Queue ---
+# Long AI separations run here instead of on a Flask request thread. The pool is
+# separate from the shared stem pool (executor.py) so a job can still fan its
+# stems out there.
+JOB_THREAD_NAME_PREFIX = 'separation-job'
+DEFAULT_JOB_WORKERS = 1
+DEFAULT_MAX_FINISHED_JOBS = 200
+DEFAULT_MAX_RESULT_MB = 512   # encoded results of finished jobs kept for /result
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = 'queued', 'running', 'completed', 'failed', 'cancelled'
+FINISHED_STATES = {COMPLETED, FAILED, CANCELLED}
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a running job once cancellation has been requested.
+    Derives from BaseException (like asyncio.CancelledError) so the pipeline's
+    `except Exception` error wrappers let it through untouched.
+    """
+
+
+class Job:
+    """ One submitted unit of work plus its observable state. """
+
+    def __init__(self, kind, params=None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.params = params or {}
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = 'Queued'
+        self.result_json = None   # the result, JSON-encoded once the job completes
+        self.result_expired = False
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """ Cooperative cancellation point for long-running work. """
+        if self._cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled.")
+
+    def report_progress(self, fraction, message=None):
+        """ Progress callback handed to the pipeline (0.0 - 1.0); also a cancellation point. """
+        self.check_cancelled()
+        self.progress = round(min(max(float(fraction), 0.0), 1.0), 4)
+        if message:
+            self.message = message
+
+    def to_dict(self):
+        elapsed_end = self.finished_at or time.time()
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'created_at': self.created_at,
+            'elapsed_s': round(elapsed_end - self.started_at, 3) if self.started_at else None,
+            'params': self.params,
+        }
+
+
+class JobManager:
+    """
+    In-process job queue: submit() returns immediately with a Job whose status,
+    progress and result can be polled; queued or running jobs can be cancelled.
+    """
+
+    def __init__(self, max_workers=DEFAULT_JOB_WORKERS, max_finished=DEFAULT_MAX_FINISHED_JOBS,
+                 max_result_mb=DEFAULT_MAX_RESULT_MB):
+        self.max_finished = max_finished
+        self.max_result_bytes = int(max_result_mb * 1024 * 1024)
+        self._result_bytes = 0
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=JOB_THREAD_NAME_PREFIX)
+
+    def configure(self, max_workers, max_finished=DEFAULT_MAX_FINISHED_JOBS, max_result_mb=DEFAULT_MAX_RESULT_MB):
+        """ Resizes the worker pool (called from create_app); running jobs finish on the old pool. """
+        old_pool = self._pool
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=JOB_THREAD_NAME_PREFIX)
+        self.max_finished = max_finished
+        self.max_result_bytes = int(max_result_mb * 1024 * 1024)
+        old_pool.shutdown(wait=False)
+        with self._lock:
+            self._expire_results()
+
+    def submit(self, kind, func, *args, params=None, **kwargs):
+        """
+        Queues func(job, *args, **kwargs) and returns the Job right away.
+        func reports progress through job.report_progress() and returns the job result.
+        """
+        job = Job(kind, params)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            self._finish(job, CANCELLED, message='Cancelled before start')
+            return
+
+        job.status = RUNNING
+        job.message = 'Running'
+        job.started_at = time.time()
+        try:
+            # Encoded once here: far smaller than the lists of floats it holds, and what /result sends
+            result_json = json.dumps(func(job, *args, **kwargs)).encode()
+        except JobCancelled:
+            self._finish(job, CANCELLED, message='Cancelled')
+        except Exception as e:
+            print(f"Error in background job {job.id} ({job.kind}): {e}")
+            job.error = str(e)
+            self._finish(job, FAILED, message='Failed')
+        else:
+            with self._lock:
+                job.result_json = result_json
+                if job.id in self._jobs:
+                    self._result_bytes += len(result_json)
+                    self._expire_results(keep=job.id)
+            job.progress = 1.0
+            self._finish(job, COMPLETED, message='Completed')
+
+    def _finish(self, job, status, message):
+        job.status = status
+        job.message = message
+        job.finished_at = time.time()
+
+    def _prune(self):
+        """ Forgets the oldest finished jobs beyond the retention limit. """
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            job = self._jobs.pop(job_id)
+            if job.result_json is not None:
+                self._result_bytes -= len(job.result_json)
+
+    def _expire_results(self, keep=None):
+        """ Drops the results of the oldest jobs while they take more than max_result_bytes (job status is kept). """
+        for job_id, job in self._jobs.items():
+            if self._result_bytes <= self.max_result_bytes:
+                break
+            if job_id == keep or job.result_json is None:
+                continue
+            self._result_bytes -= len(job.result_json)
+            job.result_json = None
+            job.result_expired = True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """ Requests cancellation; returns False if the job is unknown or already finished. """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return False
+        job._cancel_event.set()
+        if job.status == QUEUED:
+            job.message = 'Cancelling'
+        return True
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            counts['result_bytes'] = self._result_bytes
+            return counts
+
+    def shutdown(self, wait=False):
+        for job_id in list(self._jobs.keys()):
+            self.cancel(job_id)
+        self._pool.shutdown(wait=wait)
+
+
+# Process-wide job queue
+JOB_MANAGER = JobManager()
+
+
+def configure_job_manager(max_workers, max_finished=DEFAULT_MAX_FINISHED_JOBS, max_result_mb=DEFAULT_MAX_RESULT_MB):
+    """ Applies the app configuration to the shared job queue (called from create_app). """
+    JOB_MANAGER.configure(max_workers, max_finished, max_result_mb)
+    return JOB_MANAGER
@@ -0,0 +1,42 @@
+# BackEnd/utils/lazy_import.py
+import sys
+import importlib
+import threading
+
+# --- Deferred Heavy Imports ---
+# torch (and everything the AI models pull in with it) takes seconds to import,
+# but most requests never touch a model. Modules that need it hold a LazyModule
+# instead: the real import happens on the first attribute access, i.e. the
+# first model load, separation or background warm-up.
+
+
+class LazyModule:
+    """ Stands in for `import name`; imports the module on first attribute access. """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """ Returns the module if it is already imported, otherwise a LazyModule proxy for it. """
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def is_imported(name):
+    return name in sys.modules
@@ -0,0 +1,65 @@
+# BackEnd/utils/process_memory.py
+import os
+import sys
+
+# --- Per-process Memory Report ---
+# RSS counts every resident page, including the ones a pre-forked worker still
+# shares copy-on-write with the master. PSS splits shared pages evenly between
+# the processes mapping them, so summing PSS over the workers gives the real
+# footprint, and Private_* shows what each worker has copied for itself.
+SMAPS_FIELDS = {
+    'Rss': 'rss_mb',
+    'Pss': 'pss_mb',
+    'Shared_Clean': 'shared_clean_mb',
+    'Shared_Dirty': 'shared_dirty_mb',
+    'Private_Clean': 'private_clean_mb',
+    'Private_Dirty': 'private_dirty_mb',
+}
+
+
+def _read_smaps_rollup(pid):
+    report = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in SMAPS_FIELDS:
+                report[SMAPS_FIELDS[key]] = round(int(value.split()[0]) / 1024.0, 1)   # kB -> MB
+    report['shared_mb'] = round(report.get('shared_clean_mb', 0) + report.get('shared_dirty_mb', 0), 1)
+    report['private_mb'] = round(report.get('private_clean_mb', 0) + report.get('private_dirty_mb', 0), 1)
+    return report
+
+
+def memory_report(pid=None):
+    """
+    Memory of one process (this one by default) in MB: rss/pss/shared/private
+    from /proc/<pid>/smaps_rollup on Linux, peak RSS only elsewhere.
+    """
+    pid = pid or os.getpid()
+    report = {'pid': pid}
+    try:
+        report.update(_read_smaps_rollup(pid))
+        report['source'] = 'smaps_rollup'
+    except OSError:
+        if pid != os.getpid():
+            return report
+        try:
+            import resource
+        except ImportError:
+            return report
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kB on Linux and bytes on macOS
+        report['peak_rss_mb'] = round(peak / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0), 1)
+        report['source'] = 'ru_maxrss'
+    return report
+
+
+def child_pids(pid):
+    """ Direct children of a process (e.g. the workers of a gunicorn master), Linux only. """
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return sorted(set(children))
@@ -0,0 +1,183 @@
+# BackEnd/utils/progressive_ingest.py
+import time
+import numpy as np
+
+from audio_util import iter_audio_blocks
+from spectrogram import custom_spectrogram
+from stem_stream import StemStreamStore
+from analysis_store import ANALYSIS_STORE, ENVELOPE_BIN_SECONDS
+
+# --- Progressive Upload Analysis ---
+# Long uploads are decoded block by block into a file-backed buffer while the
+# spectrogram columns and a min/max waveform envelope are computed as the
+# samples arrive, so a client can draw both before decoding has finished. The
+# full-length FFT needs the whole signal and runs once decoding completes,
+# unless the same audio was analyzed before (analysis_store).
+DECODING, ANALYZING, READY, FAILED = 'decoding', 'analyzing', 'ready', 'failed'
+DECODE_BLOCK_FRAMES = 96000       # ~2 s of audio per decoded block at common rates
+SPECTROGRAM_FRAMES_PER_STEP = 32   # columns are published in small batches, not once per decoded block
+
+
+class IncrementalSpectrogram:
+    """
+    custom_spectrogram computed block by block: every frame that fits in the
+    samples seen so far is emitted once, with the same framing as a single
+    custom_spectrogram call over the whole signal.
+    """
+
+    def __init__(self, Fs, window_size=1024, overlap_ratio=0.5):
+        self.Fs = Fs
+        self.window_size = window_size
+        self.overlap_ratio = overlap_ratio
+        self.step = window_size - int(window_size * overlap_ratio)
+        self.columns = []     # one array of window_size // 2 dB values per time frame
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def update(self, block):
+        pending = np.concatenate([self._pending, block])
+        added = 0
+        while len(pending) >= self.window_size:
+            n_frames = min(SPECTROGRAM_FRAMES_PER_STEP, (len(pending) - self.window_size) // self.step + 1)
+            chunk = pending[:self.window_size + (n_frames - 1) * self.step]
+            frames = custom_spectrogram(chunk, self.Fs, self.window_size, self.overlap_ratio).T
+            self.columns.extend(frames)
+            pending = pending[len(frames) * self.step:]
+            added += len(frames)
+        self._pending = pending
+        return added
+
+    def matrix(self):
+        """ (Frequency_Bins x Time_Frames), as custom_spectrogram returns it. """
+        if not self.columns:
+            return np.zeros((self.window_size // 2, 0))
+        return np.array(self.columns).T
+
+
+class WaveformEnvelope:
+    """ Running min/max of the waveform over fixed-length bins, for drawing it before it is fully decoded. """
+
+    def __init__(self, Fs, bin_seconds=ENVELOPE_BIN_SECONDS):
+        self.bin_samples = max(1, int(round(Fs * bin_seconds)))
+        self.minimum = []
+        self.maximum = []
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def update(self, block):
+        pending = np.concatenate([self._pending, block])
+        usable = len(pending) - len(pending) % self.bin_samples
+        if usable:
+            bins = pending[:usable].reshape(-1, self.bin_samples)
+            self.minimum.extend(bins.min(axis=1).tolist())
+            self.maximum.extend(bins.max(axis=1).tolist())
+        self._pending = pending[usable:]
+
+    def flush(self):
+        """ Emits the last, partial bin once the input has ended. """
+        if len(self._pending):
+            self.minimum.append(float(self._pending.min()))
+            self.maximum.append(float(self._pending.max()))
+            self._pending = self._pending[:0]
+
+
+class SignalIngest:
+    """
+    One progressive upload: run() decodes and analyzes it (on a worker thread)
+    while status_dict() reports what is ready so far. Once decoding is done the
+    signal, its analysis_store.AnalysisArtifact and the upload-style
+    visualization payload are available as `signal`, `artifact` and `result`.
+    """
+
+    def __init__(self, signal_id, filename, directory):
+        self.signal_id = signal_id
+        self.filename = filename
+        self.directory = directory
+        self.status = DECODING
+        self.error = None
+        self.Fs = None
+        self.store = None
+        self.spectrogram = None
+        self.envelope = None
+        self.signal = None
+        self.artifact = None
+        self.reused_analysis = False
+        self.result = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def decoded_samples(self):
+        return self.store.available_samples if self.store is not None else 0
+
+    def run(self, source, on_ready=None):
+        """
+        Decodes `source` (path or file object) to the end, then computes the FFT.
+        on_ready(ingest) is called before the status turns READY.
+        """
+        try:
+            for Fs, block in iter_audio_blocks(source, self.filename, DECODE_BLOCK_FRAMES):
+                if self.store is None:
+                    self.Fs = int(Fs)
+                    self.store = StemStreamStore(self.directory, ['signal'], self.Fs)
+                    self.spectrogram = IncrementalSpectrogram(self.Fs)
+                    self.envelope = WaveformEnvelope(self.Fs)
+                self.store.append({'signal': block})
+                self.envelope.update(block)
+                self.spectrogram.update(block)
+            if self.store is None:
+                raise ValueError("The file contains no audio.")
+            self.store.total_samples = self.store.available_samples
+            self.store.finish()
+            self.envelope.flush()
+
+            self.status = ANALYZING
+            self.artifact, self.reused_analysis = ANALYSIS_STORE.analyze(
+                self.store.read('signal'), self.Fs, spectrogram=self.spectrogram.matrix(),
+                envelope=(self.envelope.minimum, self.envelope.maximum)
+            )
+            self.signal = self.artifact.arrays['signal']
+            self.result = self.artifact.upload_payload()
+            if on_ready is not None:
+                on_ready(self)
+            self.status = READY
+            print(f"✓ Progressive upload {self.signal_id} analyzed ({len(self.signal) / self.Fs:.1f}s of audio)")
+        except Exception as e:
+            print(f"Error during progressive upload {self.signal_id}: {e}")
+            self.error = str(e)
+            self.status = FAILED
+        finally:
+            self.finished_at = time.time()
+            if hasattr(source, 'close'):
+                source.close()
+            if self.store is not None:
+                self.store.delete()
+
+    def status_dict(self, since_column=0, since_bin=0):
+        """
+        Progress plus the spectrogram columns and envelope bins computed since
+        the given indices, so a polling client only receives what is new.
+        The full upload payload is included once the status is READY.
+        """
+        columns = self.spectrogram.columns[since_column:] if self.spectrogram else []
+        # The decoding thread extends minimum before maximum; only hand out complete bins
+        bins = len(self.envelope.maximum) if self.envelope else 0
+        status = {
+            'signal_id': self.signal_id,
+            'status': self.status,
+            'error': self.error,
+            'Fs': self.Fs,
+            'decoded_seconds': round(self.decoded_samples / self.Fs, 3) if self.Fs else 0.0,
+            'spectrogram_columns': [column.tolist() for column in columns],
+            'next_column': since_column + len(columns),
+            'envelope': {
+                'bin_seconds': ENVELOPE_BIN_SECONDS,
+                'min': self.envelope.minimum[since_bin:bins] if self.envelope else [],
+                'max': self.envelope.maximum[since_bin:bins] if self.envelope else [],
+            },
+            'next_bin': max(since_bin, bins),
+        }
+        if self.status == READY:
+            status['duration'] = len(self.signal) / self.Fs
+            status['analysis_id'] = self.artifact.digest
+            status['reused_analysis'] = self.reused_analysis
+            status['data'] = self.result
+        return status
@@ -3,7 +3,6 @@ import sys
 import numpy as np
 import os
 import soundfile as sf
-import librosa
 
 
 # --- Configure paths to import utils correctly ---
@@ -16,49 +15,74 @@ sys.path.append(os.path.join(BASE_DIR, 'utils')) # Ensure utils directory is in
 # Python can now find custom_fft and equalizer_core because their directory is in sys.path
 import custom_fft
 import equalizer_core 
+from executor import parallel_map
+from resampler import resample
 
 
-def apply_eq_and_recombine(source_paths, Fs, eq_scheme, UPLOAD_FOLDER):
+def _map_frontend_scheme(eq_scheme):
+    """ Maps the frontend band keys onto the keys apply_equalization expects. """
+    return [
+        {
+            'freq_start_hz': band['start_frequency'],
+            'freq_end_hz': band['end_frequency'],
+            'scale_factor': band['scale_value']
+        }
+        for band in eq_scheme
+    ]
+
+
+def _equalize_source(source, Fs, processed_eq_scheme, source_sr=None):
+    """
+    Equalizes one separated source and returns its time series.
+    `source` is either an in-memory array sampled at source_sr, or (for
+    file-based callers) the path of a WAV that is removed once read.
+    """
+    # 1. Get Source Audio (downmix, then bring it back to the signal's Fs)
+    if isinstance(source, str):
+        source_time_series, source_sr = sf.read(source, dtype='float64')
+        # Clean up the original separated source file
+        os.remove(source)
+    else:
+        source_time_series = np.asarray(source, dtype=np.float64)
+        source_sr = source_sr or Fs
+    if source_time_series.ndim > 1:
+        source_time_series = source_time_series.mean(axis=1)
+    source_time_series = resample(source_time_series, source_sr, Fs)
+
+    # 2. Convert to Frequency Domain (Custom FFT)
+    source_fft_data = custom_fft.custom_fft(source_time_series)
+
+    # 3. Apply the EQ scheme
+    processed_fft_data = equalizer_core.apply_equalization(source_fft_data, Fs, processed_eq_scheme)
+
+    # 4. Convert back to Time Domain (Custom IFFT)
+    processed_time_series = custom_fft.custom_ifft(processed_fft_data).real
+
+    return processed_time_series
+
+
+def apply_eq_and_recombine(sources, Fs, eq_scheme, UPLOAD_FOLDER=None, source_sr=None):
     """
     Applies custom equalization scheme (using frontend keys) to each source 
     and sums them into a final mixture.
+    `sources` maps names to in-memory arrays (sampled at source_sr) or to WAV paths.
+    Sources are independent, so they are equalized concurrently on the shared pool.
     """
+    processed_eq_scheme = _map_frontend_scheme(eq_scheme)
+
+    processed_sources = parallel_map(
+        lambda source: _equalize_source(source, Fs, processed_eq_scheme, source_sr),
+        sources.values()
+    )
+
+    # 5. Recombine (Summation, in source order so the result is deterministic)
     final_mixture = None
-    
-    # Loop through each separated source file provided by the AI
-    for source_key, source_filepath in source_paths.items():
-        # 1. Load Source Audio
-        source_time_series, _ = librosa.load(source_filepath, sr=Fs, mono=True)
-        source_time_series = source_time_series.astype(np.float64) # Ensure float64
-        
-        # 2. Convert to Frequency Domain (Custom FFT)
-        source_fft_data = custom_fft.custom_fft(source_time_series) # <-- FIXED CALL
-        
-        # 3. Apply the EQ scheme (Requires key mapping)
-        processed_eq_scheme = []
-        for band in eq_scheme:
-            mapped_band = {
-                'freq_start_hz': band['start_frequency'], 
-                'freq_end_hz': band['end_frequency'],     
-                'scale_factor': band['scale_value']       
-            }
-            processed_eq_scheme.append(mapped_band)
-            
-        processed_fft_data = equalizer_core.apply_equalization(source_fft_data, Fs, processed_eq_scheme) # <-- FIXED CALL
-        
-        # 4. Convert back to Time Domain (Custom IFFT)
-        processed_time_series = custom_fft.custom_ifft(processed_fft_data).real # <-- FIXED CALL
-        
-        # 5. Recombine (Summation)
+    for processed_time_series in processed_sources:
         if final_mixture is None:
             final_mixture = processed_time_series
         else:
             final_mixture += processed_time_series
             
-        # Clean up the original separated source file
-        if os.path.exists(source_filepath):
-             os.remove(source_filepath)
-            
     # 6. Normalize the final mixture to prevent clipping 
     max_abs_val = np.max(np.abs(final_mixture))
     if max_abs_val > 1.0:
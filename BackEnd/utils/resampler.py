@@ -0,0 +1,184 @@
+# BackEnd/utils/resampler.py
+from functools import lru_cache
+from math import gcd
+import numpy as np
+
+# --- Filter Design Parameters ---
+# Same defaults as a Kaiser-windowed resample_poly: the filter spans
+# ZERO_CROSSINGS periods of the slower rate on either side of its centre.
+ZERO_CROSSINGS = 10
+KAISER_BETA = 5.0
+
+# Number of output samples computed per vectorized step. Bounds the size of
+# the (channels, outputs, taps) gather so long signals never blow up memory.
+BLOCK_OUTPUTS = 16384
+
+
+@lru_cache(maxsize=32)
+def get_polyphase_filter(orig_sr, target_sr):
+    """
+    Designs the anti-aliasing low-pass filter for orig_sr -> target_sr once and
+    splits it into its polyphase branches. Results are cached per rate pair.
+
+    Returns:
+        tuple: (up, down, half_len, phases) where phases has shape (up, taps)
+               and phases[r, m] is the filter tap h[r + m * up].
+    """
+    orig_sr, target_sr = int(orig_sr), int(target_sr)
+    g = gcd(orig_sr, target_sr)
+    up, down = target_sr // g, orig_sr // g
+
+    max_rate = max(up, down)
+    half_len = ZERO_CROSSINGS * max_rate
+    n = np.arange(-half_len, half_len + 1)
+    cutoff = 1.0 / max_rate
+
+    # Windowed sinc, scaled by `up` to compensate for zero-stuffing
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), KAISER_BETA) * up
+
+    # Pad to a whole number of taps per phase, then split into branches
+    taps = -(-len(h) // up)
+    h = np.concatenate([h, np.zeros(taps * up - len(h))])
+    phases = np.ascontiguousarray(h.reshape(taps, up).T)
+    phases.setflags(write=False)
+
+    return up, down, half_len, phases
+
+
+class StreamingResampler:
+    """
+    Polyphase resampler that accepts the signal in chunks of any size.
+    Feeding the whole signal as one final chunk gives exactly the same
+    output as feeding it piece by piece.
+
+    Chunks are 1D (samples) or 2D (channels, samples); every channel is
+    processed in the same vectorized call.
+    """
+
+    def __init__(self, orig_sr, target_sr):
+        self.orig_sr = int(orig_sr)
+        self.target_sr = int(target_sr)
+        self.up, self.down, self.half_len, self._phases = get_polyphase_filter(self.orig_sr, self.target_sr)
+        self.taps = self._phases.shape[1]
+
+        self._buffer = None       # pending input, shape (channels, samples)
+        self._buffer_start = 0    # absolute input index of self._buffer[:, 0]
+        self._n_in = 0            # input samples received so far
+        self._n_out = 0           # output samples emitted so far
+        self._mono = None         # whether the caller passes 1D chunks
+        self._finished = False
+
+    def _output_count(self, final):
+        """ Index one past the last output that can be computed from the input received so far. """
+        if final:
+            return -(-self._n_in * self.up // self.down)
+        # Output j needs input up to (j * down + half_len) // up
+        return max(0, (self._n_in * self.up - 1 - self.half_len) // self.down + 1)
+
+    def process(self, chunk, final=False):
+        """
+        Feeds the next chunk and returns every output sample that is now complete.
+        Pass final=True with the last chunk (it may be empty) to flush the tail.
+        """
+        if self._finished:
+            raise RuntimeError("StreamingResampler already received its final chunk.")
+
+        chunk = np.asarray(chunk)
+        is_mono = chunk.ndim == 1
+        chunk_2d = chunk.reshape(1, -1) if is_mono else chunk
+        if self._mono is None:
+            self._mono = is_mono
+        if not np.issubdtype(chunk_2d.dtype, np.floating):
+            chunk_2d = chunk_2d.astype(np.float64)
+
+        if self._buffer is None:
+            self._buffer = chunk_2d
+        else:
+            self._buffer = np.concatenate([self._buffer, chunk_2d.astype(self._buffer.dtype, copy=False)], axis=1)
+        self._n_in += chunk_2d.shape[1]
+        self._finished = final
+
+        # Same rate: nothing to filter
+        if self.up == self.down:
+            out = self._buffer
+            self._buffer = self._buffer[:, :0]
+            self._buffer_start = self._n_in
+            self._n_out = self._n_in
+            return out[0] if is_mono else out
+
+        stop = self._output_count(final)
+        out = self._compute(self._n_out, stop)
+        self._n_out = stop
+        self._trim_history()
+
+        return out[0] if is_mono else out
+
+    def flush(self):
+        """ Emits the remaining tail once the input is exhausted. """
+        if self._buffer is None or self._mono:
+            return self.process(np.zeros(0), final=True)
+        return self.process(np.zeros((self._buffer.shape[0], 0)), final=True)
+
+    def _compute(self, start, stop):
+        """ Computes outputs [start, stop) block by block from the pending input. """
+        buffer = self._buffer
+        channels = buffer.shape[0]
+        out = np.empty((channels, max(0, stop - start)), dtype=buffer.dtype)
+        if stop <= start:
+            return out
+
+        phases = self._phases.astype(buffer.dtype, copy=False)
+        tap_offsets = np.arange(self.taps)
+        buffer_len = buffer.shape[1]
+
+        for block_start in range(start, stop, BLOCK_OUTPUTS):
+            block_stop = min(stop, block_start + BLOCK_OUTPUTS)
+            t = np.arange(block_start, block_stop) * self.down + self.half_len
+            i_max = t // self.up
+            weights = phases[t % self.up]                     # (n, taps)
+            idx = i_max[:, None] - tap_offsets[None, :]       # absolute input indices
+
+            # Samples before the start or after the end of the signal are zero
+            valid = (idx >= 0) & (idx < self._n_in)
+            weights = np.where(valid, weights, 0)
+            rel = np.clip(idx - self._buffer_start, 0, buffer_len - 1)
+
+            out[:, block_start - start:block_stop - start] = np.einsum(
+                'cnk,nk->cn', buffer[:, rel], weights
+            )
+
+        return out
+
+    def _trim_history(self):
+        """ Drops input samples that no future output depends on. """
+        first_needed = (self._n_out * self.down + self.half_len) // self.up - (self.taps - 1)
+        drop = min(max(0, first_needed - self._buffer_start), self._buffer.shape[1])
+        if drop > 0:
+            self._buffer = self._buffer[:, drop:]
+            self._buffer_start += drop
+
+
+def resample(signal, orig_sr, target_sr):
+    """
+    Resamples a 1D (samples) or 2D (channels, samples) array from orig_sr to
+    target_sr in one vectorized call, reusing the cached polyphase filter.
+    """
+    if int(orig_sr) == int(target_sr):
+        return signal
+    return StreamingResampler(orig_sr, target_sr).process(signal, final=True)
+
+
+def resample_chunks(chunks, orig_sr, target_sr):
+    """
+    Generator form of StreamingResampler: yields resampled blocks as the
+    input chunks arrive and flushes the tail at the end.
+    """
+    resampler = StreamingResampler(orig_sr, target_sr)
+    for chunk in chunks:
+        out = resampler.process(chunk)
+        if out.shape[-1]:
+            yield out
+    if resampler._buffer is not None:
+        tail = resampler.flush()
+        if tail.shape[-1]:
+            yield tail
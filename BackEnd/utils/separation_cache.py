@@ -0,0 +1,187 @@
+# BackEnd/utils/separation_cache.py
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# --- Defaults (overridden by create_app) ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'separation')
+DEFAULT_MEMORY_MB = 512
+DEFAULT_DISK_MB = 2048
+
+
+def make_separation_key(signal, Fs, model_name, params=None):
+    """
+    Cache key for a separation run: hash of the input PCM plus everything that
+    changes the model output (model name and its parameters).
+    """
+    pcm = np.ascontiguousarray(signal, dtype=np.float32)
+    digest = hashlib.sha256()
+    digest.update(pcm.tobytes())
+    digest.update(str(pcm.shape).encode())
+    digest.update(str(int(Fs)).encode())
+    digest.update(model_name.encode())
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _read_only(sources):
+    """ Marks the arrays the cache holds read-only (returns the same dict). """
+    for audio in sources.values():
+        audio.flags.writeable = False
+    return sources
+
+
+def _copies(sources):
+    """ Writable copies of cached sources, so no caller can change what later hits return. """
+    return {name: audio.copy() for name, audio in sources.items()}
+
+
+class SeparationCache:
+    """
+    Two-level LRU cache of separated sources.
+    - Memory: float32 arrays, evicted least-recently-used beyond max_memory_bytes.
+    - Disk: one compressed float32 .npz per key, evicted oldest-first
+      beyond max_disk_bytes. A disk hit is promoted back into memory.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_memory_mb=DEFAULT_MEMORY_MB, max_disk_mb=DEFAULT_DISK_MB):
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> (sources, sample_rate, nbytes)
+        self._memory_bytes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.configure(cache_dir, max_memory_mb, max_disk_mb)
+
+    def configure(self, cache_dir, max_memory_mb, max_disk_mb):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        with self._lock:
+            self._evict_memory()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key):
+        """ Returns (sources, sample_rate) for key (copies of the cached arrays), or None on a miss. """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return _copies(entry[0]), entry[1]
+
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    sample_rate = int(data['__sample_rate__'])
+                    sources = {
+                        name: data[name].astype(np.float32)
+                        for name in data.files if name != '__sample_rate__'
+                    }
+                os.utime(path)  # mark as recently used for disk eviction
+            except Exception as e:
+                print(f"⚠ Warning: Dropping unreadable separation cache file {path}: {e}")
+                os.remove(path)
+            else:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._store_in_memory(key, _read_only(sources), sample_rate)
+                return _copies(sources), sample_rate
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, sources, sample_rate):
+        """ Stores the separated sources ({name: 1D array}) in memory and on disk. """
+        # The cache keeps its own read-only copy: callers may go on to change theirs in place
+        sources = _read_only({name: np.array(audio, dtype=np.float32) for name, audio in sources.items()})
+        with self._lock:
+            self._store_in_memory(key, sources, sample_rate)
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._disk_path(key) + '.tmp.npz'
+            np.savez_compressed(tmp_path, __sample_rate__=np.array(sample_rate), **sources)
+            os.replace(tmp_path, self._disk_path(key))
+            self._evict_disk()
+        except OSError as e:
+            print(f"⚠ Warning: Could not write separation cache to disk: {e}")
+
+    def _store_in_memory(self, key, sources, sample_rate):
+        nbytes = sum(audio.nbytes for audio in sources.values())
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[2]
+        if nbytes > self.max_memory_bytes:
+            return
+        self._memory[key] = (sources, sample_rate, nbytes)
+        self._memory_bytes += nbytes
+        self._evict_memory()
+
+    def _evict_memory(self):
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, (_, _, nbytes) = self._memory.popitem(last=False)
+            self._memory_bytes -= nbytes
+            self.evictions += 1
+
+    def _evict_disk(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        files = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.npz') and not filename.endswith('.tmp.npz'):
+                path = os.path.join(self.cache_dir, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # removed by a concurrent eviction
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+            }
+
+
+# Process-wide cache shared by every separation request
+SEPARATION_CACHE = SeparationCache()
+
+
+def configure_separation_cache(cache_dir, max_memory_mb, max_disk_mb):
+    """ Applies the app configuration to the shared cache (called from create_app). """
+    SEPARATION_CACHE.configure(cache_dir, max_memory_mb, max_disk_mb)
+    return SEPARATION_CACHE
@@ -0,0 +1,107 @@
+# BackEnd/utils/separation_presets.py
+import os
+import json
+import threading
+
+# --- Demucs speed/quality presets ---
+# Named settings (model, CPU variant, segment, overlap, shifts) from
+# config/separation_presets.json, plus the real-time factor each preset has
+# actually achieved on this host so the UI can show an expected wait.
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PRESETS_PATH = os.path.join(BASE_DIR, 'config', 'separation_presets.json')
+DEFAULT_TIMINGS_PATH = os.path.join(BASE_DIR, 'cache', 'preset_rtf.json')
+RTF_SMOOTHING = 0.3   # weight of the newest measurement in the running average
+
+with open(PRESETS_PATH, 'r') as f:
+    _CONFIG = json.load(f)
+
+DEFAULT_PRESET = _CONFIG['default']
+PRESETS = _CONFIG['presets']
+
+
+def resolve_preset(name=None):
+    """ Returns (preset name, settings) for name (None -> the default preset). Raises ValueError if unknown. """
+    name = (name or DEFAULT_PRESET).lower()
+    if name not in PRESETS:
+        raise ValueError(f"Unknown separation preset '{name}'. Choose from {sorted(PRESETS)}.")
+    preset = PRESETS[name]
+    return name, {
+        'model': preset['model'],
+        'variant': preset.get('variant'),
+        'segment': preset.get('segment'),
+        'overlap': float(preset.get('overlap', 0.25)),
+        'shifts': int(preset.get('shifts', 0)),
+    }
+
+
+def preset_model_names():
+    return sorted({preset['model'] for preset in PRESETS.values()})
+
+
+class PresetTimings:
+    """ Running average of the measured real-time factor (processing s / audio s) per preset, persisted as JSON. """
+
+    def __init__(self, path=DEFAULT_TIMINGS_PATH):
+        self._lock = threading.Lock()
+        self.configure(path)
+
+    def configure(self, path):
+        self.path = path
+        self._timings = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self._timings = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠ Warning: Ignoring unreadable preset timings {path}: {e}")
+
+    def record(self, name, audio_seconds, elapsed_seconds):
+        if audio_seconds <= 0:
+            return
+        rtf = elapsed_seconds / audio_seconds
+        with self._lock:
+            entry = self._timings.get(name)
+            if entry is None:
+                entry = {'rtf': rtf, 'runs': 0}
+            else:
+                entry['rtf'] = (1 - RTF_SMOOTHING) * entry['rtf'] + RTF_SMOOTHING * rtf
+            entry['runs'] += 1
+            self._timings[name] = entry
+            self._save()
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self._timings, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠ Warning: Could not save preset timings: {e}")
+
+    def get(self, name):
+        with self._lock:
+            return dict(self._timings[name]) if name in self._timings else None
+
+
+# Process-wide timings shared by every separation request
+PRESET_TIMINGS = PresetTimings()
+
+
+def preset_catalog(duration_seconds=None):
+    """ Presets for the UI, with the measured RTF and (given a duration) the expected wait in seconds. """
+    catalog = []
+    for name, preset in PRESETS.items():
+        timing = PRESET_TIMINGS.get(name)
+        rtf = round(timing['rtf'], 4) if timing else None
+        catalog.append({
+            'name': name,
+            'label': preset.get('label', name.title()),
+            'description': preset.get('description', ''),
+            'settings': resolve_preset(name)[1],
+            'default': name == DEFAULT_PRESET,
+            'measured_rtf': rtf,
+            'measured_runs': timing['runs'] if timing else 0,
+            'expected_wait_s': round(rtf * duration_seconds, 1) if rtf is not None and duration_seconds else None,
+        })
+    return catalog
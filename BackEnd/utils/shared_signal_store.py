@@ -0,0 +1,402 @@
+# BackEnd/utils/shared_signal_store.py
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+
+from signal_store import SignalStore, SignalState, DerivedArrays, BASE_DIR, DERIVED_KEYS, derivable, stale_request, _write_npy
+
+# --- Cross-process Signal Store ---
+# With several worker processes (gunicorn.conf.py) an upload and the /apply
+# that follows it may land on different workers. Here every array of an entry
+# is a .npy file in a shared-memory directory (a tmpfs such as /dev/shm) that
+# each worker opens as a read-only memmap, so all processes map the same pages
+# instead of holding copies. A small SQLite index beside the arrays maps each
+# signal_id to its metadata and array files and serializes concurrent writers
+# (BEGIN IMMEDIATE: one writer at a time across all processes).
+DEFAULT_SHARED_DIR = ('/dev/shm/signal_equalizer' if os.path.isdir('/dev/shm')
+                      else os.path.join(BASE_DIR, 'cache', 'shared_signals'))
+DEFAULT_SHARED_MEMORY_MB = 2048
+DERIVED_MEMO_MB = 256      # per process: equalized spectra/outputs kept for the most recently used signals
+INDEX_NAME = 'index.sqlite3'
+OPEN_RETRIES = 3           # a concurrent writer may replace a file between the index read and the open
+TOUCH_INTERVAL_S = 1.0     # last-use times are only rewritten this often (every lookup would serialize readers)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    signal_id TEXT PRIMARY KEY,
+    meta TEXT NOT NULL,       -- JSON of the small values ('Fs', 'output_path', ...)
+    arrays TEXT NOT NULL,     -- JSON {name: [file name, nbytes]}, stems as 'ai_sources/<name>'
+    nbytes INTEGER NOT NULL,
+    touched REAL NOT NULL,
+    version INTEGER NOT NULL  -- incremented on every write; keys the per-process memo of derived arrays
+)
+"""
+
+
+def _numpy_scalar(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _split_value(key, value):
+    """ ('arrays', {name: array}), ('meta', value) or ('local', value) for one entry item. """
+    if isinstance(value, np.ndarray):
+        return 'arrays', {key: value}
+    if isinstance(value, dict) and value and all(isinstance(v, np.ndarray) for v in value.values()):
+        return 'arrays', {f"{key}/{name}": array for name, array in value.items()}
+    try:
+        return 'meta', json.loads(json.dumps(value, default=_numpy_scalar))
+    except (TypeError, ValueError):
+        return 'local', value
+
+
+def _nest(flat):
+    """ {'ai_sources/vocals': a, 'time_series': b} -> {'ai_sources': {'vocals': a}, 'time_series': b} """
+    data = {}
+    for name, array in flat.items():
+        key, _, member = name.partition('/')
+        if member:
+            data.setdefault(key, {})[member] = array
+        else:
+            data[key] = array
+    return data
+
+
+class SharedSignalEntry(dict):
+    """
+    One signal as read from the shared store, at the version of that lookup.
+    Assigning a key (or commit()) writes it through to the store, so every
+    worker sees it on its next lookup. Values that are neither arrays nor JSON
+    (the 'ai_stream' StemStreamStore) stay with the worker that set them.
+    """
+
+    def __init__(self, store, signal_id, data, version):
+        super().__init__(data)
+        self.signal_id = signal_id
+        self.version = version
+        self._store = store
+        self._state = None
+
+    def snapshot(self):
+        """ This entry's version as a SignalState (a later write by another worker needs a new lookup). """
+        state = self._state
+        if state is None or state.version != self.version:
+            state = self._state = self._store._snapshot(self)
+        return state
+
+    def commit(self, updates, request_seq=None):
+        """ Writes {key: value} as one new version; None if request_seq is not newer than the committed one. """
+        for key in updates:
+            if key in DERIVED_KEYS:
+                raise KeyError(f"'{key}' is derived from the stored signal and 'eq_scheme'; set those instead")
+        values, version = self._store._write_items(self.signal_id, updates, request_seq)
+        if values is None:
+            return None
+        super().update(values)
+        self.version = version
+        return self.snapshot()
+
+    def __setitem__(self, key, value):
+        self.commit({key: value})
+
+    def __missing__(self, key):
+        return self.snapshot()[key]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __contains__(self, key):
+        return super().__contains__(key) or derivable(self, key)
+
+
+class SharedSignalStore(SignalStore):
+    """
+    Signals shared by every process that opens the same directory.
+    - Arrays are written once to their own .npy file and read as memmaps (zero-copy).
+    - Entries unused for ttl_seconds, then the least recently used beyond
+      max_memory_mb, are deleted (the directory lives in RAM).
+    - Each lookup returns a fresh SharedSignalEntry with the latest state;
+      its derived arrays are memoized in this process per signal version.
+    """
+
+    def __init__(self, directory=DEFAULT_SHARED_DIR, max_memory_mb=DEFAULT_SHARED_MEMORY_MB, ttl_seconds=1800):
+        self.directory = directory
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self._thread_state = threading.local()
+        self._lock = threading.Lock()
+        self._local_values = {}   # signal_id -> {key: value} that cannot leave this process
+        self._derived = OrderedDict()   # signal_id -> DerivedArrays of the newest version seen, LRU first
+        self.max_derived_bytes = DERIVED_MEMO_MB * 1024 * 1024
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        os.makedirs(directory, exist_ok=True)
+        with self._transaction() as db:
+            db.execute(SCHEMA)
+
+    # --- Index ---
+    def _connection(self):
+        """ One SQLite connection per thread, reopened after a fork. """
+        state = self._thread_state
+        if getattr(state, 'pid', None) != os.getpid():
+            state.connection = sqlite3.connect(os.path.join(self.directory, INDEX_NAME), timeout=30, isolation_level=None)
+            state.connection.execute('PRAGMA journal_mode=WAL')
+            state.connection.execute('PRAGMA synchronous=NORMAL')
+            state.pid = os.getpid()
+        return state.connection
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    # --- Files ---
+    def _signal_dir(self, signal_id):
+        return os.path.join(self.directory, signal_id)
+
+    def _write_arrays(self, signal_id, arrays):
+        """ Writes {name: array} (each distinct array once); returns ({name: [file, nbytes]}, {name: memmap}). """
+        files, mapped, written = {}, {}, {}
+        for name, array in arrays.items():
+            if id(array) not in written:
+                filename = f"{name.replace('/', '.')}-{uuid.uuid4().hex[:12]}.npy"
+                written[id(array)] = (filename, _write_npy(os.path.join(self._signal_dir(signal_id), filename), array))
+            filename, mapped[name] = written[id(array)]
+            files[name] = [filename, int(array.nbytes)]
+        return files, mapped
+
+    def _remove_files(self, signal_id, filenames):
+        for filename in filenames:
+            try:
+                os.remove(os.path.join(self._signal_dir(signal_id), filename))
+            except OSError:
+                pass
+
+    def _open_arrays(self, signal_id, files):
+        opened = {}
+        for filename, _ in files.values():
+            if filename not in opened:
+                opened[filename] = np.load(os.path.join(self._signal_dir(signal_id), filename), mmap_mode='r')
+        return {name: opened[filename] for name, (filename, _) in files.items()}
+
+    # --- Lookups ---
+    def __contains__(self, signal_id):
+        row = self._connection().execute('SELECT 1 FROM signals WHERE signal_id = ?', (signal_id,)).fetchone()
+        return row is not None
+
+    def get(self, signal_id, default=None):
+        db = self._connection()
+        for attempt in range(OPEN_RETRIES):
+            row = db.execute('SELECT meta, arrays, touched, version FROM signals WHERE signal_id = ?', (signal_id,)).fetchone()
+            if row is None:
+                with self._lock:
+                    self.misses += 1
+                return default
+            try:
+                arrays = self._open_arrays(signal_id, json.loads(row[1]))
+                break
+            except FileNotFoundError:
+                if attempt == OPEN_RETRIES - 1:
+                    raise
+        now = time.time()
+        if now - row[2] > TOUCH_INTERVAL_S:
+            db.execute('UPDATE signals SET touched = ? WHERE signal_id = ?', (now, signal_id))
+        with self._lock:
+            self.hits += 1
+            local = dict(self._local_values.get(signal_id, {}))
+        return SharedSignalEntry(self, signal_id, {**json.loads(row[0]), **_nest(arrays), **local}, row[3])
+
+    def _snapshot(self, entry):
+        """ A SignalState of the entry whose derived arrays are memoized per signal for the newest version this process has seen. """
+        signal_id = entry.signal_id
+        with self._lock:
+            derived = self._derived.get(signal_id)
+            if derived is None or derived.version < entry.version:
+                derived = DerivedArrays(entry.version)
+                self._derived[signal_id] = derived
+            self._derived.move_to_end(signal_id)
+        if derived.version != entry.version:
+            return SignalState(entry.version, entry)   # older than the memo: computed, not kept
+        return SignalState(entry.version, entry, derived, lambda: self._trim_derived(signal_id))
+
+    def _trim_derived(self, keep):
+        with self._lock:
+            total = sum(memo.nbytes for memo in self._derived.values())
+            for signal_id in list(self._derived):
+                if total <= self.max_derived_bytes or signal_id == keep:
+                    break
+                total -= self._derived.pop(signal_id).nbytes
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM signals').fetchone()[0]
+
+    def __iter__(self):
+        return iter([row[0] for row in self._connection().execute('SELECT signal_id FROM signals')])
+
+    # --- Writes ---
+    def __setitem__(self, signal_id, data):
+        arrays, meta, local = {}, {}, {}
+        for key, value in dict(data).items():
+            kind, split = _split_value(key, value)
+            if kind == 'arrays':
+                arrays.update(split)
+            else:
+                (meta if kind == 'meta' else local)[key] = split
+        files, _ = self._write_arrays(signal_id, arrays)
+        try:
+            with self._transaction() as db:
+                row = db.execute('SELECT arrays, version FROM signals WHERE signal_id = ?', (signal_id,)).fetchone()
+                db.execute(
+                    'INSERT OR REPLACE INTO signals (signal_id, meta, arrays, nbytes, touched, version) VALUES (?, ?, ?, ?, ?, ?)',
+                    (signal_id, json.dumps(meta), json.dumps(files), self._nbytes(files), time.time(),
+                     row[1] + 1 if row is not None else 1)
+                )
+        except Exception:
+            self._remove_files(signal_id, [filename for filename, _ in files.values()])
+            raise
+        if row is not None:
+            new_files = {filename for filename, _ in files.values()}
+            self._remove_files(signal_id, {filename for filename, _ in json.loads(row[0]).values()} - new_files)
+        with self._lock:
+            self._local_values[signal_id] = local
+        self._enforce_limits(keep=signal_id)
+
+    def _write_items(self, signal_id, updates, request_seq=None):
+        """
+        Stores entry items as one new version. Returns ({key: value as the
+        entry should now hold it}, new version), or (None, committed version)
+        if request_seq is not newer than the one already committed. Raises
+        KeyError if the signal was deleted since it was looked up.
+        """
+        updates = dict(updates)
+        if request_seq is not None:
+            updates['request_seq'] = request_seq
+        split = {key: _split_value(key, value) for key, value in updates.items()}
+        arrays = {}
+        for kind, part in split.values():
+            if kind == 'arrays':
+                arrays.update(part)
+        files, mapped = self._write_arrays(signal_id, arrays)
+        replaced = []
+        version = 0
+        stale = missing = False
+        with self._transaction() as db:
+            row = db.execute('SELECT meta, arrays, version FROM signals WHERE signal_id = ?', (signal_id,)).fetchone()
+            if row is None:
+                replaced, missing = [filename for filename, _ in files.values()], True   # deleted meanwhile
+            elif stale_request(json.loads(row[0]).get('request_seq'), request_seq):
+                replaced, version, stale = [filename for filename, _ in files.values()], row[2], True
+            else:
+                version = row[2] + 1
+                meta, stored = json.loads(row[0]), json.loads(row[1])
+                for key, (kind, part) in split.items():
+                    meta.pop(key, None)
+                    for name in [name for name in stored if name == key or name.startswith(key + '/')]:
+                        replaced.append(stored.pop(name)[0])
+                    if kind == 'meta':
+                        meta[key] = part
+                stored.update(files)
+                db.execute('UPDATE signals SET meta = ?, arrays = ?, nbytes = ?, touched = ?, version = ? WHERE signal_id = ?',
+                           (json.dumps(meta), json.dumps(stored), self._nbytes(stored), time.time(), version, signal_id))
+                # The upload stores one array under several names: keep files another name still uses
+                replaced = set(replaced) - {filename for filename, _ in stored.values()}
+        self._remove_files(signal_id, replaced)
+        if missing:
+            raise KeyError(signal_id)
+        if stale:
+            return None, version
+
+        nested = _nest(mapped)
+        with self._lock:
+            local = self._local_values.setdefault(signal_id, {})
+            for key, (kind, part) in split.items():
+                if kind == 'local':
+                    local[key] = part
+                else:
+                    local.pop(key, None)
+        return {key: nested[key] if kind == 'arrays' else updates[key] for key, (kind, _) in split.items()}, version
+
+    def __delitem__(self, signal_id):
+        with self._transaction() as db:
+            deleted = db.execute('DELETE FROM signals WHERE signal_id = ?', (signal_id,)).rowcount
+        if not deleted:
+            raise KeyError(signal_id)
+        self._drop_local(signal_id)
+
+    def _drop_local(self, signal_id):
+        shutil.rmtree(self._signal_dir(signal_id), ignore_errors=True)
+        with self._lock:
+            self._local_values.pop(signal_id, None)
+            self._derived.pop(signal_id, None)
+
+    @staticmethod
+    def _nbytes(files):
+        """ Bytes of the distinct files in {name: [file, nbytes]} (aliased names share one file). """
+        return sum(dict(files.values()).values())
+
+    def _enforce_limits(self, keep=None):
+        """ Deletes idle entries, then least recently used ones beyond the memory budget. """
+        now = time.time()
+        with self._transaction() as db:
+            rows = db.execute('SELECT signal_id, nbytes, touched FROM signals ORDER BY touched').fetchall()
+            total = sum(nbytes for _, nbytes, _ in rows)
+            expired, evicted = [], []
+            for signal_id, nbytes, touched in rows:
+                if signal_id == keep:
+                    continue
+                if now - touched > self.ttl_seconds:
+                    expired.append(signal_id)
+                elif total > self.max_memory_bytes:
+                    evicted.append(signal_id)
+                else:
+                    continue
+                total -= nbytes
+            db.executemany('DELETE FROM signals WHERE signal_id = ?', [(signal_id,) for signal_id in expired + evicted])
+        for signal_id in expired + evicted:
+            self._drop_local(signal_id)
+        with self._lock:
+            self.expirations += len(expired)
+            self.evictions += len(evicted)
+
+    def clear(self):
+        with self._transaction() as db:
+            signal_ids = [row[0] for row in db.execute('SELECT signal_id FROM signals')]
+            db.execute('DELETE FROM signals')
+        for signal_id in signal_ids:
+            self._drop_local(signal_id)
+
+    def stats(self):
+        entries, nbytes = self._connection().execute('SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM signals').fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': entries,
+                'shared_bytes': nbytes,
+                'derived_bytes': sum(memo.nbytes for memo in self._derived.values()),
+                'max_memory_bytes': self.max_memory_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'directory': self.directory,
+            }
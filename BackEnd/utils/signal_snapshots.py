@@ -0,0 +1,249 @@
+# BackEnd/utils/signal_snapshots.py
+import os
+import json
+import time
+import shutil
+import threading
+import numpy as np
+
+# --- Defaults (overridden by create_app) ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_SNAPSHOT_DIR = os.path.join(BASE_DIR, 'cache', 'signal_snapshots')
+DEFAULT_SNAPSHOT_INTERVAL_S = 300
+META_NAME = 'meta.json'
+
+
+def _numpy_scalar(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _split_entry(data):
+    """ ({flat name: array}, {key: JSON value}) of an entry; other values ('ai_stream') are not kept. """
+    arrays, meta = {}, {}
+    for key, value in data.items():
+        if isinstance(value, np.ndarray):
+            arrays[key] = value
+        elif isinstance(value, dict) and value and all(isinstance(v, np.ndarray) for v in value.values()):
+            arrays.update({f"{key}/{name}": array for name, array in value.items()})
+        else:
+            try:
+                meta[key] = json.loads(json.dumps(value, default=_numpy_scalar))
+            except (TypeError, ValueError):
+                pass
+    return arrays, meta
+
+
+class SignalSnapshots:
+    """
+    Warm-restart copies of the in-process signal cache: one directory per
+    signal with each array as a .npy file and a meta.json (Fs, eq_scheme,
+    version, last use, ...).
+    - Entries whose version changed since their last snapshot are written every
+      interval_s and once more at exit; arrays a previous snapshot already
+      holds are hard-linked instead of copied.
+    - After a restart the directory is only listed. An entry is restored on
+      its first lookup, with its arrays memory-mapped from the snapshot files
+      instead of read into memory.
+    The writer thread starts with the first entry this process stores, so a
+    server that forks workers after create_app() runs it in the workers.
+    """
+
+    def __init__(self, directory=DEFAULT_SNAPSHOT_DIR, interval_s=DEFAULT_SNAPSHOT_INTERVAL_S, enabled=False):
+        self.directory = directory
+        self.interval_s = interval_s
+        self.ttl_seconds = None
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._pending = set()   # signal_ids on disk that this process has not restored yet
+        self._written = {}      # signal_id -> version of its snapshot on disk
+        self._pid = None
+        self._stop = threading.Event()
+
+        self.saved = 0
+        self.restored = 0
+        self.last_duration_s = None
+
+    def configure(self, directory, interval_s, ttl_seconds, enabled=True):
+        """ Points at the snapshot directory and lists the signals a previous run left there. """
+        self.directory = directory
+        self.interval_s = interval_s
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        if not enabled:
+            return 0
+        os.makedirs(directory, exist_ok=True)
+        found = set()
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith('.old') and not os.path.isdir(path[:-4]):
+                os.replace(path, path[:-4])   # interrupted between the two renames of _save
+                name = name[:-4]
+            elif name.endswith('.tmp') or name.endswith('.old'):
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            found.add(name)
+        with self._lock:
+            self._pending = found
+            self._written = {}
+        return len(found)
+
+    def _path(self, signal_id):
+        return os.path.join(self.directory, signal_id)
+
+    # --- Restore ---
+    def pending(self):
+        with self._lock:
+            return set(self._pending)
+
+    def has(self, signal_id):
+        with self._lock:
+            return signal_id in self._pending
+
+    def restore(self, signal_id):
+        """ (entry data with memory-mapped arrays, version) of a snapshotted signal, or None. """
+        with self._lock:
+            if signal_id not in self._pending:
+                return None
+            self._pending.discard(signal_id)
+        path = self._path(signal_id)
+        try:
+            with open(os.path.join(path, META_NAME)) as f:
+                meta = json.load(f)
+            if self.ttl_seconds is not None and time.time() - meta['touched'] > self.ttl_seconds:
+                shutil.rmtree(path, ignore_errors=True)
+                return None
+            opened = {}
+            for filename in meta['arrays'].values():
+                if filename not in opened:
+                    opened[filename] = np.load(os.path.join(path, filename), mmap_mode='r')
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠ Warning: Dropping unreadable snapshot of signal {signal_id}: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+        data = dict(meta['meta'])
+        for name, filename in meta['arrays'].items():
+            key, _, member = name.partition('/')
+            if member:
+                data.setdefault(key, {})[member] = opened[filename]
+            else:
+                data[key] = opened[filename]
+        with self._lock:
+            self._written[signal_id] = meta['version']
+            self.restored += 1
+        return data, meta['version']
+
+    # --- Save ---
+    def save(self, entries, keep):
+        """
+        Writes the snapshots of entries, a list of (signal_id, version, last
+        use, load) where load() returns the entry's data and is only called if
+        that version is not on disk yet. Snapshots this process wrote or restored
+        for signal_ids outside keep are deleted. Returns how many were written.
+        """
+        start = time.time()
+        saved = 0
+        for signal_id, version, touched, load in entries:
+            with self._lock:
+                if self._written.get(signal_id) == version:
+                    continue
+            try:
+                self._save(signal_id, version, touched, load())
+            except Exception as e:
+                print(f"⚠ Warning: Could not snapshot signal {signal_id}: {e}")
+                continue
+            with self._lock:
+                self._written[signal_id] = version
+            saved += 1
+
+        # Only this process's own snapshots: other workers may share the directory
+        with self._lock:
+            dropped = [signal_id for signal_id in self._written if signal_id not in keep]
+            for signal_id in dropped:
+                del self._written[signal_id]
+        for signal_id in dropped:
+            shutil.rmtree(self._path(signal_id), ignore_errors=True)
+        with self._lock:
+            self.saved += saved
+            self.last_duration_s = round(time.time() - start, 3)
+        return saved
+
+    def _save(self, signal_id, version, touched, data):
+        path = self._path(signal_id)
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        arrays, meta = _split_entry(data)
+        files, written = {}, {}
+        for name, array in arrays.items():
+            if id(array) not in written:
+                filename = f"{name.replace('/', '.')}.npy"
+                target = os.path.join(tmp_path, filename)
+                source = getattr(array, 'filename', None)
+                if source is not None and os.path.dirname(os.path.abspath(source)) == os.path.abspath(path):
+                    # Unchanged since the snapshot it was restored from: link the file instead of copying it
+                    try:
+                        os.link(source, target)
+                    except OSError:
+                        np.save(target, np.asarray(array))
+                else:
+                    np.save(target, np.asarray(array))
+                written[id(array)] = filename
+            files[name] = written[id(array)]
+        with open(os.path.join(tmp_path, META_NAME), 'w') as f:
+            json.dump({'version': version, 'touched': touched, 'meta': meta, 'arrays': files}, f)
+
+        # Swap directories; arrays still mapped from the replaced snapshot stay valid until dropped
+        if os.path.isdir(path):
+            shutil.rmtree(path + '.old', ignore_errors=True)
+            os.rename(path, path + '.old')
+        os.rename(tmp_path, path)
+        shutil.rmtree(path + '.old', ignore_errors=True)
+
+    def discard(self, signal_id):
+        """ Deletes a signal's snapshot (the signal was deleted or replaced). """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._pending.discard(signal_id)
+            self._written.pop(signal_id, None)
+        shutil.rmtree(self._path(signal_id), ignore_errors=True)
+
+    # --- Background writer ---
+    def start(self, save):
+        """ Runs save() every interval_s in this process (no-op if already running here). """
+        if not self.enabled or self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._stop = threading.Event()
+        threading.Thread(target=self._loop, args=(save, self._stop), name='signal-snapshots', daemon=True).start()
+
+    def _loop(self, save, stop):
+        while not stop.wait(self.interval_s):
+            try:
+                save()
+            except Exception as e:
+                print(f"⚠ Warning: Signal snapshot failed: {e}")
+
+    def shutdown(self, save):
+        """ Stops the writer and takes a last snapshot, in the process that stored entries only. """
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        save()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'directory': self.directory,
+                'interval_s': self.interval_s,
+                'on_disk': len(self._written) + len(self._pending),
+                'pending_restore': len(self._pending),
+                'saved': self.saved,
+                'restored': self.restored,
+                'last_duration_s': self.last_duration_s,
+            }
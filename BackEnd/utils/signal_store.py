@@ -0,0 +1,878 @@
+# BackEnd/utils/signal_store.py
+import os
+import time
+import shutil
+import threading
+import itertools
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
+import numpy as np
+
+from custom_fft import custom_ifft
+from equalizer_core import apply_equalization
+from signal_snapshots import SignalSnapshots, DEFAULT_SNAPSHOT_DIR, DEFAULT_SNAPSHOT_INTERVAL_S
+
+# --- Defaults (overridden by create_app) ---
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_MEMMAP_DIR = os.path.join(BASE_DIR, 'cache', 'signals')
+DEFAULT_MEMMAP_MIN_KB = 256
+DEFAULT_SPILL_DIR = os.path.join(BASE_DIR, 'cache', 'signal_spill')
+DEFAULT_MEMORY_MB = 1024
+DEFAULT_TTL_S = 1800
+DEFAULT_SPILL_MB = 4096
+# Spill files store spectra and signals at single precision (half the bytes)
+SPILL_DTYPES = {np.dtype(np.float64): np.float32, np.dtype(np.complex128): np.complex64}
+
+
+# --- Compact Entry Layout ---
+# An entry stores only what cannot be recomputed: the decoded signal
+# ('time_series', float32), the non-negative half of its custom_fft spectrum
+# ('half_spectrum', complex64, with the padded length in 'fft_size') and the
+# equalization scheme last applied ('eq_scheme', None until /apply). The
+# spectra and the equalized signal the routes read ('input_fft',
+# 'current_fft', 'current_signal') are derived from those on access. The
+# spectra are an O(N) rebuild from the half-spectrum and are not kept; the
+# equalized signal (a full IFFT) is memoized until the scheme or signal
+# changes, and dropped again first when the cache runs short of memory.
+SOURCE_KEYS = ('time_series', 'half_spectrum', 'fft_size', 'eq_scheme', 'Fs')
+DERIVED_KEYS = ('input_fft', 'current_fft', 'current_signal')
+MEMOIZED_KEYS = ('current_signal',)
+
+
+def compact_signal_entry(Fs, signal, fft):
+    """ A new cache entry for a decoded signal and its full custom_fft spectrum. """
+    return {
+        'Fs': int(Fs),
+        'time_series': np.asarray(signal, dtype=np.float32),
+        'half_spectrum': np.asarray(fft[:len(fft) // 2 + 1], dtype=np.complex64),
+        'fft_size': len(fft),
+        'eq_scheme': None,
+        'output_path': None
+    }
+
+
+def _full_spectrum(half_spectrum, fft_size):
+    """ Rebuilds the two-sided spectrum of a real signal from bins 0..N/2 (conjugate symmetry). """
+    full = np.empty(fft_size, dtype=np.complex64)
+    full[:len(half_spectrum)] = half_spectrum
+    full[len(half_spectrum):] = np.conj(half_spectrum[1:fft_size - len(half_spectrum) + 1][::-1])
+    return full
+
+
+def derive_signal_array(data, key, derived):
+    """
+    Computes one of DERIVED_KEYS from an entry's SOURCE_KEYS, reusing arrays
+    already in `derived` ({key: array} memoized for the same state).
+    """
+    scheme = data.get('eq_scheme')
+    if key == 'current_signal':
+        if scheme is None:
+            return data['time_series']   # not equalized yet: the output is the input
+        current_fft = derived.get('current_fft')
+        if current_fft is None:
+            current_fft = derive_signal_array(data, 'current_fft', derived)
+        return custom_ifft(current_fft).real.astype(np.float32)
+
+    full = _full_spectrum(data['half_spectrum'], int(data['fft_size']))
+    if key == 'input_fft' or scheme is None:
+        return full
+    return apply_equalization(full, data['Fs'], scheme)
+
+
+def derivable(data, key):
+    """ True if key is one of DERIVED_KEYS and data holds the values it is derived from. """
+    return key in DERIVED_KEYS and all(name in data.keys() for name in ('time_series', 'half_spectrum', 'fft_size'))
+
+
+def stale_request(committed_seq, request_seq):
+    """ True if a write tagged request_seq lost to one with an equal or higher sequence number. """
+    return request_seq is not None and committed_seq is not None and request_seq <= committed_seq
+
+
+class DerivedArrays:
+    """
+    Memo of MEMOIZED_KEYS for one version of an entry (see SignalState):
+    a new version starts a new memo instead of invalidating this one.
+    """
+
+    def __init__(self, version=0):
+        self._lock = threading.Lock()
+        self.version = version
+        self._values = {}
+
+    def get(self, data, key):
+        """ (value, whether it was just memoized) for one of DERIVED_KEYS of data, the state's stored values. """
+        with self._lock:
+            value = self._values.get(key)
+            known = dict(self._values)
+        if value is not None:
+            return value, False
+        value = derive_signal_array(data, key, known)
+        if key not in MEMOIZED_KEYS or any(value is stored for stored in data.values()):
+            return value, False   # cheap to rebuild, or a stored array passed through (the output before any /apply)
+        with self._lock:
+            self._values.setdefault(key, value)
+        return value, True
+
+    def drop(self):
+        """ Forgets the memoized arrays; returns the heap bytes released. """
+        with self._lock:
+            freed = self.nbytes
+            self._values = {}
+        return freed
+
+    @property
+    def nbytes(self):
+        unique = {id(v): v for v in self._values.values() if isinstance(v, np.ndarray) and not _file_backed(v)}
+        return sum(v.nbytes for v in unique.values())
+
+
+class SignalState(Mapping):
+    """
+    One committed version of an entry: a read-only mapping of its stored values
+    that also serves DERIVED_KEYS, memoized with the state. Writers publish a
+    new state rather than change this one, so a request that took a snapshot
+    computes from one consistent version without taking any lock.
+    """
+
+    def __init__(self, version, data, derived=None, on_memoized=None):
+        self.version = version
+        self._data = MappingProxyType(dict(data))
+        self.derived = derived if derived is not None else DerivedArrays(version)
+        self._on_memoized = on_memoized
+
+    def __getitem__(self, key):
+        if key in self._data:
+            return self._data[key]
+        if key not in DERIVED_KEYS:
+            raise KeyError(key)
+        value, memoized = self.derived.get(self._data, key)
+        if memoized and self._on_memoized is not None:
+            self._on_memoized()
+        return value
+
+    def __contains__(self, key):
+        return key in self._data or derivable(self._data, key)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _file_backed(array):
+    """ True for a memmap that maps a file (copies and results computed from one are np.memmap too, without a file). """
+    return isinstance(array, np.memmap) and getattr(array, 'filename', None) is not None
+
+
+def _write_npy(path, array):
+    """ Writes array to a .npy file through a writable memmap and returns the file reopened read-only. """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mapped = np.lib.format.open_memmap(path, mode='w+', dtype=array.dtype, shape=array.shape)
+    mapped[...] = array
+    mapped.flush()
+    del mapped
+    return np.load(path, mmap_mode='r')
+
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass   # exists but belongs to another user
+    return True
+
+
+def process_dir(root):
+    """
+    This process's own subdirectory of root (named after its pid), emptied.
+    Subdirectories of processes that no longer run are deleted; those of other
+    live workers sharing root are left alone.
+    """
+    os.makedirs(root, exist_ok=True)
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.isdigit() and int(name) != os.getpid() and _pid_running(int(name)):
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)   # left by a run that kept files directly in root
+            except OSError:
+                pass
+    path = os.path.join(root, str(os.getpid()))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class MemmapArrays:
+    """
+    Moves large arrays out of the process heap into .npy files opened as
+    read-only np.memmap, one directory per signal. The OS page cache then
+    decides which of them stay resident. Every write goes to a new file and the
+    replaced one is unlinked, so a request still holding the old array keeps a
+    valid mapping.
+    """
+
+    def __init__(self, directory=DEFAULT_MEMMAP_DIR, min_bytes=DEFAULT_MEMMAP_MIN_KB * 1024, enabled=False):
+        self.directory = directory
+        self.min_bytes = min_bytes
+        self.enabled = enabled
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._files = {}   # path -> nbytes of every file written and not yet deleted
+
+    def _path(self, signal_id, name):
+        return os.path.join(self.directory, signal_id, f"{name}-{next(self._counter)}.npy")
+
+    def externalize(self, signal_id, name, array):
+        """ Returns array itself, or a read-only memmap copy of it if memmapping is on and it is large enough. """
+        if not self.enabled or not isinstance(array, np.ndarray) or _file_backed(array):
+            return array
+        if array.nbytes < max(1, self.min_bytes) or array.dtype.hasobject:
+            return array
+        path = self._path(signal_id, name)
+        mapped = _write_npy(path, array)
+        with self._lock:
+            self._files[os.path.abspath(path)] = array.nbytes
+        return mapped
+
+    def discard(self, array):
+        """ Unlinks the file behind a memmap this store created (no-op for in-memory arrays). """
+        if not _file_backed(array) or array.filename not in self._files:
+            return
+        try:
+            os.remove(array.filename)
+        except OSError:
+            return   # still mapped on Windows; removed with the signal's directory
+        with self._lock:
+            self._files.pop(array.filename, None)
+
+    def release(self, signal_id, arrays):
+        """ Deletes the files behind a signal's arrays, then its directory once empty. """
+        for array in arrays:
+            self.discard(array)
+        if self.enabled:
+            try:
+                os.rmdir(os.path.join(self.directory, signal_id))
+            except OSError:
+                pass   # missing, or another entry for the same signal_id is already writing to it
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'directory': self.directory,
+                'files': len(self._files),
+                'bytes': sum(self._files.values()),
+            }
+
+
+class SignalEntry(dict):
+    """
+    One signal's cache entry: a dict whose large array values (time series,
+    spectra, and the stems of 'ai_sources') are handed to MemmapArrays as they
+    are stored. Small metadata ('Fs', 'output_path', ...) stays in RAM.
+    Writes take the entry's lock and publish a new SignalState with the next
+    version; snapshot() hands out the latest one without locking. Every write
+    is reported to the owning SignalCache, which keeps the entry's size up to
+    date (and re-admits it if it was spilled in the meantime).
+    """
+
+    def __init__(self, signal_id, arrays, data=(), owner=None, version=0):
+        super().__init__()
+        self.signal_id = signal_id
+        self.lock = threading.RLock()
+        self._arrays = arrays
+        self._owner = owner
+        stored = {}   # the upload stores the same array under several keys: write it once
+        for key, value in dict(data).items():
+            if id(value) not in stored:
+                stored[id(value)] = self._externalize(key, value)
+            super().__setitem__(key, stored[id(value)])
+        self._state = SignalState(version, self, on_memoized=self._memoized)
+
+    def _externalize(self, key, value):
+        if isinstance(value, dict):
+            return {name: self._arrays.externalize(self.signal_id, f"{key}.{name}", array)
+                    for name, array in value.items()}
+        return self._arrays.externalize(self.signal_id, key, value)
+
+    def _discard(self, value):
+        shared = {id(v) for v in self.values()}
+        for array in (value.values() if isinstance(value, dict) else [value]):
+            if id(array) not in shared:
+                self._arrays.discard(array)
+
+    @property
+    def version(self):
+        return self._state.version
+
+    @property
+    def derived(self):
+        return self._state.derived
+
+    def snapshot(self):
+        """ The latest committed SignalState (states are replaced, never changed, so no lock is needed). """
+        return self._state
+
+    def commit(self, updates, request_seq=None):
+        """
+        Writes {key: value} as one new version and returns its SignalState.
+        request_seq is a client-side counter (e.g. one per slider move): the
+        write is dropped, returning None, if an equal or newer one was committed.
+        """
+        for key in updates:
+            if key in DERIVED_KEYS:
+                raise KeyError(f"'{key}' is derived from the stored signal and 'eq_scheme'; set those instead")
+        with self.lock:
+            if stale_request(self.get('request_seq'), request_seq):
+                return None
+            updates = dict(updates)
+            if request_seq is not None:
+                updates['request_seq'] = request_seq
+            previous = [self.get(key) for key in updates]
+            for key, value in updates.items():
+                super().__setitem__(key, self._externalize(key, value))
+            # Memoized outputs stay valid unless the signal or the scheme changed
+            derived = None if any(key in SOURCE_KEYS for key in updates) else self._state.derived
+            self._state = state = SignalState(self._state.version + 1, self, derived, self._memoized)
+            for value in previous:
+                if value is not None:
+                    self._discard(value)
+        if self._owner is not None:
+            self._owner._entry_changed(self)
+        return state
+
+    def __setitem__(self, key, value):
+        self.commit({key: value})
+
+    def __missing__(self, key):
+        return self._state[key]
+
+    # dict's own get() and `in` skip __missing__: route DERIVED_KEYS through it too
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __contains__(self, key):
+        return super().__contains__(key) or derivable(self, key)
+
+    def _memoized(self):
+        if self._owner is not None:
+            self._owner._entry_changed(self)
+
+    def arrays(self):
+        """ {flat name: array} of every distinct array, with 'ai_sources' stems as 'ai_sources/<name>'. """
+        found = {}
+        for key, value in self.items():
+            if isinstance(value, np.ndarray):
+                found[key] = value
+            elif isinstance(value, dict) and value and all(isinstance(v, np.ndarray) for v in value.values()):
+                found.update({f"{key}/{name}": array for name, array in value.items()})
+        return found
+
+    @property
+    def nbytes(self):
+        """ Heap bytes held by the entry's arrays, memoized ones included (memory-mapped ones are left to the page cache). """
+        unique = {id(array): array for array in self.arrays().values() if not _file_backed(array)}
+        return sum(array.nbytes for array in unique.values()) + self.derived.nbytes
+
+    def release(self):
+        self._arrays.release(self.signal_id, self.arrays().values())
+
+
+class SpillRecord:
+    """ Where an evicted entry went: its arrays in one .npz, everything else kept here. """
+
+    def __init__(self, path, entry):
+        self.path = path
+        self.entry = entry   # still set while the file is being written
+        self.version = entry.version
+        self.meta = {}
+        self.aliases = {}    # name -> name of the identical array actually stored
+        self.nbytes = 0
+
+
+def _write_spill(entry, record):
+    """ Saves the entry's arrays with float64/complex128 narrowed to float32/complex64. """
+    arrays, written = {}, {}
+    flat = entry.arrays()
+    for name, array in flat.items():
+        if id(array) in written:
+            record.aliases[name] = written[id(array)]
+            continue
+        written[id(array)] = name
+        arrays[name] = np.asarray(array).astype(SPILL_DTYPES.get(array.dtype, array.dtype), copy=False)
+    nested = {name.partition('/')[0] for name in flat}
+    record.meta = {key: value for key, value in entry.items() if key not in nested}
+
+    tmp_path = record.path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, record.path)
+    record.nbytes = os.path.getsize(record.path)
+
+
+def _read_spill(record):
+    """ The entry data of a spilled record (arrays come back as stored, not widened again). """
+    data = dict(record.meta)
+    with np.load(record.path) as npz:
+        loaded = {name: npz[name] for name in npz.files}
+    for alias, name in record.aliases.items():
+        loaded[alias] = loaded[name]
+    for name, array in loaded.items():
+        key, _, member = name.partition('/')
+        if member:
+            data.setdefault(key, {})[member] = array
+        else:
+            data[key] = array
+    return data
+
+
+class SignalStore(ABC):
+    """
+    What the routes need from SIGNAL_CACHE: a mapping of signal_id to an entry
+    dict ('Fs', 'time_series', 'input_fft', ...) whose item assignments are
+    kept by the store. Entries also have a monotonically increasing version,
+    snapshot() (an immutable SignalState to read one consistent version from)
+    and commit(updates, request_seq) for atomic, stale-dropping writes.
+    Implementations:
+    - SignalCache: entries live in this process (LRU, spilled to disk).
+    - shared_signal_store.SharedSignalStore: arrays in shared memory and an
+      index on local disk, so every worker process sees every signal_id.
+    """
+
+    @abstractmethod
+    def get(self, signal_id, default=None):
+        ...
+
+    @abstractmethod
+    def __contains__(self, signal_id):
+        ...
+
+    @abstractmethod
+    def __setitem__(self, signal_id, data):
+        ...
+
+    @abstractmethod
+    def __delitem__(self, signal_id):
+        ...
+
+    @abstractmethod
+    def __len__(self):
+        ...
+
+    @abstractmethod
+    def __iter__(self):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def stats(self):
+        ...
+
+    def __getitem__(self, signal_id):
+        entry = self.get(signal_id)
+        if entry is None:
+            raise KeyError(signal_id)
+        return entry
+
+    def pop(self, signal_id, *default):
+        entry = self.get(signal_id)
+        if entry is None:
+            if default:
+                return default[0]
+            raise KeyError(signal_id)
+        del self[signal_id]
+        return entry
+
+
+class SignalCache(SignalStore):
+    """
+    {signal_id: SignalEntry} with a memory budget.
+    - Entries are kept least-recently-used first and their heap bytes are
+      tracked; beyond max_memory_bytes, or after ttl_seconds without a lookup,
+      an entry is spilled to one .npz in spill_dir and dropped from memory.
+    - Looking up a spilled signal_id reloads it transparently, so the routes
+      keep using `signal_id in SIGNAL_CACHE` and SIGNAL_CACHE[signal_id].
+    - Spill files beyond max_spill_bytes are deleted oldest-first; those
+      signal_ids are then forgotten.
+    Plain dicts stored in the cache are wrapped in a SignalEntry, so with
+    memmapping enabled the large arrays live in memory-mapped files.
+    With snapshots enabled, entries also survive a restart (SignalSnapshots):
+    signal_ids of the previous run are known at once and restored on lookup.
+    """
+
+    def __init__(self, max_memory_mb=DEFAULT_MEMORY_MB, ttl_seconds=DEFAULT_TTL_S,
+                 spill_dir=DEFAULT_SPILL_DIR, max_spill_mb=DEFAULT_SPILL_MB):
+        self.arrays = MemmapArrays()
+        self.snapshots = SignalSnapshots()
+        self._lock = threading.RLock()
+        self._resident = OrderedDict()    # signal_id -> SignalEntry, least recently used first
+        self._sizes = {}                  # signal_id -> heap bytes of the resident entry
+        self._last_access = {}            # signal_id -> time.time() of the last lookup or write
+        self._spilled = OrderedDict()     # signal_id -> SpillRecord, oldest spill first
+        self._resident_bytes = 0
+        self._spill_bytes = 0
+
+        self.hits = 0
+        self.reloads = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.dropped = 0
+        self.derived_drops = 0
+
+        self.configure(max_memory_mb, ttl_seconds, spill_dir, max_spill_mb)
+
+    def configure(self, max_memory_mb, ttl_seconds, spill_dir, max_spill_mb):
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = int(max_spill_mb * 1024 * 1024)
+        with self._lock:
+            victims = self._evict()
+        self._spill(victims)
+
+    def configure_memmap(self, directory, min_kb=DEFAULT_MEMMAP_MIN_KB, enabled=True):
+        self.arrays.min_bytes = int(min_kb * 1024)
+        self.arrays.enabled = enabled
+        # Files of a previous run belong to signal_ids nobody holds any more
+        self.arrays.directory = process_dir(directory) if enabled else directory
+
+    def configure_snapshots(self, directory, interval_s=DEFAULT_SNAPSHOT_INTERVAL_S, enabled=True):
+        """ Returns how many signals of a previous run can be restored. """
+        return self.snapshots.configure(directory, interval_s, self.ttl_seconds, enabled)
+
+    def save_snapshots(self):
+        """ Snapshots every entry whose version changed since its last snapshot; returns how many were written. """
+        if not self.snapshots.enabled:
+            return 0
+        with self._lock:
+            entries = [(signal_id, entry.version, self._last_access.get(signal_id, time.time()), entry.snapshot)
+                       for signal_id, entry in self._resident.items()]
+            entries += [(signal_id, record.version, time.time(), lambda record=record: record.entry or _read_spill(record))
+                        for signal_id, record in self._spilled.items()]
+        return self.snapshots.save(entries, keep={signal_id for signal_id, _, _, _ in entries})
+
+    # --- Lookups ---
+    def __contains__(self, signal_id):
+        with self._lock:
+            return signal_id in self._resident or signal_id in self._spilled or self.snapshots.has(signal_id)
+
+    def get(self, signal_id, default=None):
+        with self._lock:
+            entry = self._resident.get(signal_id)
+            if entry is not None:
+                self.hits += 1
+                self._touch(signal_id)
+                victims = self._evict(keep=signal_id)
+            else:
+                record = self._spilled.get(signal_id)
+                if record is None:
+                    entry = self._restore(signal_id)   # a signal of the previous run, if snapshotted
+                    if entry is None:
+                        self.misses += 1
+                        return default
+                else:
+                    try:
+                        entry = self._reload(signal_id, record)
+                    except Exception as e:
+                        print(f"⚠ Warning: Dropping unreadable spilled signal {signal_id}: {e}")
+                        self._forget_spilled(signal_id)
+                        self.misses += 1
+                        return default
+                self.reloads += 1
+                victims = self._evict(keep=signal_id)
+        self._spill(victims)
+        return entry
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __iter__(self):
+        with self._lock:
+            known = list(self._resident) + list(self._spilled)
+        return iter(known + sorted(self.snapshots.pending() - set(known)))
+
+    # --- Writes ---
+    def __setitem__(self, signal_id, data):
+        entry = SignalEntry(signal_id, self.arrays, data, owner=self)
+        with self._lock:
+            self._remove(signal_id)
+            self._admit(entry)
+            victims = self._evict(keep=signal_id)
+        self._spill(victims)
+
+    def __delitem__(self, signal_id):
+        with self._lock:
+            if not self._remove(signal_id):
+                raise KeyError(signal_id)
+
+    def _entry_changed(self, entry):
+        """ Called on writes and memoized derivations: re-measure the entry, or take it back if it was spilled while in use. """
+        signal_id = entry.signal_id
+        with self._lock:
+            current = self._resident.get(signal_id)
+            if current is entry:
+                self._resident_bytes += entry.nbytes - self._sizes[signal_id]
+                self._sizes[signal_id] = entry.nbytes
+                self._touch(signal_id)
+            elif current is None and signal_id in self._spilled:
+                # A request still held the entry when it was evicted: its new data wins over the spill file
+                self._forget_spilled(signal_id)
+                self._admit(entry)
+            else:
+                return
+            victims = self._evict(keep=signal_id)
+        self._spill(victims)
+
+    # --- Internals (called with the lock held, except _spill) ---
+    def _touch(self, signal_id):
+        self._resident.move_to_end(signal_id)
+        self._last_access[signal_id] = time.time()
+
+    def _admit(self, entry):
+        self.snapshots.start(self.save_snapshots)
+        self._resident[entry.signal_id] = entry
+        self._sizes[entry.signal_id] = entry.nbytes
+        self._resident_bytes += self._sizes[entry.signal_id]
+        self._last_access[entry.signal_id] = time.time()
+
+    def _remove(self, signal_id):
+        """ Drops a signal from memory and disk; returns whether it was known. """
+        entry = self._resident.pop(signal_id, None)
+        if entry is not None:
+            self._resident_bytes -= self._sizes.pop(signal_id)
+            self._last_access.pop(signal_id, None)
+            entry.release()   # arrays already handed out stay mapped until dropped
+            self.snapshots.discard(signal_id)
+            return True
+        known = self._forget_spilled(signal_id) or self.snapshots.has(signal_id)
+        self.snapshots.discard(signal_id)
+        return known
+
+    def _forget_spilled(self, signal_id):
+        record = self._spilled.pop(signal_id, None)
+        if record is None:
+            return False
+        self._spill_bytes -= record.nbytes
+        if record.entry is None:
+            try:
+                os.remove(record.path)
+            except OSError:
+                pass
+        return True
+
+    def _reload(self, signal_id, record):
+        if record.entry is not None:
+            entry = record.entry   # evicted a moment ago and not written out yet
+        else:
+            entry = SignalEntry(signal_id, self.arrays, _read_spill(record), owner=self, version=record.version)
+        self._forget_spilled(signal_id)
+        self._admit(entry)
+        return entry
+
+    def _restore(self, signal_id):
+        """ Admits a signal from its snapshot of a previous run (arrays memory-mapped); None if there is none. """
+        restored = self.snapshots.restore(signal_id)
+        if restored is None:
+            return None
+        data, version = restored
+        entry = SignalEntry(signal_id, self.arrays, data, owner=self, version=version)
+        self._admit(entry)
+        return entry
+
+    def _evict(self, keep=None):
+        """ Moves idle and over-budget entries to _spilled; returns the records to write. """
+        victims = []
+        now = time.time()
+        while self._resident:
+            signal_id = next(iter(self._resident))
+            if signal_id == keep or now - self._last_access[signal_id] <= self.ttl_seconds:
+                break
+            self.expirations += 1
+            victims.append(self._detach(signal_id))
+        candidates = [signal_id for signal_id in self._resident if signal_id != keep]
+        # Memoized spectra and outputs are recomputed on demand: drop those before whole entries
+        for signal_id in candidates:
+            if self._resident_bytes <= self.max_memory_bytes:
+                break
+            freed = self._resident[signal_id].derived.drop()
+            if freed:
+                self._sizes[signal_id] -= freed
+                self._resident_bytes -= freed
+                self.derived_drops += 1
+        for signal_id in candidates:
+            if self._resident_bytes <= self.max_memory_bytes:
+                break
+            self.evictions += 1
+            victims.append(self._detach(signal_id))
+        return victims
+
+    def _detach(self, signal_id):
+        entry = self._resident.pop(signal_id)
+        self._resident_bytes -= self._sizes.pop(signal_id)
+        self._last_access.pop(signal_id, None)
+        record = SpillRecord(os.path.join(self.spill_dir, f"{signal_id}.npz"), entry)
+        self._spilled[signal_id] = record
+        return record
+
+    def _spill(self, victims):
+        """ Writes evicted entries to disk (outside the lock); an entry that cannot be written stays in memory. """
+        for record in victims:
+            entry = record.entry
+            try:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                _write_spill(entry, record)
+            except Exception as e:
+                print(f"⚠ Warning: Could not spill signal {entry.signal_id} to disk, keeping it in memory: {e}")
+                with self._lock:
+                    if self._spilled.get(entry.signal_id) is record:
+                        del self._spilled[entry.signal_id]
+                        self._admit(entry)
+                continue
+            with self._lock:
+                if self._spilled.get(entry.signal_id) is not record:
+                    # Reloaded, rewritten or deleted while the file was being written
+                    try:
+                        os.remove(record.path)
+                    except OSError:
+                        pass
+                    continue
+                record.entry = None
+                entry.release()
+                self._spill_bytes += record.nbytes
+                self._drop_spilled()
+
+    def _drop_spilled(self):
+        while self._spill_bytes > self.max_spill_bytes and self._spilled:
+            signal_id, record = next(iter(self._spilled.items()))
+            if record.entry is not None:
+                break   # the oldest is still being written
+            self._forget_spilled(signal_id)
+            self.dropped += 1
+            print(f"⚠ Warning: Spilled signal {signal_id} deleted to stay within the spill budget")
+
+    def clear(self):
+        with self._lock:
+            for signal_id in list(self._resident) + list(self._spilled) + list(self.snapshots.pending()):
+                self._remove(signal_id)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.reloads + self.misses
+            return {
+                'hits': self.hits,
+                'reloads': self.reloads,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.reloads) / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'dropped': self.dropped,
+                'derived_drops': self.derived_drops,
+                'resident_entries': len(self._resident),
+                'resident_bytes': self._resident_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'spilled_entries': len(self._spilled),
+                'spill_bytes': self._spill_bytes,
+                'max_spill_bytes': self.max_spill_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'memmap': self.arrays.stats(),
+                'snapshots': self.snapshots.stats(),
+            }
+
+
+class SignalStoreHandle(SignalStore):
+    """
+    The process-wide SIGNAL_CACHE: forwards to the store chosen by
+    configure_signal_cache, so modules that imported SIGNAL_CACHE by name keep
+    working when the backend is switched.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get(self, signal_id, default=None):
+        return self.backend.get(signal_id, default)
+
+    def __contains__(self, signal_id):
+        return signal_id in self.backend
+
+    def __setitem__(self, signal_id, data):
+        self.backend[signal_id] = data
+
+    def __delitem__(self, signal_id):
+        del self.backend[signal_id]
+
+    def __len__(self):
+        return len(self.backend)
+
+    def __iter__(self):
+        return iter(self.backend)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {'backend': type(self.backend).__name__, **self.backend.stats()}
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+# Process-wide cache of uploaded signals (see audio_bp for the entry layout)
+SIGNAL_CACHE = SignalStoreHandle(SignalCache())
+
+
+def configure_signal_cache(max_memory_mb, ttl_seconds, spill_dir, max_spill_mb,
+                           memmap_dir=None, memmap_min_kb=DEFAULT_MEMMAP_MIN_KB,
+                           backend='memory', shared_dir=None, shared_memory_mb=None,
+                           snapshot_dir=None, snapshot_interval_s=DEFAULT_SNAPSHOT_INTERVAL_S):
+    """
+    Applies the app configuration to the shared cache (called from create_app).
+    backend='memory' keeps the signals in this process: it spills to and
+    memory-maps from its own pid subdirectory of spill_dir and memmap_dir
+    (emptied, as are those of exited processes), memmap_dir=None keeps arrays in RAM, and with
+    snapshot_dir the entries are snapshotted there every snapshot_interval_s
+    and at exit, and restored from it after a restart.
+    backend='shared' stores them in shared_dir (a tmpfs such as /dev/shm) for
+    every worker process, within shared_memory_mb and the same idle TTL; they
+    outlive worker restarts there, so snapshots are not used.
+    """
+    if backend == 'shared':
+        # Imported here: shared_signal_store builds on the classes above
+        from shared_signal_store import SharedSignalStore
+        SIGNAL_CACHE.backend = SharedSignalStore(shared_dir, shared_memory_mb or max_memory_mb, ttl_seconds)
+        print(f"✓ Signals are shared between worker processes through {shared_dir}")
+        return SIGNAL_CACHE
+    if backend != 'memory':
+        raise ValueError(f"Unknown signal store backend '{backend}' (use 'memory' or 'shared')")
+
+    if not isinstance(SIGNAL_CACHE.backend, SignalCache):
+        SIGNAL_CACHE.backend = SignalCache()
+    SIGNAL_CACHE.configure(max_memory_mb, ttl_seconds, process_dir(spill_dir), max_spill_mb)
+    if memmap_dir:
+        SIGNAL_CACHE.configure_memmap(memmap_dir, memmap_min_kb)
+        print(f"✓ Signal arrays over {memmap_min_kb:g} KB are memory-mapped from {memmap_dir}")
+    if snapshot_dir:
+        restorable = SIGNAL_CACHE.configure_snapshots(snapshot_dir, snapshot_interval_s)
+        print(f"✓ Signal snapshots every {snapshot_interval_s:g}s in {snapshot_dir} ({restorable} signals to restore)")
+    else:
+        SIGNAL_CACHE.configure_snapshots(DEFAULT_SNAPSHOT_DIR, enabled=False)
+    return SIGNAL_CACHE
+
+
+def shutdown_signal_cache():
+    """ Takes the last snapshot of the in-process cache (registered with atexit by create_app). """
+    backend = SIGNAL_CACHE.backend
+    if isinstance(backend, SignalCache):
+        backend.snapshots.shutdown(backend.save_snapshots)
@@ -0,0 +1,130 @@
+# BackEnd/utils/stem_stream.py
+import os
+import shutil
+import threading
+import numpy as np
+
+
+class StemStreamStore:
+    """
+    Append-only, file-backed stems produced by a streaming separation.
+
+    Each stem is a raw float32 file that grows segment by segment, so memory
+    stays bounded by the segment size no matter how long the track is. The
+    completed prefix (`available_samples`) can be read, played and equalized
+    while later segments are still being separated.
+    """
+
+    def __init__(self, directory, source_names, sample_rate):
+        self.directory = directory
+        self.source_names = list(source_names)
+        self.sample_rate = int(sample_rate)
+        self.available_samples = 0
+        self.total_samples = None     # known once the producer has seen the whole input
+        self.complete = False
+        self.error = None
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        for name in self.source_names:
+            open(self._path(name), 'wb').close()
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.f32")
+
+    def append(self, segment):
+        """ Appends one finished block ({name: 1D array}, equal lengths) to every stem. """
+        lengths = {len(segment[name]) for name in self.source_names}
+        if len(lengths) != 1:
+            raise ValueError(f"Stem blocks must have equal lengths, got {sorted(lengths)}")
+        with self._lock:
+            for name in self.source_names:
+                with open(self._path(name), 'ab') as f:
+                    f.write(np.ascontiguousarray(segment[name], dtype=np.float32).tobytes())
+            # Publish the new length only after every stem holds the block
+            self.available_samples += lengths.pop()
+
+    def finish(self, error=None):
+        self.error = error
+        self.complete = error is None
+
+    def read(self, name, start=0, stop=None):
+        """ Returns a copy of samples [start, stop) of one stem, clamped to the completed prefix. """
+        if name not in self.source_names:
+            raise KeyError(name)
+        available = self.available_samples
+        stop = available if stop is None else min(stop, available)
+        start = max(0, min(start, stop))
+        if stop == start:
+            return np.zeros(0, dtype=np.float32)
+        data = np.memmap(self._path(name), dtype=np.float32, mode='r', shape=(available,))
+        return np.array(data[start:stop])
+
+    def snapshot(self, stop=None):
+        """ {name: array} of the completed prefix, all stems cut to the same length. """
+        stop = self.available_samples if stop is None else min(stop, self.available_samples)
+        return {name: self.read(name, 0, stop) for name in self.source_names}
+
+    def status(self):
+        return {
+            'sources': self.source_names,
+            'sample_rate': self.sample_rate,
+            'available_samples': self.available_samples,
+            'available_seconds': round(self.available_samples / self.sample_rate, 3),
+            'total_seconds': round(self.total_samples / self.sample_rate, 3) if self.total_samples else None,
+            'complete': self.complete,
+            'error': self.error,
+        }
+
+    def delete(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def crossfade_weights(overlap):
+    """ Linear fade-in weights for an overlap of `overlap` samples (fade-out is 1 - w). """
+    if overlap <= 0:
+        return np.zeros(0, dtype=np.float32)
+    return ((np.arange(overlap) + 0.5) / overlap).astype(np.float32)
+
+
+def plan_segments(total_samples, segment_samples, overlap_samples):
+    """
+    Splits [0, total_samples) into fixed-length segments that overlap by
+    overlap_samples. Returns a list of (start, stop); the last one may be
+    shorter but always extends past the previous segment's overlap.
+    """
+    if segment_samples <= overlap_samples:
+        raise ValueError("Segment length must be larger than the overlap.")
+    hop = segment_samples - overlap_samples
+    segments = []
+    start = 0
+    while True:
+        stop = min(start + segment_samples, total_samples)
+        segments.append((start, stop))
+        if stop >= total_samples:
+            break
+        start += hop
+    return segments
+
+
+def overlap_add(segments, total_samples, overlap_samples):
+    """
+    Stitches [(start, array[..., samples]), ...] planned by plan_segments back
+    into one [..., total_samples] array: each segment is weighted with linear
+    ramps over its overlapping edges and the sum is normalized by the weights.
+    """
+    first = segments[0][1]
+    output = np.zeros(first.shape[:-1] + (total_samples,), dtype=np.float32)
+    norm = np.zeros(total_samples, dtype=np.float32)
+    last_index = len(segments) - 1
+    for i, (start, audio) in enumerate(segments):
+        length = audio.shape[-1]
+        weights = np.ones(length, dtype=np.float32)
+        ramp = crossfade_weights(min(overlap_samples, length))
+        if i > 0:
+            weights[:len(ramp)] = np.minimum(weights[:len(ramp)], ramp)
+        if i < last_index:
+            weights[length - len(ramp):] = np.minimum(weights[length - len(ramp):], ramp[::-1])
+        output[..., start:start + length] += audio * weights
+        norm[start:start + length] += weights
+    return output / np.maximum(norm, 1e-8)
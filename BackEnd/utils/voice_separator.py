@@ -0,0 +1,220 @@
+# BackEnd/utils/voice_separator.py
+import itertools
+from lazy_import import lazy_import
+
+# torch is imported on first use, not when the server imports this module
+torch = lazy_import('torch')
+F = lazy_import('torch.nn.functional')
+
+# --- Long-recording inference for MultiDecoderDPRNN ---
+# Replaces MultiDecoderDPRNN.forward_wav (dprnn_model.py) for serving:
+# the recording is cut into half-overlapping slices like forward_wav does, but
+# the speaker order of every slice is aligned to its neighbour in one batched
+# SI-SDR comparison, and the slices are joined with a normalized Hann
+# overlap-add in one fold() instead of a per-slice Python loop.
+DEFAULT_SLICE_SIZE = 32000
+DEFAULT_MICRO_BATCH_SIZE = 8
+# Up to this many (padded) samples every possible speaker count is decoded in
+# one pass; longer recordings first decide the count in a pass without decoders
+DEFAULT_MAX_CANDIDATE_SAMPLES = 60 * 8000
+EPS = 1e-8
+
+
+def pairwise_neg_sisdr(est, target):
+    """
+    Negative SI-SDR between every estimate and every target source.
+    est, target: [batch, n_src, time] -> [batch, n_src (est), n_src (target)]
+    """
+    est = est - est.mean(dim=-1, keepdim=True)
+    target = target - target.mean(dim=-1, keepdim=True)
+    dot = torch.einsum('bit,bjt->bij', est, target)
+    target_energy = (target ** 2).sum(dim=-1).unsqueeze(1) + EPS            # [batch, 1, n_tgt]
+    est_energy = (est ** 2).sum(dim=-1).unsqueeze(2)                        # [batch, n_est, 1]
+    scaled_target_energy = dot ** 2 / target_energy
+    noise_energy = (est_energy - scaled_target_energy).clamp_min(0)
+    return -10 * torch.log10(scaled_target_energy / (noise_energy + EPS) + EPS)
+
+
+def best_permutations(pairwise_losses):
+    """
+    For each batch item, the permutation perm minimizing sum_i loss[perm[i], i],
+    i.e. est[perm] lines up with the targets. Returns a LongTensor [batch, n_src].
+    """
+    n_src = pairwise_losses.shape[-1]
+    perms = torch.tensor(list(itertools.permutations(range(n_src))), device=pairwise_losses.device)
+    targets = torch.arange(n_src, device=pairwise_losses.device)
+    costs = pairwise_losses[:, perms, targets].sum(dim=-1)                 # [batch, n_perms]
+    return perms[costs.argmin(dim=-1)]
+
+
+def compose_permutations(relative):
+    """
+    Turns per-slice permutations relative to the previous slice into absolute
+    ones: absolute[i] = relative[i][absolute[i - 1]], as a log-depth scan.
+    relative: [n_slices, n_src] with relative[0] the starting order.
+    """
+    absolute = relative.clone()
+    step = 1
+    while step < absolute.shape[0]:
+        composed = torch.gather(absolute[step:], 1, absolute[:-step])
+        absolute = torch.cat([absolute[:step], composed], dim=0)
+        step *= 2
+    return absolute
+
+
+def align_slices(slices, hop, previous=None):
+    """
+    Reorders the speakers of every slice ([n_slices, n_src, slice_size]) so they
+    match the slice before it on their overlapping half. `previous` optionally
+    gives an already aligned slice that precedes slices[0].
+    """
+    if previous is not None:
+        slices = torch.cat([previous.unsqueeze(0), slices], dim=0)
+    n_slices, n_src, _ = slices.shape
+    relative = torch.arange(n_src, device=slices.device).repeat(n_slices, 1)
+    if n_slices > 1 and n_src > 1:
+        pairwise = pairwise_neg_sisdr(slices[1:, :, :hop], slices[:-1, :, hop:2 * hop])
+        relative[1:] = best_permutations(pairwise)
+    absolute = compose_permutations(relative)
+    aligned = torch.gather(slices, 1, absolute.unsqueeze(-1).expand_as(slices))
+    return aligned[1:] if previous is not None else aligned
+
+
+def slice_windows(n_slices, slice_size, device=None, first=True, last=True):
+    """
+    Periodic Hann windows (sum to one at 50% overlap), with the outer half of
+    the first/last slice left flat so the recording edges are not faded out.
+    """
+    windows = torch.hann_window(slice_size, periodic=True, device=device).repeat(n_slices, 1)
+    hop = slice_size // 2
+    if first:
+        windows[0, :hop] = 1.0
+    if last:
+        windows[-1, hop:] = 1.0
+    return windows
+
+
+def fold_slices(slices, hop, windows):
+    """
+    Windowed overlap-add of [n_slices, n_src, slice_size] without normalization.
+    Returns (summed [n_src, T], window sum [T]).
+    """
+    n_slices, n_src, slice_size = slices.shape
+    length = (n_slices - 1) * hop + slice_size
+    weighted = (slices * windows.unsqueeze(1)).permute(1, 2, 0).reshape(1, n_src * slice_size, n_slices)
+    summed = F.fold(weighted, (length, 1), kernel_size=(slice_size, 1), stride=(hop, 1))
+    norm = F.fold(windows.t().unsqueeze(0), (length, 1), kernel_size=(slice_size, 1), stride=(hop, 1))
+    return summed.reshape(n_src, length), norm.reshape(length)
+
+
+def overlap_add_slices(slices, hop, windows):
+    """ Hann overlap-add of [n_slices, n_src, slice_size], normalized by the summed windows -> [n_src, T]. """
+    summed, norm = fold_slices(slices, hop, windows)
+    return summed / norm.clamp_min(EPS)
+
+
+def _encode_slices(model, slices):
+    """ Encoder + masker + speaker-count selector on [n_slices, slice_size]. """
+    tf_rep = model.enc_activation(model.encoder(slices.unsqueeze(1)))
+    est_masks_list = model.masker(tf_rep)
+    selector_output = model.decoder_select.selector(est_masks_list[-1]).reshape(slices.shape[0], -1)
+    return est_masks_list[-1], tf_rep, selector_output
+
+
+def _decode_slices(decoder, masks, tf_rep, slice_size):
+    """ One speaker-count decoder on a batch of slices -> [n_slices, n_spks, slice_size]. """
+    est_wavs = decoder(masks, tf_rep)
+    if est_wavs.shape[-1] < slice_size:
+        est_wavs = F.pad(est_wavs, (0, slice_size - est_wavs.shape[-1]))
+    return est_wavs[..., :slice_size]
+
+
+def _padded_length(T, slice_size):
+    hop = slice_size // 2
+    return max(-(-T // hop), 2) * hop
+
+
+def output_buffer_bytes(n_srcs, T, slice_size=DEFAULT_SLICE_SIZE, max_candidate_samples=DEFAULT_MAX_CANDIDATE_SAMPLES):
+    """ Bytes of float32 output buffers separate_long_recording holds at most for a T-sample recording. """
+    T_padded = _padded_length(T, slice_size)
+    channels = sum(n_srcs) if T_padded <= max_candidate_samples else max(n_srcs)
+    return 4 * T_padded * (channels + 1)   # + the window-sum buffer
+
+
+def _vote_speaker_count(model, slices, micro_batch_size):
+    """ Decoder index of the majority speaker count over all slices (encoder, masker and selector only). """
+    votes = torch.zeros(len(model.decoder_select.n_srcs), dtype=torch.long)
+    for start in range(0, slices.shape[0], micro_batch_size):
+        _, _, selector_output = _encode_slices(model, slices[start:start + micro_batch_size])
+        votes += torch.bincount(selector_output.argmax(-1).cpu(), minlength=len(votes))
+    return int(votes.argmax())
+
+
+def separate_long_recording(model, wav, slice_size=DEFAULT_SLICE_SIZE, micro_batch_size=DEFAULT_MICRO_BATCH_SIZE,
+                            max_candidate_samples=DEFAULT_MAX_CANDIDATE_SAMPLES):
+    """
+    MultiDecoderDPRNN inference on a whole recording (1D or [1, T] tensor).
+
+    Slices go through the network micro_batch_size at a time, so activation
+    memory is fixed by the micro-batch rather than the recording length; each
+    micro-batch is aligned to the previous one and overlap-added straight into
+    preallocated output buffers.
+
+    The speaker count is the majority vote of the per-slice selector, as in
+    forward_wav. Up to max_candidate_samples every still-possible count is
+    decoded into its own buffer while the vote runs, and counts that can no
+    longer win are dropped as slices come in: at most sum(n_srcs) x
+    max_candidate_samples floats. Longer recordings take a first pass through
+    the encoder, masker and selector only to decide the count, then decode just
+    that one (max(n_srcs) x T floats, at the price of running the masker twice).
+    Returns a [n_spks, T] tensor.
+    """
+    wav = wav.reshape(1, -1)
+    T = wav.shape[-1]
+    hop = slice_size // 2
+    T_padded = _padded_length(T, slice_size)
+    wav = F.pad(wav, (0, T_padded - T))
+    slices = wav.unfold(-1, slice_size, hop).squeeze(0)                      # [n_slices, slice_size] (view)
+    n_slices = slices.shape[0]
+    micro_batch_size = max(1, int(micro_batch_size or n_slices))
+
+    decoder_select = model.decoder_select
+    decided = T_padded > max_candidate_samples
+    if decided:
+        candidate_ids = [_vote_speaker_count(model, slices, micro_batch_size)]
+    else:
+        candidate_ids = range(len(decoder_select.n_srcs))
+    votes = torch.zeros(len(decoder_select.n_srcs), dtype=torch.long)
+    # Speaker-count candidate index -> [output buffer, last aligned slice]
+    candidates = {idx: [wav.new_zeros(decoder_select.n_srcs[idx], T_padded), None] for idx in candidate_ids}
+    norm = wav.new_zeros(T_padded)
+
+    for start in range(0, n_slices, micro_batch_size):
+        stop = min(start + micro_batch_size, n_slices)
+        masks, tf_rep, selector_output = _encode_slices(model, slices[start:stop])
+        votes += torch.bincount(selector_output.argmax(-1).cpu(), minlength=len(votes))
+
+        windows = slice_windows(stop - start, slice_size, device=wav.device, first=start == 0, last=stop == n_slices)
+        offset = start * hop
+        for idx, state in candidates.items():
+            est_wavs = _decode_slices(decoder_select.decoders[idx], masks, tf_rep, slice_size)
+            aligned = align_slices(est_wavs, hop, previous=state[1])
+            state[1] = aligned[-1]
+            summed, window_sum = fold_slices(aligned, hop, windows)
+            state[0][:, offset:offset + summed.shape[-1]] += summed
+        norm[offset:offset + window_sum.shape[-1]] += window_sum
+        if decided:
+            continue
+
+        # Drop the counts that can no longer win the vote (ties go to the smaller count)
+        remaining = n_slices - stop
+        leader = int(votes.argmax())
+        candidates = {
+            idx: state for idx, state in candidates.items()
+            if idx == leader or votes[idx] + remaining > votes[leader]
+            or (votes[idx] + remaining == votes[leader] and idx < leader)
+        }
+
+    output, _ = candidates[candidate_ids[0] if decided else int(votes.argmax())]
+    output /= norm.clamp_min(EPS)
+    return output[:, :T]